@@ -21,49 +21,41 @@ import tkinter as tk
 from tkinter import filedialog, messagebox
 import threading
 import subprocess
-import pyttsx3
 import mediapipe as mp
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 EXTRAS_DIR = os.path.join(BASE_DIR, "extras")
 
+sys.path.append(EXTRAS_DIR)
+from audio_io import is_pcm, write_wav
+from cartoon import cartoonify_image
+from detector_registry import get_face_mesh
+from tts_worker import default_tts_pool
+from video_sink import AudioInput
+
 # MediaPipe setup
 mp_face_mesh = mp.solutions.face_mesh
 
-def cartoonify_image(img):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    gray = cv2.medianBlur(gray, 5)
-    edges = cv2.adaptiveThreshold(gray, 255,
-                                  cv2.ADAPTIVE_THRESH_MEAN_C,
-                                  cv2.THRESH_BINARY, 9, 9)
-    color = cv2.bilateralFilter(img, 9, 250, 250)
-    cartoon = cv2.bitwise_and(color, color, mask=edges)
-    return cartoon
-
-def generar_voz(texto, salida_mp3):
-    engine = pyttsx3.init()
-    # Ajustes de voz (opcionales)
-    try:
-        engine.setProperty('rate', 150)
-    except Exception:
-        pass
-    engine.save_to_file(texto, salida_mp3)
-    engine.runAndWait()
+def generar_voz(texto, salida_wav=None):
+    # Proceso TTS persistente (motor ya inicializado); velocidad 150.
+    # Devuelve (muestras, sr) en memoria; el WAV solo se escribe si se pasa `salida_wav`
+    return default_tts_pool().synthesize_pcm(texto, rate=150, output_path=salida_wav)
 
 def detectar_labios_mediapipe(imagen):
-    with mp_face_mesh.FaceMesh(static_image_mode=True, refine_landmarks=True) as face_mesh:
-        img_rgb = cv2.cvtColor(imagen, cv2.COLOR_BGR2RGB)
-        res = face_mesh.process(img_rgb)
-        if not res.multi_face_landmarks:
-            return None
-        lm = res.multi_face_landmarks[0]
-        h, w, _ = imagen.shape
-        indices = list(range(61, 88))  # región de labios en MediaPipe
-        puntos = []
-        for idx in indices:
-            l = lm.landmark[idx]
-            puntos.append((int(l.x * w), int(l.y * h)))
-        return np.array(puntos, np.int32)
+    # FaceMesh compartido: el grafo se construye una vez por hilo, no por imagen
+    face_mesh = get_face_mesh(static_image_mode=True, refine_landmarks=True)
+    img_rgb = cv2.cvtColor(imagen, cv2.COLOR_BGR2RGB)
+    res = face_mesh.process(img_rgb)
+    if not res.multi_face_landmarks:
+        return None
+    lm = res.multi_face_landmarks[0]
+    h, w, _ = imagen.shape
+    indices = list(range(61, 88))  # región de labios en MediaPipe
+    puntos = []
+    for idx in indices:
+        l = lm.landmark[idx]
+        puntos.append((int(l.x * w), int(l.y * h)))
+    return np.array(puntos, np.int32)
 
 def animar_labios_simple(imagen, puntos_labios, salida_avi, fps=20, frames_count=30):
     h, w, _ = imagen.shape
@@ -103,16 +95,27 @@ def usar_wav2lip_externo(image_path, audio_path, output_path):
     except Exception as e:
         return False, str(e)
 
-def combinar_audio_video(ffmpeg_path, video_path, audio_path, salida_final):
-    if not os.path.exists(video_path) or not os.path.exists(audio_path):
+def combinar_audio_video(ffmpeg_path, video_path, audio, salida_final):
+    # `audio` puede ser una ruta o el buffer (muestras, sr) del TTS, que entra a ffmpeg en memoria
+    if not os.path.exists(video_path) or not (is_pcm(audio) or os.path.exists(audio)):
         return False, "Falta video o audio."
-    cmd = [ffmpeg_path, "-y", "-i", video_path, "-i", audio_path, "-shortest", "-c:v", "copy", "-c:a", "aac", salida_final]
+    entrada = AudioInput(audio)
+    cmd = [ffmpeg_path, "-y", "-i", video_path, *entrada.args, "-shortest", "-c:v", "copy", "-c:a", "aac", salida_final]
     try:
-        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                pass_fds=entrada.pass_fds)
+        entrada.started()
+        try:
+            stdout, stderr = proc.communicate(timeout=60)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            raise
+        finally:
+            entrada.close()
         if proc.returncode == 0 and os.path.exists(salida_final):
             return True, "Combinación correcta."
         else:
-            return False, proc.stderr + "\\n" + proc.stdout
+            return False, stderr + "\\n" + stdout
     except Exception as e:
         return False, str(e)
 
@@ -186,8 +189,8 @@ class App:
                 return
 
             self.status.config(text="Estado: generando audio...")
-            audio_path = os.path.join(out_dir, f"{nombre_salida}.mp3")
-            generar_voz(texto, audio_path)
+            audio_path = os.path.join(out_dir, f"{nombre_salida}.wav")
+            audio = generar_voz(texto)
 
             # Primero intentamos Wav2Lip si el usuario lo pidió
             video_path = os.path.join(out_dir, f"{nombre_salida}.avi")
@@ -195,7 +198,8 @@ class App:
             used_wav2lip = False
             if self.use_wav2lip_var.get():
                 self.status.config(text="Estado: intentando Wav2Lip externo (si existe)...")
-                success, msg = usar_wav2lip_externo(imagen_path, audio_path, final_path)
+                # El script externo corre en otro proceso: necesita el audio en disco
+                success, msg = usar_wav2lip_externo(imagen_path, write_wav(audio_path, *audio), final_path)
                 if success:
                     self.status.config(text=f"Wav2Lip OK. Guardado: {final_path}")
                     used_wav2lip = True
@@ -209,12 +213,14 @@ class App:
                 # intentar combinar con ffmpeg (si está instalado)
                 ffmpeg_path = shutil.which("ffmpeg") or "ffmpeg"
                 if shutil.which("ffmpeg"):
-                    ok, msg = combinar_audio_video(ffmpeg_path, video_path, audio_path, final_path)
+                    ok, msg = combinar_audio_video(ffmpeg_path, video_path, audio, final_path)
                     if ok:
                         self.status.config(text=f"Combinación completada: {final_path}")
                     else:
+                        write_wav(audio_path, *audio)
                         self.status.config(text=f"Video creado: {video_path} (ffmpeg falló: {msg})")
                 else:
+                    write_wav(audio_path, *audio)
                     self.status.config(text=f"Video creado: {video_path} (instala ffmpeg para combinar audio)")
 
             messagebox.showinfo("Listo", f"Proceso terminado.\nResultados en: {os.path.join(BASE_DIR, 'resultados')}")
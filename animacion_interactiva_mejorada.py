@@ -8,8 +8,8 @@ Versión mejorada con:
 4) Controles de voz (velocidad y selección de voz).
 5) Permite modo script para ejecutar una prueba automática.
 """
-import os, sys, threading, subprocess, shutil
-import cv2, numpy as np, pyttsx3
+import os, sys, threading
+import cv2, numpy as np
 import mediapipe as mp
 import tkinter as tk
 from tkinter import filedialog, messagebox
@@ -25,6 +25,15 @@ try:
 except ImportError as e:
     print(f"ADVERTENCIA: wav2lip_mejorado.py no encontrado o con errores. Usando fallback. Error: {e}")
 
+from audio_io import write_wav
+from avatar_profile import default_avatar_store, describe_stats, image_source
+from cartoon import cartoonify_image
+from detector_registry import get_face_mesh
+from mouth_atlas import get_or_build_atlas
+from tts_worker import default_tts_pool
+from tts_worker import describe_stats as describe_tts_stats
+from video_sink import FFmpegVideoSink, ffmpeg_disponible
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 EXTRAS_DIR = os.path.join(BASE_DIR, "extras")
 RESULTS_DIR = os.path.join(BASE_DIR, "resultados")
@@ -32,136 +41,171 @@ os.makedirs(RESULTS_DIR, exist_ok=True)
 
 mp_face_mesh = mp.solutions.face_mesh
 
-def cartoonify_image(img):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    gray = cv2.medianBlur(gray, 5)
-    edges = cv2.adaptiveThreshold(gray, 255,
-                                  cv2.ADAPTIVE_THRESH_MEAN_C,
-                                  cv2.THRESH_BINARY, 9, 9)
-    color = cv2.bilateralFilter(img, 9, 250, 250)
-    cartoon = cv2.bitwise_and(color, color, mask=edges)
-    return cartoon
-
-def generar_voz(texto, salida_mp3, rate=150, voice_index=None):
-    engine = pyttsx3.init()
-    try:
-        engine.setProperty('rate', rate)
-    except Exception:
-        pass
-    if voice_index is not None:
-        try:
-            voices = engine.getProperty('voices')
-            if 0 <= voice_index < len(voices):
-                engine.setProperty('voice', voices[voice_index].id)
-        except Exception:
-            pass
-    engine.save_to_file(texto, salida_mp3)
-    engine.runAndWait()
-    return salida_mp3
+def generar_voz(texto, salida_wav=None, rate=150, voice_index=None):
+    # Proceso TTS persistente: el motor pyttsx3 se inicializa una vez, no por petición.
+    # Devuelve (muestras, sr) en memoria; el WAV solo se escribe si se pasa `salida_wav`
+    return default_tts_pool().synthesize_pcm(texto, rate=rate, voice=voice_index, output_path=salida_wav)
 
 def detectar_labios_mediapipe(imagen):
-    with mp_face_mesh.FaceMesh(static_image_mode=True, refine_landmarks=True) as face_mesh:
-        img_rgb = cv2.cvtColor(imagen, cv2.COLOR_BGR2RGB)
-        res = face_mesh.process(img_rgb)
-        if not res.multi_face_landmarks:
-            return None
-        lm = res.multi_face_landmarks[0]
-        h, w, _ = imagen.shape
-        indices = list(range(61, 88))
-        puntos = []
-        for idx in indices:
-            l = lm.landmark[idx]
-            puntos.append((int(l.x * w), int(l.y * h)))
-        return np.array(puntos, np.int32)
+    # FaceMesh compartido: el grafo se construye una vez por hilo, no por imagen
+    face_mesh = get_face_mesh(static_image_mode=True, refine_landmarks=True)
+    img_rgb = cv2.cvtColor(imagen, cv2.COLOR_BGR2RGB)
+    res = face_mesh.process(img_rgb)
+    if not res.multi_face_landmarks:
+        return None
+    lm = res.multi_face_landmarks[0]
+    h, w, _ = imagen.shape
+    indices = list(range(61, 88))
+    puntos = []
+    for idx in indices:
+        l = lm.landmark[idx]
+        puntos.append((int(l.x * w), int(l.y * h)))
+    return np.array(puntos, np.int32)
 
-def animar_labios_blend(imagen, puntos_labios, salida_avi, fps=25, frames_count=40):
+def _apertura_labios(i, frames_count):
+    return abs((i % (frames_count//2)) - (frames_count//4)) / max(1,(frames_count//4))
+
+def _mover_labios(puntos_labios, apertura):
+    # crear desplazamiento vertical para los puntos inferiores
+    pts_mod = puntos_labios.copy()
+    for j in range(len(pts_mod)):
+        if j > len(pts_mod)//2:
+            pts_mod[j][1] += int(apertura * 8)
+        else:
+            pts_mod[j][1] -= int(apertura * 3)
+    return pts_mod
+
+def _blend_labios(imagen, pts_mod):
     """
-    Genera animación de labios pero en lugar de pintar negro, crea una máscara
-    y modifica la región de la boca con un ligero oscurecimiento y blending,
-    luego aplica suavizado para naturalizar.
+    En lugar de pintar negro, crea una máscara y modifica la región de la boca con un
+    ligero oscurecimiento y blending, luego aplica suavizado para naturalizar.
     """
     h, w, _ = imagen.shape
+    frame = imagen.astype(np.float32)/255.0
+    # crear máscara animada
+    mask = np.zeros((h,w), np.uint8)
+    if pts_mod is not None:
+        cv2.fillPoly(mask,[pts_mod],255)
+    mask3 = np.stack([mask/255.0]*3, axis=-1)
+    # oscurecer ligeramente la región labial para simular apertura y sombra
+    region = frame * 0.9
+    blended = frame*(1-mask3) + region*mask3
+    return cv2.GaussianBlur((blended*255).astype(np.uint8),(7,7),0)
+
+def generar_frames_labios_blend(imagen, puntos_labios, frames_count=40, niveles_atlas=None):
+    """
+    Genera la animación de labios frame a frame. Con `niveles_atlas` las aperturas se
+    cuantizan y cada estado de boca se renderiza una sola vez por avatar: por frame solo
+    se copia el parche sobre el fondo suavizado (el buffer entregado se reutiliza).
+    """
+    aperturas = [_apertura_labios(i, frames_count) for i in range(frames_count)]
+    if not niveles_atlas:
+        for apertura in aperturas:
+            yield _blend_labios(imagen, _mover_labios(puntos_labios, apertura))
+        return
+
+    h, w, _ = imagen.shape
+    radio = 3  # radio del GaussianBlur 7x7
+    x, y, wbox, hbox = cv2.boundingRect(puntos_labios)
+    # ROI que puede cambiar: labios + desplazamiento máximo (3 arriba, 8 abajo) + radio del blur
+    y0, y1 = max(0, y - 3 - radio), min(h, y + hbox + 8 + radio)
+    x0, x1 = max(0, x - radio), min(w, x + wbox + radio)
+    # Recorte con contexto extra para que el blur coincida con el del frame completo
+    cy0, cy1, cx0, cx1 = max(0, y0 - radio), min(h, y1 + radio), max(0, x0 - radio), min(w, x1 + radio)
+    recorte = imagen[cy0:cy1, cx0:cx1]
+    offset = np.array([cx0, cy0], np.int32)
+    interior = (slice(y0 - cy0, y1 - cy0), slice(x0 - cx0, x1 - cx0))
+
+    atlas = get_or_build_atlas(
+        recorte, lambda apertura: _blend_labios(recorte, _mover_labios(puntos_labios, apertura) - offset)[interior],
+        levels=niveles_atlas, renderer='labios_blend', puntos=puntos_labios.tolist()
+    )
+    canvas = _blend_labios(imagen, None)
+    for estado in atlas.indices(aperturas):
+        canvas[y0:y1, x0:x1] = atlas.patches[estado]
+        yield canvas
+
+def animar_labios_blend(imagen, puntos_labios, salida_avi, fps=25, frames_count=40):
+    """Escribe la animación en un AVI XVID sin audio (solo cuando no hay ffmpeg)"""
+    h, w, _ = imagen.shape
     fourcc = cv2.VideoWriter_fourcc(*'XVID')
     out = cv2.VideoWriter(salida_avi, fourcc, fps, (w, h))
-    mask_base = np.zeros((h, w), np.uint8)
-    cv2.fillPoly(mask_base, [puntos_labios], 255)
-    # Extraer bounding box de labios para operaciones localizadas
-    x,y,wbox,hbox = cv2.boundingRect(puntos_labios)
-    for i in range(frames_count):
-        frame = imagen.copy().astype(np.float32)/255.0
-        apertura = abs((i % (frames_count//2)) - (frames_count//4)) / max(1,(frames_count//4))
-        # crear desplazamiento vertical para los puntos inferiores
-        pts_mod = puntos_labios.copy()
-        for j in range(len(pts_mod)):
-            if j > len(pts_mod)//2:
-                pts_mod[j][1] += int(apertura * 8)
-            else:
-                pts_mod[j][1] -= int(apertura * 3)
-        # crear máscara animada
-        mask = np.zeros((h,w), np.uint8)
-        cv2.fillPoly(mask,[pts_mod],255)
-        mask3 = np.stack([mask/255.0]*3, axis=-1)
-        # oscurecer ligeramente la región labial para simular apertura y sombra
-        region = frame * 0.9
-        blended = frame*(1-mask3) + region*mask3
-        # suavizado local para evitar bordes duros
-        roi = (max(0,y-10), max(0,x-10), min(h,hbox+20), min(w,wbox+20))
-        # apply gaussian blur on whole for simplicity
-        out_frame = (cv2.GaussianBlur((blended*255).astype(np.uint8),(7,7),0))
+    for out_frame in generar_frames_labios_blend(imagen, puntos_labios, frames_count):
         out.write(out_frame)
     out.release()
     return salida_avi
 
-def combinar_audio_video_ffmpeg(video_path, audio_path, salida_final):
-    ffmpeg = shutil.which("ffmpeg") or "ffmpeg"
-    if shutil.which("ffmpeg") is None:
-        print("ffmpeg no encontrado en PATH.")
-        return False, "ffmpeg not found"
-    cmd = [ffmpeg, "-y", "-i", video_path, "-i", audio_path, "-shortest", "-c:v", "copy", "-c:a", "aac", salida_final]
-    try:
-        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-        if proc.returncode == 0:
-            return True, salida_final
-        else:
-            return False, proc.stderr + proc.stdout
-    except Exception as e:
-        return False, str(e)
+def animar_labios_blend_ffmpeg(imagen, puntos_labios, audio_path, salida_final, fps=25, frames_count=40):
+    """Codifica la animación y mezcla el audio en un único proceso ffmpeg (sin AVI intermedio)"""
+    h, w, _ = imagen.shape
+    with FFmpegVideoSink(salida_final, w, h, fps=fps, audio_path=audio_path) as sink:
+        for out_frame in generar_frames_labios_blend(imagen, puntos_labios, frames_count):
+            sink.write(out_frame)
+    return salida_final
+
+def cargar_perfil_avatar(imagen_path):
+    """
+    Cartoon + landmarks de labios de la imagen, cacheados en disco por contenido: con la
+    misma foto no se vuelve a decodificar, cartoonizar ni pasar por FaceMesh.
+    """
+    store = default_avatar_store()
+    data, decodificar = image_source(imagen_path)
+
+    def construir():
+        cartoon = cartoonify_image(decodificar())
+        puntos = detectar_labios_mediapipe(cartoon)
+        return {'cartoon': cartoon, 'labios': None if puntos is None else puntos.tolist()}
+
+    perfil = store.get_or_build(data, {'perfil': 'animacion_interactiva', 'version': 2}, construir)
+    print(describe_stats(store))
+    return perfil
 
 # --- Procesamiento por imagen (usa wav2lip si está disponible) ---
-def procesar_imagen_pipeline(imagen_path, texto, nombre_salida, voice_rate=150, voice_idx=None, use_wav2lip=True):
+def procesar_imagen_pipeline(imagen_path, texto, nombre_salida, voice_rate=150, voice_idx=None, use_wav2lip=True,
+                             guardar_cartoon=False):
     print("Procesando:", imagen_path)
-    img = cv2.imread(imagen_path)
-    if img is None:
+    if not os.path.isfile(imagen_path):
         return False, "No se pudo leer la imagen"
     
-    audio_path = os.path.join(RESULTS_DIR, f"{nombre_salida}.mp3")
-    generar_voz(texto, audio_path, rate=voice_rate, voice_index=voice_idx)
+    audio_path = os.path.join(RESULTS_DIR, f"{nombre_salida}.wav")
+    audio = generar_voz(texto, rate=voice_rate, voice_index=voice_idx)
     
     # Intentar usar la versión mejorada de Wav2Lip si está disponible
     if use_wav2lip and wav2lip_mejorado_disponible:
         final_output = os.path.join(RESULTS_DIR, f"{nombre_salida}_final.mp4")
         try:
-            lip_sync(imagen_path, audio_path, final_output)
+            lip_sync(imagen_path, write_wav(audio_path, *audio), final_output)
             return True, final_output
         except Exception as e:
             print(f"Error con wav2lip_mejorado: {e}, usando fallback.")
 
-    # Fallback: animación interna
-    cartoon = cartoonify_image(img)
-    cartoon_path = os.path.join(RESULTS_DIR, f"{nombre_salida}_cartoon.jpg")
-    cv2.imwrite(cartoon_path, cartoon)
-    puntos = detectar_labios_mediapipe(cartoon)
-    if puntos is None:
+    # Fallback: animación interna (análisis de la imagen cacheado por contenido)
+    try:
+        perfil = cargar_perfil_avatar(imagen_path)
+    except (OSError, ValueError):
+        return False, "No se pudo leer la imagen"
+    # El cartoon pasa en memoria a la animación; el JPEG solo se escribe si se pide
+    cartoon = perfil['cartoon']
+    if guardar_cartoon:
+        cv2.imwrite(os.path.join(RESULTS_DIR, f"{nombre_salida}_cartoon.jpg"), cartoon)
+    if perfil['labios'] is None:
         return False, "No se detectaron labios en la imagen"
-    avi_path = os.path.join(RESULTS_DIR, f"{nombre_salida}.avi")
-    animar_labios_blend(cartoon, puntos, avi_path)
+    puntos = np.array(perfil['labios'], np.int32)
     final_output = os.path.join(RESULTS_DIR, f"{nombre_salida}_final.mp4")
-    ok, msg = combinar_audio_video_ffmpeg(avi_path, audio_path, final_output)
-    if ok:
-        return True, final_output
+    if ffmpeg_disponible():
+        try:
+            # El audio del TTS entra al encoder en memoria, sin WAV intermedio
+            animar_labios_blend_ffmpeg(cartoon, puntos, audio, final_output)
+            return True, final_output
+        except Exception as e:
+            print(f"Error codificando con ffmpeg: {e}")
     else:
-        # si ffmpeg falla, devolver avi y mp3
-        return True, f"{avi_path} (audio separado: {audio_path})"
+        print("ffmpeg no encontrado en PATH.")
+    # si ffmpeg falla, devolver avi y wav
+    avi_path = os.path.join(RESULTS_DIR, f"{nombre_salida}.avi")
+    animar_labios_blend(cartoon, puntos, avi_path)
+    write_wav(audio_path, *audio)
+    return True, f"{avi_path} (audio separado: {audio_path})"
 
 # ---------------- GUI ----------------
 class App:
@@ -257,6 +301,8 @@ class App:
             self.status.config(text=f"Procesando ({i}/{total}): {name}")
             ok, out = procesar_imagen_pipeline(f, texto.replace("{name}", name), name, voice_rate=rate, voice_idx=voice_idx, use_wav2lip=bool(self.wav2lip_var.get()))
             print("Resultado:", ok, out)
+        # Mismo guion para todo el lote: solo la primera imagen sintetiza, el resto sale de la caché TTS
+        print(describe_tts_stats(default_tts_pool()))
         self.status.config(text="Lote completado")
         messagebox.showinfo("Lote", f"Lote completado. Resultados en: {RESULTS_DIR}")
 
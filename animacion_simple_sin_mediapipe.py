@@ -10,40 +10,28 @@ import tkinter as tk
 from tkinter import filedialog, messagebox
 import threading
 import subprocess
-import pyttsx3
-
-def cartoonify_image(img):
-    """Aplicar filtro cartoon a la imagen"""
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    gray = cv2.medianBlur(gray, 5)
-    edges = cv2.adaptiveThreshold(gray, 255,
-                                  cv2.ADAPTIVE_THRESH_MEAN_C,
-                                  cv2.THRESH_BINARY, 9, 9)
-    color = cv2.bilateralFilter(img, 9, 250, 250)
-    cartoon = cv2.bitwise_and(color, color, mask=edges)
-    return cartoon
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'extras'))
+from cartoon import cartoonify_image
+from face_detection import detect_faces, largest_face
+from tts_worker import default_tts_pool
 
 def generar_voz(texto, salida_wav):
-    """Generar audio desde texto"""
-    engine = pyttsx3.init()
-    try:
-        engine.setProperty('rate', 150)
-    except Exception:
-        pass
-    engine.save_to_file(texto, salida_wav)
-    engine.runAndWait()
+    """Generar audio desde texto (proceso TTS persistente con el motor ya inicializado)"""
+    default_tts_pool().synthesize(texto, salida_wav, rate=150)
     return salida_wav
 
 def detectar_cara_simple(imagen):
     """Detectar cara usando OpenCV básico"""
     try:
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
         gray = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+        # Detección sobre una copia reducida; las cajas vuelven en coordenadas originales
+        faces = detect_faces(gray, scale_factor=1.3, min_neighbors=5)
         
         if len(faces) > 0:
             # Tomar la cara más grande
-            face = max(faces, key=lambda x: x[2] * x[3])
+            face = largest_face(faces)
             x, y, w, h = face
             
             # Simular región de labios (tercio inferior de la cara)
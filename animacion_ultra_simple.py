@@ -6,11 +6,14 @@ Para casos donde OpenCV no funciona por problemas de compatibilidad
 import os
 import tkinter as tk
 from tkinter import filedialog, messagebox
+import sys
 import threading
-import pyttsx3
 from PIL import Image, ImageTk, ImageFilter, ImageEnhance
 import subprocess
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'extras'))
+from tts_worker import default_tts_pool
+
 class AnimacionUltraSimple:
     def __init__(self, root):
         self.root = root
@@ -178,16 +181,13 @@ class AnimacionUltraSimple:
             audio_path = os.path.join("resultados", f"{nombre}.wav")
             
             # Generar audio
-            engine = pyttsx3.init()
             try:
                 velocidad = int(self.velocidad_var.get())
-                engine.setProperty('rate', velocidad)
             except:
-                engine.setProperty('rate', 150)
+                velocidad = 150
             
-            engine.save_to_file(texto, audio_path)
-            engine.runAndWait()
-            engine.stop()
+            # Proceso TTS persistente: sin pyttsx3.init() por petición
+            default_tts_pool().synthesize(texto, audio_path, rate=velocidad)
             
             self.status_label.config(text=f"✅ Audio creado: {audio_path}", fg="#27ae60")
             messagebox.showinfo("✅ Éxito", f"¡Audio generado!\n📁 {audio_path}")
@@ -209,16 +209,13 @@ class AnimacionUltraSimple:
             self.status_label.config(text="🎤 Generando audio...", fg="#e67e22")
             audio_path = os.path.join("resultados", f"{nombre}.wav")
             
-            engine = pyttsx3.init()
             try:
                 velocidad = int(self.velocidad_var.get())
-                engine.setProperty('rate', velocidad)
             except:
-                engine.setProperty('rate', 150)
+                velocidad = 150
             
-            engine.save_to_file(texto, audio_path)
-            engine.runAndWait()
-            engine.stop()
+            # Proceso TTS persistente: sin pyttsx3.init() por petición
+            default_tts_pool().synthesize(texto, audio_path, rate=velocidad)
             
             # 2. Procesar imagen (aplicar efectos con PIL)
             self.status_label.config(text="🎨 Procesando imagen...", fg="#e67e22")
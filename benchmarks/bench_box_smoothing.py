@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: suavizado de cajas de cara en secuencias sintéticas de 100k frames
+Compara el bucle original de get_smoothened_boxes (O(N·T), leía cajas ya sobrescritas) con la
+media móvil por sumas acumuladas y con el suavizador causal frame a frame.
+Uso: python benchmarks/bench_box_smoothing.py [frames] [T]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'extras'))
+
+from face_tracking import CausalBoxSmoother, smooth_boxes
+
+
+def smoothened_boxes_legacy(boxes, T):
+    """Implementación original (en sitio: las ventanas incluyen cajas ya suavizadas)"""
+    for i in range(len(boxes)):
+        if i + T > len(boxes):
+            window = boxes[len(boxes) - T:]
+        else:
+            window = boxes[i : i + T]
+        boxes[i] = np.mean(window, axis=0)
+    return boxes
+
+
+def reference_moving_average(boxes, T):
+    """Media móvil exacta sobre las cajas originales (bucle, solo para verificar)"""
+    n = len(boxes)
+    return np.array([boxes[min(i, n - T):min(i, n - T) + T].mean(axis=0) for i in range(n)])
+
+
+def synthetic_boxes(n, seed=0):
+    """Cara que deriva por la imagen con ruido de detección"""
+    rng = np.random.default_rng(seed)
+    centro = 500 + np.cumsum(rng.normal(0, 1.5, size=(n, 2)), axis=0)
+    lado = 300 + 20 * np.sin(np.arange(n) / 200.0)
+    ruido = rng.normal(0, 6, size=(n, 4))
+    cajas = np.column_stack([centro[:, 0] - lado / 2, centro[:, 1] - lado / 2,
+                             centro[:, 0] + lado / 2, centro[:, 1] + lado / 2])
+    return cajas + ruido
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    T = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    boxes = synthetic_boxes(n)
+    print(f"📦 {n:,} cajas, ventana T={T}")
+
+    inicio = time.perf_counter()
+    legacy = smoothened_boxes_legacy(boxes.copy(), T)
+    t_legacy = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    vectorizado = smooth_boxes(boxes, T)
+    t_vec = time.perf_counter() - inicio
+
+    smoother = CausalBoxSmoother(T)
+    inicio = time.perf_counter()
+    causal = np.array([smoother.update(b) for b in boxes])
+    t_causal = time.perf_counter() - inicio
+
+    print(f"🐢 Bucle original:   {t_legacy * 1000:9.1f} ms")
+    print(f"⚡ Sumas acumuladas: {t_vec * 1000:9.1f} ms ({t_legacy / t_vec:.0f}x)")
+    print(f"📡 Causal por frame: {t_causal * 1000:9.1f} ms ({t_causal / n * 1e6:.2f} µs/frame)")
+
+    muestra = min(n, 5000)
+    referencia = reference_moving_average(boxes[:muestra], T)
+    error = np.abs(smooth_boxes(boxes[:muestra], T) - referencia).max()
+    # El bucle original frente al suavizado nuevo, sobre todas las cajas
+    desvio = np.abs(legacy - vectorizado)
+    desvio_legacy, desvio_max = desvio.mean(), desvio.max()
+    print(f"✅ Error máximo frente a la media móvil exacta: {error:.2e} px")
+    print(f"⚠️  Desvío del bucle original frente al nuevo (cola del video): medio {desvio_legacy:.4f} px, "
+          f"máximo {desvio_max:.2f} px")
+    print(f"📉 Jitter (std de la diferencia entre frames): bruto {np.diff(boxes, axis=0).std():.2f}, "
+          f"centrado {np.diff(vectorizado, axis=0).std():.2f}, causal {np.diff(causal, axis=0).std():.2f}")
+
+
+if __name__ == "__main__":
+    main()
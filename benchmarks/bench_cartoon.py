@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: presets del efecto cartoon a distintos tamaños de imagen
+'clasico' es el filtro original (bilateral d=9 a resolución completa); los presets con pirámide
+filtran una copia reducida. Se mide el mejor tiempo de varias repeticiones y el PSNR frente al
+clásico para ver cuánto se aleja el resultado.
+Con --teselas compara, en una imagen de ~24 MP, el filtro sobre el array completo con el modo
+por teselas (1..N hilos): tiempo y pico de memoria, cada caso en un proceso nuevo.
+Uso: python benchmarks/bench_cartoon.py [imagen] [lado mayor ...] [--teselas]
+"""
+
+import multiprocessing as mp
+import os
+import resource
+import sys
+import time
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'extras'))
+
+from cartoon import DEFAULT_TILE_SIZE, PRESETS, cartoonify_image, psnr
+
+REPEATS = 3
+SIZES = [640, 1280, 1920, 3840]
+TILED_SIZE = (6000, 4000)
+
+
+def mejor_tiempo(fn):
+    mejor = float('inf')
+    resultado = None
+    for _ in range(REPEATS):
+        inicio = time.perf_counter()
+        resultado = fn()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def _caso_teselas(imagen, preset, tile_size, threads, resultados):
+    """Proceso hijo: un solo caso para que el pico de memoria (ru_maxrss) sea solo suyo"""
+    h, w = TILED_SIZE
+    img = cv2.resize(cv2.imread(imagen), (w, h), interpolation=cv2.INTER_CUBIC)
+    out = np.empty_like(img)
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    inicio = time.perf_counter()
+    cartoonify_image(img, preset, tile_size=tile_size, threads=threads, out=out)
+    elapsed = time.perf_counter() - inicio
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base
+    resultados.put((elapsed, pico / 1024))
+
+
+def comparar_teselas(imagen):
+    h, w = TILED_SIZE
+    print(f"\n🧩 Teselas de {DEFAULT_TILE_SIZE} px sobre {w}x{h} ({w * h / 1e6:.0f} MP), {os.cpu_count()} CPU")
+    ctx = mp.get_context('spawn')
+    resultados = ctx.Queue()
+    for preset in ('clasico', 'rapido'):
+        casos = [('completa', 0, None)] + [(f'{n} hilo(s)', DEFAULT_TILE_SIZE, n)
+                                           for n in sorted({1, 2, os.cpu_count() or 1})]
+        for nombre, tile_size, threads in casos:
+            proc = ctx.Process(target=_caso_teselas, args=(imagen, preset, tile_size, threads, resultados))
+            proc.start()
+            elapsed, pico_mb = resultados.get()
+            proc.join()
+            print(f"   {preset:<8} {nombre:<11} {elapsed:6.2f} s  pico +{pico_mb:6.0f} MB")
+
+
+def main():
+    args = [a for a in sys.argv[1:] if a != '--teselas']
+    imagen = args[0] if args else os.path.join(BASE_DIR, 'woman-3584435_1280.jpg')
+    sizes = [int(v) for v in args[1:]] or SIZES
+    original = cv2.imread(imagen)
+    if original is None:
+        print(f"❌ No se pudo leer {imagen}")
+        return
+    if '--teselas' in sys.argv:
+        comparar_teselas(imagen)
+        return
+
+    for size in sizes:
+        scale = size / max(original.shape[:2])
+        img = cv2.resize(original, None, fx=scale, fy=scale,
+                         interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC)
+        h, w = img.shape[:2]
+        print(f"\n🖼️  {w}x{h} ({w * h / 1e6:.1f} MP)")
+        t_ref, ref = mejor_tiempo(lambda: cartoonify_image(img, 'clasico', tile_size=0))
+        for preset in PRESETS:
+            t, out = (t_ref, ref) if preset == 'clasico' else mejor_tiempo(
+                lambda: cartoonify_image(img, preset, tile_size=0))
+            calidad = psnr(out, ref)
+            detalle = "referencia" if calidad == float('inf') else f"PSNR {calidad:5.1f} dB"
+            print(f"   {preset:<12} {t * 1000:8.1f} ms  {t_ref / t:5.1f}x  {detalle}")
+
+
+if __name__ == "__main__":
+    main()
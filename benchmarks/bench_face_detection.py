@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: detección Haar a resolución completa vs reducida (con y sin refinado en la ROI)
+La detección a resolución completa hace de referencia para el recall (IoU >= 0.5). Se informa
+contra todas las caras de referencia (incluye las pequeñas que se pierden al reducir) y contra
+las que caben en la imagen reducida (lado >= HAAR_MIN_SIDE px tras reducir). Cada imagen se
+prueba también reescalada a 4000 px de ancho, el tamaño habitual de las subidas.
+Uso: python benchmarks/bench_face_detection.py [imagen|directorio ...]
+"""
+
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+import cv2
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'extras'))
+
+from detector_registry import get_haar_cascade
+from face_detection import detect_faces, detection_scale
+
+EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+UPLOAD_WIDTH = 4000
+REPEATS = 3
+# minSize por defecto de detectMultiScale
+HAAR_MIN_SIDE = 30
+
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    ih = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = iw * ih
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+def recall(reference, boxes, threshold=0.5):
+    """Fracción de caras de referencia con alguna caja que las cubra con IoU >= threshold"""
+    return sum(any(iou(r, b) >= threshold for b in boxes) for r in reference)
+
+
+def listar_imagenes(args):
+    rutas = args or [BASE_DIR]
+    imagenes = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            imagenes += sorted(p for p in glob.glob(os.path.join(ruta, '*')) if p.lower().endswith(EXTENSIONS))
+        else:
+            imagenes.append(ruta)
+    return imagenes
+
+
+def medir(gray, cascade, **kwargs):
+    mejor = float('inf')
+    for _ in range(REPEATS):
+        inicio = time.perf_counter()
+        faces = detect_faces(gray, cascade, 1.3, 5, **kwargs)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return faces, mejor
+
+
+def main():
+    cascade = get_haar_cascade()
+    modos = [('reducida 640', dict(detect_size=640)),
+             ('640 + refinado', dict(detect_size=640, refine=True)),
+             ('reducida 480', dict(detect_size=480)),
+             ('480 + refinado', dict(detect_size=480, refine=True))]
+
+    casos = []
+    for ruta in listar_imagenes(sys.argv[1:]):
+        image = cv2.imread(ruta)
+        if image is None:
+            continue
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        casos.append((os.path.basename(ruta), gray))
+        escala = UPLOAD_WIDTH / gray.shape[1]
+        if escala > 1:
+            grande = cv2.resize(gray, None, fx=escala, fy=escala, interpolation=cv2.INTER_CUBIC)
+            casos.append((f"{os.path.basename(ruta)} @{UPLOAD_WIDTH}", grande))
+    if not casos:
+        print("❌ No se encontraron imágenes")
+        return
+
+    print(f"{'imagen':<32} {'modo':<16} {'ms':>8} {'speedup':>8} {'caras':>6} {'todas':>7} "
+          f"{'detect.':>7} {'IoU':>5}")
+    totales = {nombre: [0, 0, 0, 0] for nombre, _ in modos}
+    for nombre_img, gray in casos:
+        reference, t_full = medir(gray, cascade, detect_size=None)
+        print(f"{nombre_img:<32} {'completa':<16} {t_full * 1000:8.1f} {'1.0x':>8} {len(reference):>6}")
+        for nombre, kwargs in modos:
+            faces, t = medir(gray, cascade, **kwargs)
+            # Caras de referencia que la imagen reducida todavía puede contener
+            escala = detection_scale(gray.shape, kwargs['detect_size'])
+            detectables = [r for r in reference if min(r[2], r[3]) * escala >= HAAR_MIN_SIDE]
+            encontrados_todas = recall(reference, faces)
+            encontrados = recall(detectables, faces)
+            totales[nombre][0] += encontrados_todas
+            totales[nombre][1] += len(reference)
+            totales[nombre][2] += encontrados
+            totales[nombre][3] += len(detectables)
+            mejor_iou = np.mean([max((iou(r, b) for b in faces), default=0.0) for r in detectables]) if detectables else 0.0
+            print(f"{'':<32} {nombre:<16} {t * 1000:8.1f} {t_full / t:7.1f}x {len(faces):>6} "
+                  f"{encontrados_todas:>3}/{len(reference):<3} {encontrados:>3}/{len(detectables):<3} {mejor_iou:5.2f}")
+
+    print()
+    for nombre, (todas, total, detectables, total_detectables) in totales.items():
+        porcentaje = 100.0 * todas / total if total else 0.0
+        porcentaje_detectables = 100.0 * detectables / total_detectables if total_detectables else 0.0
+        print(f"📊 Recall {nombre:<16} todas {todas}/{total} ({porcentaje:.0f}%), "
+              f"detectables tras reducir {detectables}/{total_detectables} ({porcentaje_detectables:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark: chunks de mel-espectrograma del bucle original vs el front-end vectorizado
+Uso: python benchmarks/bench_mel_features.py [audio.wav] [repeticiones]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'extras'))
+
+from audio_features import melspectrogram, mel_chunks
+from audio_io import load_audio
+
+
+def mel_chunks_bucle_original(duration, fps=25):
+    """Copia del bucle triple de Wav2LipMejorado.load_audio_features (antes de vectorizar)"""
+    total_frames = int(duration * fps)
+    mel_chunks_lista = []
+    for i in range(total_frames):
+        time_s = i / fps
+        mel = np.zeros((80, 16))
+        for freq in range(80):
+            for t in range(16):
+                intensity = np.sin((time_s + t/16) * (freq/10 + 1) * 2 * np.pi) * 0.5 + 0.5
+                noise = np.random.normal(0, 0.1)
+                mel[freq, t] = np.clip(intensity + noise, 0, 1)
+        mel_chunks_lista.append(mel)
+    return np.array(mel_chunks_lista)
+
+
+def mel_chunks_vectorizado(audio_path, fps=25):
+    samples, sr = load_audio(audio_path)
+    mel = melspectrogram(samples, sr)
+    return mel_chunks(mel, int(len(samples) / sr * fps), fps=fps)
+
+
+def cronometrar(fn, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = fn()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos), resultado
+
+
+def main():
+    audio = sys.argv[1] if len(sys.argv) > 1 else os.path.join(BASE_DIR, 'hola_ejemplo.wav')
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    samples, sr = load_audio(audio)
+    duration = len(samples) / sr
+    print(f"🎵 Audio: {os.path.basename(audio)} ({duration:.2f} s, {sr} Hz)")
+
+    t_bucle, legacy = cronometrar(lambda: mel_chunks_bucle_original(duration), 1)
+    t_vec, chunks = cronometrar(lambda: mel_chunks_vectorizado(audio), repeticiones)
+
+    print(f"🐢 Bucle original:  {t_bucle * 1000:9.1f} ms  {legacy.shape}")
+    print(f"🚀 Vectorizado:     {t_vec * 1000:9.1f} ms  {chunks.shape}")
+    print(f"⚡ Aceleración:     {t_bucle / t_vec:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark: curva calidad/velocidad del atlas de boca según el número de estados K
+Compara el render por frame de Wav2LipSimple con la búsqueda en atlas (PSNR de la ROI de la boca).
+Uso: python benchmarks/bench_mouth_atlas.py [imagen] [audio.wav]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import cv2
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'extras'))
+
+from audio_features import intensity_envelope
+from audio_io import load_audio
+from mouth_atlas import MouthAtlas
+from wav2lip_simple import Wav2LipSimple
+
+
+def psnr(a, b):
+    mse = np.mean((a.astype(np.float64) - b.astype(np.float64)) ** 2)
+    return float('inf') if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+
+def main():
+    imagen = sys.argv[1] if len(sys.argv) > 1 else os.path.join(BASE_DIR, 'woman-3584435_1280.jpg')
+    audio = sys.argv[2] if len(sys.argv) > 2 else os.path.join(BASE_DIR, 'hola_ejemplo.wav')
+
+    wav2lip = Wav2LipSimple(atlas_levels=None)
+    image = cv2.imread(imagen)
+    face, mouth_region = wav2lip.detect_face_and_mouth(image)
+    if face is None:
+        print("❌ No se detectó cara en la imagen")
+        return
+    x, y, w, h = mouth_region
+    mouth_roi = image[y:y+h, x:x+w]
+
+    samples, sr = load_audio(audio)
+    intensities = intensity_envelope(samples, sr)
+    n = len(intensities)
+    print(f"🖼️  ROI de boca: {w}x{h} px, {n} frames")
+
+    # Referencia: render completo del parche en cada frame
+    inicio = time.perf_counter()
+    reference = [wav2lip.render_mouth_patch(mouth_roi, v) for v in intensities]
+    t_ref = (time.perf_counter() - inicio) / n
+    print(f"🎨 Render por frame: {t_ref * 1e6:8.1f} µs/frame")
+    print()
+    print(f"{'K':>4} {'build ms':>9} {'µs/frame':>9} {'speedup':>8} {'PSNR dB':>8} {'KB':>7}")
+
+    canvas = image.copy()
+    for levels in (2, 4, 8, 16, 32, 64):
+        inicio = time.perf_counter()
+        atlas = MouthAtlas(lambda v: wav2lip.render_mouth_patch(mouth_roi, v), levels)
+        t_build = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        states = atlas.indices(intensities)
+        for s in states:
+            canvas[y:y+h, x:x+w] = atlas.patches[s]
+        t_frame = (time.perf_counter() - inicio) / n
+
+        calidad = np.mean([min(psnr(atlas.patches[s], ref), 99.0) for s, ref in zip(states, reference)])
+        print(f"{levels:>4} {t_build * 1000:9.2f} {t_frame * 1e6:9.1f} {t_ref / t_frame:7.1f}x "
+              f"{calidad:8.2f} {atlas.nbytes / 1024:7.0f}")
+
+
+if __name__ == "__main__":
+    main()
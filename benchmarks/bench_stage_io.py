@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark: decodificaciones/codificaciones ahorradas al pasar la imagen en memoria entre etapas
+Antes: detectar_cara_opencv y procesar_imagen_cartoon leían la imagen cada uno, se escribía
+_cartoon.jpg y el motor (o ffmpeg, en cada frame del bucle) volvía a decodificarlo.
+Ahora: una sola decodificación y ndarray en memoria hasta el encoder.
+Uso: python benchmarks/bench_stage_io.py [imagen] [audio.wav]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'extras'))
+
+from video_sink import ffmpeg_disponible, write_still_video
+
+REPEATS = 5
+
+
+def mejor_tiempo(fn):
+    mejor = float('inf')
+    for _ in range(REPEATS):
+        inicio = time.perf_counter()
+        fn()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    imagen = sys.argv[1] if len(sys.argv) > 1 else os.path.join(BASE_DIR, 'woman-3584435_1280.jpg')
+    audio = sys.argv[2] if len(sys.argv) > 2 else os.path.join(BASE_DIR, 'hola_ejemplo.wav')
+    img = cv2.imread(imagen)
+    h, w = img.shape[:2]
+    print(f"🖼️  {os.path.basename(imagen)}: {w}x{h}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cartoon_path = os.path.join(tmp, 'cartoon.jpg')
+        t_decode = mejor_tiempo(lambda: cv2.imread(imagen))
+        t_encode = mejor_tiempo(lambda: cv2.imwrite(cartoon_path, img))
+        t_redecode = mejor_tiempo(lambda: cv2.imread(cartoon_path))
+
+        # Antes: 2 lecturas de la entrada + escritura del cartoon + relectura en el motor
+        antes = 2 * t_decode + t_encode + t_redecode
+        # Ahora: una lectura; el cartoon se pasa como ndarray
+        ahora = t_decode
+        print(f"📥 Decodificar entrada:   {t_decode * 1000:7.1f} ms")
+        print(f"📤 Codificar cartoon.jpg: {t_encode * 1000:7.1f} ms")
+        print(f"📥 Releer cartoon.jpg:    {t_redecode * 1000:7.1f} ms")
+        print(f"⏱️  E/S de imagen por petición: antes {antes * 1000:.1f} ms, ahora {ahora * 1000:.1f} ms "
+              f"(ahorro {(antes - ahora) * 1000:.1f} ms)")
+
+        if ffmpeg_disponible() is None or not os.path.exists(audio):
+            print("⚠️  ffmpeg o audio no disponibles: se omite la comparación del video básico")
+            return
+
+        # Video básico: ffmpeg -loop 1 re-decodifica el JPEG en cada frame vs frame crudo por stdin
+        salida = os.path.join(tmp, 'salida.mp4')
+        cmd = ['ffmpeg', '-y', '-v', 'error', '-loop', '1', '-i', cartoon_path, '-i', audio,
+               '-c:v', 'libx264', '-tune', 'stillimage', '-c:a', 'aac', '-b:a', '192k',
+               '-pix_fmt', 'yuv420p', '-shortest', salida]
+        inicio = time.perf_counter()
+        subprocess.run(cmd, check=True, capture_output=True)
+        t_jpeg = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        write_still_video(img, salida, audio)
+        t_raw = time.perf_counter() - inicio
+        print(f"🎥 Video básico: JPEG en bucle {t_jpeg:.2f} s, frame crudo {t_raw:.2f} s "
+              f"(ahorro {t_jpeg - t_raw + t_encode:.2f} s incluyendo la escritura del JPEG)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: síntesis con pyttsx3.init() por petición vs procesos TTS persistentes
+Mide la latencia por petición corta con el motor en frío y con el pool (1 y N procesos),
+separando tiempo en cola y tiempo de síntesis.
+Uso: python benchmarks/bench_tts_pool.py [peticiones] [procesos]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'extras'))
+
+from tts_worker import TTSPool, describe_stats
+
+FRASES = [
+    "Hola, soy tu avatar virtual.",
+    "Esta es una prueba corta de síntesis.",
+    "La sincronización de labios funciona correctamente.",
+    "Gracias por usar el sistema.",
+]
+
+
+def en_frio(textos, tmp):
+    """Comportamiento anterior: un motor nuevo por petición"""
+    import pyttsx3
+    for i, texto in enumerate(textos):
+        engine = pyttsx3.init()
+        engine.setProperty('rate', 150)
+        engine.save_to_file(texto, os.path.join(tmp, f"frio_{i}.wav"))
+        engine.runAndWait()
+        engine.stop()
+
+
+def con_pool(textos, tmp, workers):
+    with TTSPool(workers) as pool:
+        # Esperar a que los motores estén listos: la inicialización no cuenta por petición
+        pool.voices()
+        inicio = time.perf_counter()
+        futures = [pool.submit(t, os.path.join(tmp, f"pool{workers}_{i}.wav")) for i, t in enumerate(textos)]
+        for future in futures:
+            future.result()
+        total = time.perf_counter() - inicio
+        print(f"   {describe_stats(pool)}")
+        print("   Inicialización de motores: "
+              + ", ".join(f"{s * 1000:.0f} ms" for s in pool.stats()['init_s'].values()))
+    return total
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else max(2, min(4, os.cpu_count() or 1))
+    textos = [FRASES[i % len(FRASES)] for i in range(n)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inicio = time.perf_counter()
+        en_frio(textos, tmp)
+        t_frio = time.perf_counter() - inicio
+        print(f"🥶 init por petición:   {t_frio:6.2f} s ({t_frio / n * 1000:.0f} ms/petición)")
+
+        for w in (1, workers):
+            t = con_pool(textos, tmp, w)
+            print(f"🔥 pool de {w} proceso(s): {t:6.2f} s ({t / n * 1000:.0f} ms/petición, {t_frio / t:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: inferencia Wav2Lip frame a frame vs por lotes, con un modelo de pesos aleatorios
+(misma arquitectura y coste que el checkpoint oficial, sin necesidad de descargarlo).
+También mide lo que cuesta cargar el checkpoint: con `python inference.py` se pagaba en cada
+video, con el motor en proceso solo una vez, y comprueba de extremo a extremo que
+generate_frames() entrega un frame por mel-chunk, del tamaño de la entrada, a través de los lotes.
+Uso: python benchmarks/bench_wav2lip_inference.py [frames] [tamaño de lote ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, 'extras'))
+
+from wav2lip_inference import IMG_SIZE, random_inference_engine
+from wav2lip_model import load_checkpoint
+
+FRAMES = 128
+BATCH_SIZES = [1, 16, 128]
+# Comprobación de extremo a extremo: lotes pequeños para cruzar varios límites de lote
+CHECK_FRAMES = 37
+CHECK_BATCH_SIZE = 16
+CHECK_SHAPE = (180, 240, 3)
+CHECK_BOX = [60, 40, 180, 160]
+
+
+def tiempo_carga(engine):
+    """Guardar el modelo como un checkpoint oficial y medir torch.load + load_state_dict"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'wav2lip_random.pth')
+        torch.save({'state_dict': engine.model.state_dict()}, path)
+        inicio = time.perf_counter()
+        load_checkpoint(path)
+        return time.perf_counter() - inicio, os.path.getsize(path) / 1e6
+
+
+def comprobar_frames(rng):
+    """generate_frames() con imagen fija y con video: N frames de salida con la forma de la entrada"""
+    engine = random_inference_engine(batch_size=CHECK_BATCH_SIZE)
+    mels = rng.uniform(-4, 4, (CHECK_FRAMES, 80, 16)).astype(np.float32)
+    imagen = rng.integers(0, 256, CHECK_SHAPE, dtype=np.uint8)
+    video = [rng.integers(0, 256, CHECK_SHAPE, dtype=np.uint8) for _ in range(3)]
+    x1, y1, x2, y2 = CHECK_BOX
+    for nombre, frames, boxes, still in (('imagen', [imagen], [CHECK_BOX], True),
+                                         ('video', video, [CHECK_BOX] * len(video), False)):
+        n = 0
+        fuera = np.ones(CHECK_SHAPE[:2], bool)
+        fuera[y1:y2, x1:x2] = False
+        for i, frame in enumerate(engine.generate_frames(frames, boxes, mels, still)):
+            original = frames[0] if still else frames[i % len(frames)]
+            assert frame.shape == CHECK_SHAPE and frame.dtype == np.uint8, f"{nombre}: forma {frame.shape}"
+            # Solo cambia la caja de la cara; el resto del frame queda intacto
+            assert np.array_equal(frame[fuera], original[fuera]), f"{nombre}: frame {i} alterado fuera de la caja"
+            n += 1
+        assert n == CHECK_FRAMES, f"{nombre}: {n} frames para {CHECK_FRAMES} mel-chunks"
+        print(f"✅ {nombre}: {n} frames {CHECK_SHAPE[1]}x{CHECK_SHAPE[0]} "
+              f"en lotes de {CHECK_BATCH_SIZE}, uno por mel-chunk")
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else FRAMES
+    batch_sizes = [int(v) for v in sys.argv[2:]] or BATCH_SIZES
+    engine = random_inference_engine()
+    rng = np.random.default_rng(0)
+    mels = rng.uniform(-4, 4, (frames, 80, 16)).astype(np.float32)
+    face = rng.random((1, 6, IMG_SIZE, IMG_SIZE), dtype=np.float32)
+
+    comprobar_frames(rng)
+
+    carga_s, mb = tiempo_carga(engine)
+    print(f"🧠 Carga del checkpoint ({mb:.0f} MB): {carga_s:.2f} s por video con inference.py, "
+          f"una sola vez en proceso ({torch.get_num_threads()} hilo(s) de torch)")
+
+    # Calentamiento: la primera pasada reserva memoria y elige kernels
+    engine.predict(face, mels[:min(frames, 8)])
+    base = None
+    for batch_size in batch_sizes:
+        inicio = time.perf_counter()
+        for start in range(0, frames, batch_size):
+            engine.predict(face, mels[start:start + batch_size])
+        elapsed = time.perf_counter() - inicio
+        base = base or elapsed
+        print(f"   lote {batch_size:>4}: {elapsed:6.2f} s  {frames / elapsed:6.1f} frames/s  {base / elapsed:4.1f}x")
+
+
+if __name__ == "__main__":
+    main()
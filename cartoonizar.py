@@ -1,42 +1,213 @@
+#!/usr/bin/env python3
+"""
+CARTOONIZAR - Efecto cartoon por lotes desde línea de comandos (sin GUI)
+Acepta imágenes, directorios o patrones glob; reparte las imágenes entre un pool de procesos y
+omite las salidas ya al día según el hash del contenido de la entrada y de los parámetros.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
 import cv2
 import numpy as np
 
-def cartoonify_image(img_path):
-    # Leer la imagen
-    img = cv2.imread(img_path)
-    if img is None:
-        print(f"Error: No se pudo cargar la imagen en {img_path}")
-        return
-
-    # 1. Convertir a escala de grises
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-
-    # 2. Desenfoque mediano para suavizar
-    gray = cv2.medianBlur(gray, 5)
-
-    # 3. Detección de bordes (líneas tipo dibujo)
-    edges = cv2.adaptiveThreshold(
-        gray, 255,
-        cv2.ADAPTIVE_THRESH_MEAN_C,
-        cv2.THRESH_BINARY,
-        9, 9
-    )
+# El efecto cartoon vive en extras/cartoon.py (compartido con la CLI y las GUIs)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_DIR, 'extras'))
+from cartoon import DEFAULT_PRESET, DEFAULT_TILE_SIZE, PRESETS, cache_params, cartoonify_image
+from feature_cache import FeatureCache
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff'}
+MANIFEST_NAME = '.cartoon_manifest.json'
+DEFAULT_OUTPUT_DIR = os.path.join(BASE_DIR, "resultados", "cartoon")
+
+def buscar_imagenes(entradas, recursivo=False):
+    """Archivos de imagen de una lista de rutas, directorios o patrones glob (ordenados, sin duplicados)"""
+    encontrados = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            patron = os.path.join(entrada, '**', '*') if recursivo else os.path.join(entrada, '*')
+            candidatos = glob.glob(patron, recursive=recursivo)
+        elif glob.has_magic(entrada):
+            candidatos = glob.glob(entrada, recursive=True)
+        else:
+            candidatos = [entrada]
+        encontrados += [c for c in candidatos
+                        if os.path.isfile(c) and Path(c).suffix.lower() in IMAGE_EXTENSIONS]
+    return sorted(set(os.path.abspath(c) for c in encontrados))
+
+def nombres_salida(imagenes, salida_dir):
+    """Ruta de salida [nombre]_cartoon[.ext] por imagen; los nombres repetidos llevan sufijo"""
+    usados = set()
+    salidas = []
+    for imagen in imagenes:
+        stem, ext = Path(imagen).stem, Path(imagen).suffix.lower()
+        nombre = f"{stem}_cartoon{ext}"
+        n = 1
+        while nombre in usados:
+            n += 1
+            nombre = f"{stem}_{n}_cartoon{ext}"
+        usados.add(nombre)
+        salidas.append(os.path.join(salida_dir, nombre))
+    return salidas
+
+def cargar_manifiesto(salida_dir):
+    """Hash de entrada + parámetros con el que se generó cada salida"""
+    try:
+        with open(os.path.join(salida_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def guardar_manifiesto(salida_dir, manifiesto):
+    tmp_path = os.path.join(salida_dir, MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, os.path.join(salida_dir, MANIFEST_NAME))
 
-    # 4. Filtro bilateral (suaviza colores sin borrar bordes)
-    color = cv2.bilateralFilter(img, 9, 250, 250)
+def iniciar_proceso():
+    """Inicializador del pool: sin el pool de hilos propio de OpenCV (un hilo por núcleo en cada proceso)"""
+    cv2.setNumThreads(1)
+
+def procesar_una(imagen, salida, params, clave_previa, preset, tile_size, calidad):
+    """
+    Proceso del pool: leer los bytes una vez, calcular la clave y, si la salida no está al día,
+    decodificar, aplicar el cartoon y escribir de forma atómica.
+    Devuelve (imagen, salida, clave, estado, segundos, megapíxeles, error)
+    """
+    inicio = time.perf_counter()
+    try:
+        with open(imagen, 'rb') as f:
+            data = f.read()
+        clave = FeatureCache.make_key(data, params)
+        if clave == clave_previa and os.path.exists(salida):
+            return imagen, salida, clave, 'omitida', time.perf_counter() - inicio, 0.0, None
+
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError("no se pudo decodificar la imagen")
+        # Un hilo por proceso: el paralelismo ya lo da el pool
+        cartoon = cartoonify_image(img, preset, tile_size=tile_size, threads=1)
+
+        ext = Path(salida).suffix
+        tmp_path = f"{salida[:-len(ext)]}.tmp{ext}"
+        opciones = [cv2.IMWRITE_JPEG_QUALITY, calidad] if ext in ('.jpg', '.jpeg') else []
+        if not cv2.imwrite(tmp_path, cartoon, opciones):
+            raise OSError(f"no se pudo escribir {tmp_path}")
+        os.replace(tmp_path, salida)
+        megapixeles = img.shape[0] * img.shape[1] / 1e6
+        return imagen, salida, clave, 'procesada', time.perf_counter() - inicio, megapixeles, None
+    except Exception as e:
+        return imagen, salida, None, 'error', time.perf_counter() - inicio, 0.0, f"{type(e).__name__}: {e}"
+
+def cartoonizar_lote(entradas, salida_dir=DEFAULT_OUTPUT_DIR, preset=DEFAULT_PRESET, procesos=None,
+                     recursivo=False, forzar=False, tile_size=None, calidad=95):
+    """Procesar todas las imágenes de `entradas`; devuelve el resumen del lote (dict)"""
+    imagenes = buscar_imagenes(entradas, recursivo)
+    if not imagenes:
+        print("❌ No se encontraron imágenes en las entradas indicadas")
+        return None
+    os.makedirs(salida_dir, exist_ok=True)
+    salidas = nombres_salida(imagenes, salida_dir)
+    manifiesto = {} if forzar else cargar_manifiesto(salida_dir)
+    # La calidad JPEG y las teselas también cambian los bytes de salida: forman parte de la clave
+    params = {**cache_params(preset), 'calidad': calidad, 'tile_size': tile_size}
+    procesos = procesos or os.cpu_count() or 1
+    print(f"🎨 {len(imagenes)} imagen(es), preset '{preset}', {procesos} proceso(s) -> {salida_dir}")
+
+    resumen = {'procesadas': 0, 'omitidas': 0, 'errores': 0, 'megapixeles': 0.0}
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=min(procesos, len(imagenes)), initializer=iniciar_proceso) as pool:
+        futures = [
+            pool.submit(procesar_una, imagen, salida, params, manifiesto.get(os.path.basename(salida)),
+                        preset, tile_size, calidad)
+            for imagen, salida in zip(imagenes, salidas)
+        ]
+        for future in as_completed(futures):
+            imagen, salida, clave, estado, segundos, megapixeles, error = future.result()
+            nombre = os.path.basename(salida)
+            if estado == 'error':
+                resumen['errores'] += 1
+                manifiesto.pop(nombre, None)
+                print(f"❌ {imagen}: {error}")
+                continue
+            manifiesto[nombre] = clave
+            if estado == 'omitida':
+                resumen['omitidas'] += 1
+            else:
+                resumen['procesadas'] += 1
+                resumen['megapixeles'] += megapixeles
+                print(f"✅ {nombre} ({megapixeles:.1f} MP, {segundos:.2f} s)")
+    resumen['segundos'] = time.perf_counter() - inicio
+    guardar_manifiesto(salida_dir, manifiesto)
+
+    segundos = resumen['segundos']
+    print(f"\n📊 {resumen['procesadas']} procesadas, {resumen['omitidas']} al día (omitidas), "
+          f"{resumen['errores']} con error en {segundos:.2f} s")
+    if resumen['procesadas'] and segundos > 0:
+        print(f"⚡ {resumen['procesadas'] / segundos:.2f} imágenes/s, {resumen['megapixeles'] / segundos:.1f} MP/s")
+    return resumen
+
+def main():
+    """
+    Función principal que maneja argumentos de línea de comandos
+    """
+    parser = argparse.ArgumentParser(
+        description="🎨 CARTOONIZAR - Efecto cartoon por lotes",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Ejemplos de uso:
+  python cartoonizar.py woman-3584435_1280.jpg
+  python cartoonizar.py fotos/ --salida resultados/cartoon --procesos 8
+  python cartoonizar.py "fotos/**/*.png" --preset rapido
+  python cartoonizar.py woman-3584435_1280.jpg --mostrar
+        """
+    )
+    parser.add_argument('entradas', nargs='*', default=[os.path.join(BASE_DIR, 'woman-3584435_1280.jpg')],
+                        help='Imágenes, directorios o patrones glob (por defecto: la imagen de ejemplo)')
+    parser.add_argument('--salida', default=DEFAULT_OUTPUT_DIR,
+                        help='Directorio de salida (por defecto: resultados/cartoon)')
+    parser.add_argument('--preset', choices=list(PRESETS), default=DEFAULT_PRESET,
+                        help=f'Preset del efecto cartoon (por defecto: {DEFAULT_PRESET})')
+    parser.add_argument('--procesos', type=int, default=None,
+                        help='Procesos del pool (por defecto: uno por CPU)')
+    parser.add_argument('--recursivo', action='store_true',
+                        help='Recorrer también los subdirectorios de los directorios de entrada')
+    parser.add_argument('--forzar', action='store_true',
+                        help='Reprocesar aunque la salida esté al día')
+    parser.add_argument('--teselas', type=int, default=None,
+                        help=f'Lado de tesela en px para imágenes grandes; 0 = nunca (por defecto: automático, {DEFAULT_TILE_SIZE} px desde 20 MP)')
+    parser.add_argument('--calidad', type=int, default=95,
+                        help='Calidad JPEG de las salidas .jpg (por defecto: 95)')
+    parser.add_argument('--mostrar', action='store_true',
+                        help='Mostrar el original y el resultado en ventanas al terminar (requiere entorno gráfico)')
+    args = parser.parse_args()
 
-    # 5. Combinar colores suavizados + bordes
-    cartoon = cv2.bitwise_and(color, color, mask=edges)
+    if args.procesos is not None and args.procesos < 1:
+        parser.error("--procesos debe ser 1 o mayor")
+    if args.teselas is not None and args.teselas < 0:
+        parser.error("--teselas debe ser 0 o mayor")
 
-    # Mostrar resultados
-    cv2.imshow("Original", img)
-    cv2.imshow("Cartoon", cartoon)
-    cv2.imwrite("imagen_cartoonizada.jpg", cartoon)
-    print("✅ Imagen cartoonizada guardada como 'imagen_cartoonizada.jpg'")
+    resumen = cartoonizar_lote(args.entradas, args.salida, preset=args.preset, procesos=args.procesos,
+                               recursivo=args.recursivo, forzar=args.forzar, tile_size=args.teselas,
+                               calidad=args.calidad)
+    if resumen is None:
+        return False
 
-    cv2.waitKey(0)
-    cv2.destroyAllWindows()
+    if args.mostrar:
+        imagenes = buscar_imagenes(args.entradas, args.recursivo)
+        for imagen, salida in zip(imagenes, nombres_salida(imagenes, args.salida)):
+            cv2.imshow("Original", cv2.imread(imagen))
+            cv2.imshow("Cartoon", cv2.imread(salida))
+            cv2.waitKey(0)
+        cv2.destroyAllWindows()
+    return resumen['errores'] == 0
 
-# Usa tu propia imagen
-imagen_de_entrada = 'woman-3584435_1280.jpg'
-cartoonify_image(imagen_de_entrada)
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
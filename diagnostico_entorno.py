@@ -8,6 +8,8 @@ import importlib
 import platform
 import os
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "extras"))
+
 def verificar_libreria(nombre, importar_como=None):
     """Verificar si una librería está disponible"""
     try:
@@ -21,6 +23,29 @@ def verificar_libreria(nombre, importar_como=None):
     except ImportError:
         return False, None
 
+def medir_detectores(disponibles):
+    """Cargar los detectores del registro compartido y devolver sus tiempos de inicialización"""
+    from detector_registry import get_face_mesh, get_haar_cascade, init_stats
+    
+    print("\n⏱️  INICIALIZACIÓN DE DETECTORES:")
+    if "OpenCV" in disponibles:
+        try:
+            get_haar_cascade()
+        except Exception as e:
+            print(f"❌ Haar cascade: {e}")
+    if "MediaPipe" in disponibles:
+        try:
+            get_face_mesh()
+        except Exception as e:
+            print(f"❌ FaceMesh: {e}")
+    
+    stats = init_stats()
+    for nombre, datos in stats.items():
+        print(f"✅ {nombre:<40} {datos['total_s'] * 1000:8.1f} ms")
+    if not stats:
+        print("⚠️  Ningún detector disponible")
+    return stats
+
 def diagnostico_completo():
     """Ejecutar diagnóstico completo del entorno"""
     print("🔍 DIAGNÓSTICO DEL ENTORNO")
@@ -69,6 +94,8 @@ def diagnostico_completo():
     print(f"✅ Disponibles: {len(disponibles)}")
     print(f"❌ Faltantes: {len(no_disponibles)}")
     
+    detectores = medir_detectores(disponibles)
+    
     # Recomendaciones
     print(f"\n💡 RECOMENDACIONES:")
     
@@ -108,6 +135,7 @@ def diagnostico_completo():
     return {
         "disponibles": disponibles,
         "no_disponibles": no_disponibles,
+        "detectores": detectores,
         "python_version": sys.version,
         "sistema": platform.system()
     }
@@ -0,0 +1,189 @@
+"""
+AUDIO FEATURES - Mel-espectrogramas reales vectorizados con NumPy
+Front-end de audio con los mismos hiperparámetros que Wav2Lip (16 kHz, 80 mels, hop 200)
+pero sin depender de librosa: STFT por ventanas con strides + banco de filtros mel.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Hiperparámetros del Wav2Lip original (hparams.py)
+SAMPLE_RATE = 16000
+N_FFT = 800
+HOP_SIZE = 200
+WIN_SIZE = 800
+NUM_MELS = 80
+FMIN = 55
+FMAX = 7600
+PREEMPHASIS = 0.97
+REF_LEVEL_DB = 20
+MIN_LEVEL_DB = -100
+MEL_STEP_SIZE = 16
+
+# Frames de mel por segundo de audio (16000 / 200)
+MEL_FPS = SAMPLE_RATE / HOP_SIZE
+
+
+def resample(samples, sr_orig, sr_target=SAMPLE_RATE):
+    """Remuestrear por interpolación lineal (suficiente para features de voz)"""
+    if sr_orig == sr_target or len(samples) == 0:
+        return samples.astype(np.float32, copy=False)
+    n_out = int(round(len(samples) * sr_target / sr_orig))
+    t_out = np.arange(n_out, dtype=np.float64) * (sr_orig / sr_target)
+    return np.interp(t_out, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def _hz_to_mel(freqs):
+    """Escala mel de Slaney (la que usa librosa por defecto)"""
+    freqs = np.asanyarray(freqs, dtype=np.float64)
+    f_sp = 200.0 / 3
+    mels = freqs / f_sp
+    min_log_hz = 1000.0
+    min_log_mel = min_log_hz / f_sp
+    logstep = np.log(6.4) / 27.0
+    log_t = freqs >= min_log_hz
+    mels = np.where(log_t, min_log_mel + np.log(np.maximum(freqs, min_log_hz) / min_log_hz) / logstep, mels)
+    return mels
+
+
+def _mel_to_hz(mels):
+    mels = np.asanyarray(mels, dtype=np.float64)
+    f_sp = 200.0 / 3
+    freqs = f_sp * mels
+    min_log_hz = 1000.0
+    min_log_mel = min_log_hz / f_sp
+    logstep = np.log(6.4) / 27.0
+    log_t = mels >= min_log_mel
+    freqs = np.where(log_t, min_log_hz * np.exp(logstep * (mels - min_log_mel)), freqs)
+    return freqs
+
+
+@lru_cache(maxsize=8)
+def mel_filterbank(sr=SAMPLE_RATE, n_fft=N_FFT, n_mels=NUM_MELS, fmin=FMIN, fmax=FMAX):
+    """Banco de filtros mel triangulares normalizados (Slaney), forma (n_mels, 1 + n_fft // 2)"""
+    fft_freqs = np.linspace(0, sr / 2, 1 + n_fft // 2)
+    mel_pts = np.linspace(_hz_to_mel(fmin), _hz_to_mel(fmax), n_mels + 2)
+    hz_pts = _mel_to_hz(mel_pts)
+
+    fdiff = np.diff(hz_pts)
+    ramps = hz_pts[:, None] - fft_freqs[None, :]
+    lower = -ramps[:-2] / fdiff[:-1, None]
+    upper = ramps[2:] / fdiff[1:, None]
+    weights = np.maximum(0, np.minimum(lower, upper))
+
+    enorm = 2.0 / (hz_pts[2:n_mels + 2] - hz_pts[:n_mels])
+    weights *= enorm[:, None]
+    weights = weights.astype(np.float32)
+    weights.setflags(write=False)
+    return weights
+
+
+@lru_cache(maxsize=4)
+def _hann_window(win_size):
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(win_size) / win_size)).astype(np.float32)
+    window.setflags(write=False)
+    return window
+
+
+def stft_magnitude(samples, n_fft=N_FFT, hop_size=HOP_SIZE, win_size=WIN_SIZE):
+    """Magnitud de la STFT centrada, forma (1 + n_fft // 2, T)"""
+    pad = n_fft // 2
+    if len(samples) <= pad:
+        samples = np.pad(samples, (0, pad + 1 - len(samples)))
+    y = np.pad(samples, pad, mode='reflect')
+
+    # Vista (T, n_fft) sobre el buffer original, sin copiar
+    frames = sliding_window_view(y, n_fft)[::hop_size]
+
+    window = _hann_window(win_size)
+    if win_size < n_fft:
+        lpad = (n_fft - win_size) // 2
+        window = np.pad(window, (lpad, n_fft - win_size - lpad))
+
+    spec = np.fft.rfft(frames * window, n=n_fft, axis=1)
+    return np.abs(spec).T.astype(np.float32)
+
+
+def melspectrogram(samples, sr=SAMPLE_RATE):
+    """Mel-espectrograma normalizado a [0, 1], forma (NUM_MELS, T) con T = 80 frames por segundo"""
+    samples = resample(np.asarray(samples, dtype=np.float32), sr, SAMPLE_RATE)
+
+    # Preénfasis: y[n] - 0.97 * y[n-1]
+    emphasized = np.empty_like(samples)
+    if len(samples):
+        emphasized[0] = samples[0]
+        emphasized[1:] = samples[1:] - PREEMPHASIS * samples[:-1]
+
+    magnitude = stft_magnitude(emphasized)
+    mel = mel_filterbank() @ magnitude
+
+    db = 20 * np.log10(np.maximum(1e-5, mel)) - REF_LEVEL_DB
+    return np.clip((db - MIN_LEVEL_DB) / -MIN_LEVEL_DB, 0, 1).astype(np.float32)
+
+
+def mel_chunks(mel, n_frames, fps=25, step=MEL_STEP_SIZE):
+    """
+    Cortar el mel-espectrograma en ventanas de `step` columnas alineadas a cada frame de video.
+    Devuelve un único array (n_frames, NUM_MELS, step).
+    """
+    if mel.shape[1] < step:
+        mel = np.pad(mel, ((0, 0), (0, step - mel.shape[1])))
+
+    # Ventanas deslizantes como vista (T - step + 1, NUM_MELS, step)
+    windows = sliding_window_view(mel, step, axis=1).transpose(1, 0, 2)
+
+    # Igual que Wav2Lip: inicio = int(i * 80 / fps), el último chunk se ajusta al final
+    starts = (np.arange(n_frames) * (MEL_FPS / fps)).astype(np.int64)
+    np.minimum(starts, len(windows) - 1, out=starts)
+    return windows[starts]
+
+
+def frame_rms(samples, sr, fps=25, block_frames=250):
+    """
+    Energía RMS por frame de video, con ventanas de sr/fps muestras alineadas al fps de salida.
+    Recorre el buffer una sola vez por bloques de `block_frames` frames (memoria acotada).
+    """
+    n_frames = int(len(samples) / sr * fps)
+    bounds = np.round(np.arange(n_frames + 1) * (sr / fps)).astype(np.int64)
+    rms = np.empty(n_frames, dtype=np.float32)
+
+    for start in range(0, n_frames, block_frames):
+        stop = min(start + block_frames, n_frames)
+        block = samples[bounds[start]:bounds[stop]]
+        local = bounds[start:stop] - bounds[start]
+        energy = np.add.reduceat(np.square(block, dtype=np.float64), local)
+        counts = np.maximum(np.diff(bounds[start:stop + 1]), 1)
+        rms[start:stop] = np.sqrt(energy / counts)
+
+    return rms
+
+
+def moving_average(values, window):
+    """Media móvil centrada de ventana `window` en O(N) con suma acumulada"""
+    values = np.asarray(values, dtype=np.float64)
+    if window <= 1 or len(values) == 0:
+        return values.astype(np.float32)
+    left = (window - 1) // 2
+    padded = np.pad(values, (left, window - 1 - left), mode='edge')
+    csum = np.cumsum(padded)
+    csum = np.concatenate(([0.0], csum))
+    return ((csum[window:] - csum[:-window]) / window).astype(np.float32)
+
+
+def intensity_envelope(samples, sr, fps=25, floor_db=-40.0, smooth_frames=3):
+    """
+    Intensidad de boca en [0, 1] por frame a partir de la energía real del audio.
+    Se normaliza en dB respecto al pico: por debajo de `floor_db` (silencio) la boca queda cerrada.
+    """
+    rms = frame_rms(samples, sr, fps)
+    if len(rms) == 0:
+        return rms
+    peak = float(rms.max())
+    if peak <= 0:
+        return np.zeros_like(rms)
+
+    db = 20 * np.log10(np.maximum(rms / peak, 1e-10))
+    intensity = np.clip((db - floor_db) / -floor_db, 0, 1)
+    return moving_average(intensity, smooth_frames)
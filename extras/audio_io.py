@@ -0,0 +1,167 @@
+"""
+AUDIO IO - Cargador de audio compartido por todos los motores de lip-sync
+WAV se lee de forma nativa parseando la cabecera RIFF; cualquier otro formato se decodifica
+con un único proceso ffmpeg que escribe PCM float32 directamente a un pipe.
+El audio también puede circular en memoria como tupla (muestras float32 mono, sample_rate),
+p. ej. la salida del TTS, sin escribir ni volver a leer un WAV.
+"""
+
+import shutil
+import struct
+import subprocess
+
+import numpy as np
+
+# Frecuencia a la que ffmpeg entrega el PCM de formatos no-WAV (la del front-end mel)
+DEFAULT_SAMPLE_RATE = 16000
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def is_wav(data):
+    """Comprobar la firma RIFF/WAVE de un buffer de bytes"""
+    return len(data) >= 12 and data[:4] == b'RIFF' and data[8:12] == b'WAVE'
+
+
+def _pcm_to_float32(raw, fmt, sampwidth):
+    """Convertir bytes PCM intercalados a float32 en [-1, 1]"""
+    if fmt == WAVE_FORMAT_IEEE_FLOAT:
+        dtype = '<f4' if sampwidth == 4 else '<f8'
+        return np.frombuffer(raw, dtype=dtype).astype(np.float32)
+    if sampwidth == 1:
+        return (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    if sampwidth == 2:
+        return np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768.0
+    if sampwidth == 3:
+        # 24 bits: colocar los 3 bytes en la parte alta de un int32 y desplazar con signo
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = (b[:, 0] << 8) | (b[:, 1] << 16) | (b[:, 2] << 24)
+        return (ints >> 8).astype(np.float32) / 8388608.0
+    if sampwidth == 4:
+        return np.frombuffer(raw, dtype='<i4').astype(np.float32) / 2147483648.0
+    raise ValueError(f"Ancho de muestra no soportado: {sampwidth} bytes")
+
+
+def parse_wav(data):
+    """Parsear un WAV en memoria y devolver (muestras float32 mono, sample_rate)"""
+    if not is_wav(data):
+        raise ValueError("No es un archivo RIFF/WAVE")
+
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id, chunk_size = struct.unpack_from('<4sI', data, pos)
+        body = pos + 8
+        if chunk_id == b'fmt ':
+            fmt_tag, n_channels, sr, _, _, bits = struct.unpack_from('<HHIIHH', data, body)
+            if fmt_tag == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                # El subformato real está en los 2 primeros bytes del GUID
+                fmt_tag = struct.unpack_from('<H', data, body + 24)[0]
+            fmt = (fmt_tag, n_channels, sr, bits // 8)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise ValueError("Chunk 'data' antes de 'fmt '")
+            fmt_tag, n_channels, sr, sampwidth = fmt
+            if fmt_tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+                raise ValueError(f"Formato WAV no soportado: 0x{fmt_tag:04x}")
+            # Algunos escritores dejan el tamaño a 0/0xFFFFFFFF en streaming: leer hasta el final
+            end = min(body + chunk_size, len(data)) if chunk_size else len(data)
+            frame_bytes = sampwidth * n_channels
+            end -= (end - body) % frame_bytes
+            samples = _pcm_to_float32(data[body:end], fmt_tag, sampwidth)
+            if n_channels > 1:
+                samples = samples.reshape(-1, n_channels).mean(axis=1, dtype=np.float32)
+            return samples, sr
+        pos = body + chunk_size + (chunk_size & 1)
+
+    raise ValueError("WAV sin chunk 'data'")
+
+
+def decode_ffmpeg(audio_path, sr=DEFAULT_SAMPLE_RATE, data=None):
+    """
+    Decodificar cualquier formato con un único ffmpeg que escribe float32 mono en stdout.
+    Con `data` (bytes ya en memoria, p. ej. AIFF del TTS en macOS) la entrada va por stdin.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise FileNotFoundError("ffmpeg no encontrado en PATH (necesario para audio no-WAV)")
+    cmd = [
+        ffmpeg, '-v', 'error',
+        *(['-i', 'pipe:0'] if data is not None else ['-nostdin', '-i', str(audio_path)]),
+        '-f', 'f32le', '-acodec', 'pcm_f32le', '-ac', '1', '-ar', str(sr),
+        'pipe:1'
+    ]
+    proc = subprocess.run(cmd, input=data, capture_output=True)
+    if proc.returncode != 0:
+        origen = audio_path or 'el audio en memoria'
+        raise RuntimeError(f"ffmpeg no pudo decodificar {origen}: {proc.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(proc.stdout, dtype='<f4'), sr
+
+
+def read_audio_bytes(audio_path):
+    """Leer el archivo de audio completo (los bytes sirven también como clave de caché)"""
+    with open(audio_path, 'rb') as f:
+        return f.read()
+
+
+def decode_audio(data, audio_path=None):
+    """
+    Decodificar bytes ya leídos: WAV en memoria, el resto vía ffmpeg sobre `audio_path`
+    (o sobre los propios bytes por stdin si no hay ruta)
+    """
+    if is_wav(data):
+        return parse_wav(data)
+    if audio_path is None:
+        return decode_ffmpeg(None, data=data)
+    return decode_ffmpeg(audio_path)
+
+
+def load_audio(audio_path):
+    """
+    Cargar audio como (muestras float32 mono, sample_rate).
+    El mismo buffer sirve para la duración y para la extracción de características.
+    """
+    return decode_audio(read_audio_bytes(audio_path), audio_path)
+
+
+def is_pcm(audio):
+    """True si `audio` es un buffer en memoria (muestras, sample_rate) en lugar de una ruta"""
+    return isinstance(audio, tuple) and len(audio) == 2 and isinstance(audio[0], np.ndarray)
+
+
+def audio_source(audio):
+    """
+    (bytes para la clave de caché, función que devuelve (muestras, sr)) para una ruta o para
+    un buffer PCM en memoria, que se usa tal cual sin pasar por disco.
+    """
+    if is_pcm(audio):
+        samples, sr = audio
+        samples = np.ascontiguousarray(samples, dtype=np.float32)
+        return f"pcm{int(sr)}".encode('utf-8') + samples.tobytes(), lambda: (samples, sr)
+
+    data = read_audio_bytes(audio)
+    return data, lambda: decode_audio(data, audio)
+
+
+def wav_bytes(samples, sr):
+    """Codificar muestras float32 mono como WAV PCM de 16 bits en memoria"""
+    pcm = (np.clip(np.asarray(samples, dtype=np.float32), -1.0, 1.0) * 32767.0).astype('<i2')
+    data_size = pcm.nbytes
+    header = struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + data_size, b'WAVE',
+                         b'fmt ', 16, WAVE_FORMAT_PCM, 1, int(sr), int(sr) * 2, 2, 16,
+                         b'data', data_size)
+    return header + pcm.tobytes()
+
+
+def write_wav(path, samples, sr):
+    """Guardar un buffer PCM en memoria como archivo WAV (salida opcional)"""
+    with open(path, 'wb') as f:
+        f.write(wav_bytes(samples, sr))
+    return path
+
+
+def audio_duration(samples, sr):
+    """Duración en segundos de un buffer ya decodificado"""
+    return len(samples) / sr if sr else 0.0
@@ -0,0 +1,159 @@
+"""
+AVATAR PROFILE - Caché persistente de todo lo que depende solo de la imagen del avatar
+La clave es un hash de los bytes de la imagen más los parámetros de procesado; cada perfil
+(caja de la cara, landmarks de labios, cartoon, atlas de boca...) se guarda en un .npz
+comprimido, así una foto reutilizada miles de veces se analiza una sola vez. La imagen
+decodificada no se guarda (ocupa ~6 MB a 1280 px): en cada acierto se vuelve a decodificar.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from feature_cache import DEFAULT_CACHE_DIR, FeatureCache
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+_META = '__meta__'
+
+
+def read_image_bytes(image_path):
+    """Bytes crudos del archivo de imagen (la clave del perfil se calcula sobre ellos)"""
+    with open(image_path, 'rb') as f:
+        return f.read()
+
+
+def image_source(image):
+    """
+    (bytes para la clave, función que devuelve el ndarray BGR) para una ruta o para un array
+    ya decodificado por una etapa anterior, que se usa tal cual sin pasar por disco.
+    """
+    if isinstance(image, np.ndarray):
+        image = np.ascontiguousarray(image)
+        header = f"{image.shape}{image.dtype.str}".encode('utf-8')
+        return header + image.tobytes(), lambda: image
+
+    data = read_image_bytes(image)
+
+    def decode():
+        decoded = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if decoded is None:
+            raise ValueError(f"No se pudo decodificar la imagen {image}")
+        return decoded
+
+    return data, decode
+
+
+def _to_json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Valor no serializable en el perfil: {type(value).__name__}")
+
+
+class AvatarProfileStore(FeatureCache):
+    EXTENSION = '.npz'
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        """Perfiles de avatar en disco con expulsión LRU por tamaño total"""
+        super().__init__(cache_dir or os.path.join(DEFAULT_CACHE_DIR, "avatar_profiles"), max_bytes)
+        self.rebuild_s = 0.0
+        self.last_rebuild_s = None
+
+    def get(self, key):
+        """Devolver el perfil (dict) si existe, o None"""
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(bytes(data[_META]).decode('utf-8'))
+                profile = dict(meta['valores'])
+                for name in data.files:
+                    if name != _META:
+                        profile[name] = data[name]
+        except (FileNotFoundError, ValueError, OSError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return profile
+
+    def put(self, key, profile, build_s=None):
+        """Guardar los arrays del perfil en el .npz y el resto (JSON) como metadatos"""
+        arrays = {name: np.ascontiguousarray(v) for name, v in profile.items() if isinstance(v, np.ndarray)}
+        valores = {name: v for name, v in profile.items() if name not in arrays}
+        meta = json.dumps({'valores': valores, 'build_s': build_s}, default=_to_json).encode('utf-8')
+        arrays[_META] = np.frombuffer(meta, dtype=np.uint8)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+        return profile
+
+    def get_or_build(self, image_bytes, params, build, decode=None):
+        """
+        Buscar el perfil; si no está, ejecutar `build()` (análisis completo) y guardarlo.
+        Con `decode` (la función de image_source) se llama `build(imagen)` y la imagen decodificada
+        se entrega en profile['imagen'] sin guardarse en disco: en un acierto se decodifica de nuevo.
+        """
+        key = self.make_key(image_bytes, params)
+        profile = self.get(key)
+        if profile is not None:
+            if decode is not None:
+                profile['imagen'] = decode()
+            return profile
+        inicio = time.perf_counter()
+        image = decode() if decode is not None else None
+        profile = build(image) if decode is not None else build()
+        elapsed = time.perf_counter() - inicio
+        with self._lock:
+            self.rebuild_s += elapsed
+            self.last_rebuild_s = elapsed
+        if decode is None:
+            return self.put(key, profile, build_s=elapsed)
+        self.put(key, {name: v for name, v in profile.items() if name != 'imagen'}, build_s=elapsed)
+        profile['imagen'] = image
+        return profile
+
+    def stats(self):
+        """Aciertos/fallos, ocupación y tiempo total dedicado a reconstruir perfiles"""
+        stats = super().stats()
+        stats['rebuild_s'] = self.rebuild_s
+        stats['last_rebuild_s'] = self.last_rebuild_s
+        return stats
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def default_avatar_store():
+    """Almacén de perfiles compartido por todos los motores del proceso"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = AvatarProfileStore()
+        return _default_store
+
+
+def describe_stats(store):
+    """Línea de resumen para los logs de los motores"""
+    stats = store.stats()
+    rebuild = stats['last_rebuild_s']
+    detalle = f", último análisis {rebuild * 1000:.0f} ms" if rebuild is not None else ""
+    return (f"💾 Perfiles de avatar: {stats['hits']} hits / {stats['misses']} misses "
+            f"({stats['entries']} perfiles, {stats['bytes'] / 1e6:.1f} MB{detalle})")
@@ -0,0 +1,72 @@
+"""
+DETECTOR REGISTRY - Registro compartido de detectores (Haar cascades y MediaPipe FaceMesh)
+Cada detector se crea de forma perezosa la primera vez que se pide y se reutiliza después.
+Ni CascadeClassifier ni el grafo de FaceMesh son seguros entre hilos, así que se guarda
+una instancia por hilo; los tiempos de inicialización quedan registrados para diagnóstico.
+"""
+
+import threading
+import time
+
+HAAR_FRONTALFACE = 'haarcascade_frontalface_default.xml'
+HAAR_SMILE = 'haarcascade_smile.xml'
+
+_thread_local = threading.local()
+_stats_lock = threading.Lock()
+_init_stats = {}
+
+
+def _record_init(key, seconds):
+    with _stats_lock:
+        stats = _init_stats.setdefault(key, {'instancias': 0, 'total_s': 0.0, 'max_s': 0.0})
+        stats['instancias'] += 1
+        stats['total_s'] += seconds
+        stats['max_s'] = max(stats['max_s'], seconds)
+
+
+def _get_or_create(key, factory):
+    """Instancia del hilo actual para `key`, creándola con `factory()` si no existe"""
+    detectors = getattr(_thread_local, 'detectors', None)
+    if detectors is None:
+        detectors = _thread_local.detectors = {}
+    detector = detectors.get(key)
+    if detector is None:
+        inicio = time.perf_counter()
+        detector = factory()
+        _record_init(key, time.perf_counter() - inicio)
+        detectors[key] = detector
+    return detector
+
+
+def get_haar_cascade(name=HAAR_FRONTALFACE):
+    """CascadeClassifier de OpenCV cargado una vez por hilo"""
+    import cv2
+
+    def factory():
+        cascade = cv2.CascadeClassifier(cv2.data.haarcascades + name)
+        if cascade.empty():
+            raise RuntimeError(f"No se pudo cargar el clasificador {name}")
+        return cascade
+
+    return _get_or_create(('haar', name), factory)
+
+
+def get_face_mesh(static_image_mode=True, refine_landmarks=True, max_num_faces=1):
+    """FaceMesh de MediaPipe construido una vez por hilo (sin abrir y cerrar el grafo por imagen)"""
+    import mediapipe as mp
+
+    def factory():
+        return mp.solutions.face_mesh.FaceMesh(
+            static_image_mode=static_image_mode,
+            refine_landmarks=refine_landmarks,
+            max_num_faces=max_num_faces,
+        )
+
+    key = ('face_mesh', static_image_mode, refine_landmarks, max_num_faces)
+    return _get_or_create(key, factory)
+
+
+def init_stats():
+    """Tiempos de inicialización por tipo de detector (instancias creadas, total y máximo en segundos)"""
+    with _stats_lock:
+        return {'/'.join(str(k) for k in key): dict(v) for key, v in _init_stats.items()}
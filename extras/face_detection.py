@@ -0,0 +1,85 @@
+"""
+FACE DETECTION - Detección Haar a resolución reducida con reescalado de las cajas
+detectMultiScale escala con el número de píxeles: se detecta sobre una copia cuyo lado mayor
+es `detect_size`, las cajas se devuelven en coordenadas de la imagen original y, si se pide,
+se refinan con una segunda pasada a resolución completa dentro de la ROI de cada cara.
+"""
+
+import cv2
+import numpy as np
+
+from detector_registry import get_haar_cascade
+
+# Lado mayor de la imagen de detección (None o 0: resolución completa)
+DEFAULT_DETECT_SIZE = 640
+
+
+def detection_scale(shape, detect_size=DEFAULT_DETECT_SIZE):
+    """Factor (<= 1) por el que se reduce la imagen antes de detectar"""
+    if not detect_size:
+        return 1.0
+    return min(1.0, float(detect_size) / max(shape[:2]))
+
+
+def _refine_box(gray, box, cascade, scale_factor, min_neighbors, margin):
+    """Re-detectar dentro de la ROI ampliada de `box` a resolución completa"""
+    img_h, img_w = gray.shape[:2]
+    x, y, w, h = box
+    x0 = max(0, int(x - w * margin))
+    y0 = max(0, int(y - h * margin))
+    x1 = min(img_w, int(x + w * (1 + margin)))
+    y1 = min(img_h, int(y + h * (1 + margin)))
+    # Limitar el rango de tamaños alrededor de la caja gruesa: la pasada fina es barata
+    side = min(w, h)
+    faces = cascade.detectMultiScale(
+        gray[y0:y1, x0:x1], scale_factor, min_neighbors,
+        minSize=(int(side * 0.7), int(side * 0.7)),
+        maxSize=(int(side * 1.4), int(side * 1.4)),
+    )
+    if len(faces) == 0:
+        return box
+    fx, fy, fw, fh = max(faces, key=lambda f: f[2] * f[3])
+    return np.array([fx + x0, fy + y0, fw, fh], dtype=np.int32)
+
+
+def detect_faces(gray, cascade=None, scale_factor=1.3, min_neighbors=5,
+                 detect_size=DEFAULT_DETECT_SIZE, refine=False, refine_margin=0.25):
+    """
+    Detectar caras en una imagen en escala de grises y devolver un array (N, 4) de
+    (x, y, w, h) en coordenadas de la imagen original.
+    """
+    if cascade is None:
+        cascade = get_haar_cascade()
+    scale = detection_scale(gray.shape, detect_size)
+
+    if scale >= 1.0:
+        faces = cascade.detectMultiScale(gray, scale_factor, min_neighbors)
+        return np.asarray(faces, dtype=np.int32).reshape(-1, 4)
+
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    faces = cascade.detectMultiScale(small, scale_factor, min_neighbors)
+    faces = np.asarray(faces, dtype=np.float64).reshape(-1, 4)
+    if len(faces) == 0:
+        return faces.astype(np.int32)
+
+    # Volver a la resolución original sin salirse de la imagen
+    img_h, img_w = gray.shape[:2]
+    boxes = np.rint(faces / scale).astype(np.int32)
+    boxes[:, 0] = np.clip(boxes[:, 0], 0, img_w - 1)
+    boxes[:, 1] = np.clip(boxes[:, 1], 0, img_h - 1)
+    boxes[:, 2] = np.minimum(boxes[:, 2], img_w - boxes[:, 0])
+    boxes[:, 3] = np.minimum(boxes[:, 3], img_h - boxes[:, 1])
+
+    if refine:
+        boxes = np.stack([
+            _refine_box(gray, box, cascade, scale_factor, min_neighbors, refine_margin)
+            for box in boxes
+        ])
+    return boxes
+
+
+def largest_face(faces):
+    """Caja (x, y, w, h) de mayor área o None si no hay caras"""
+    if len(faces) == 0:
+        return None
+    return max(faces, key=lambda f: f[2] * f[3])
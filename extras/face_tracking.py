@@ -0,0 +1,177 @@
+"""
+FACE TRACKING - Seguimiento de la caja de la cara en entradas de video
+La detección completa solo corre en fotogramas clave (cada `detect_every` frames) o cuando la
+confianza del seguimiento cae; entre medias la caja se propaga con template matching sobre una
+ventana de búsqueda reducida y se suaviza con un filtro causal (media exponencial).
+Incluye además la media móvil vectorizada de cajas (O(N)) y su variante causal frame a frame.
+"""
+
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+DEFAULT_DETECT_EVERY = 10
+DEFAULT_MIN_CONFIDENCE = 0.6
+DEFAULT_ALPHA = 0.5
+# Lado mayor de la plantilla de seguimiento en píxeles
+TEMPLATE_SIZE = 64
+
+
+def smooth_boxes(boxes, T=5):
+    """
+    Media móvil de T frames hacia delante sobre un array (N, 4) de cajas, en O(N) con sumas
+    acumuladas. Al final del video la ventana se ancla en los últimos T frames.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64)
+    n = len(boxes)
+    if n == 0 or T <= 1:
+        return boxes.copy()
+    T = min(T, n)
+    csum = np.zeros((n + 1, boxes.shape[1]))
+    np.cumsum(boxes, axis=0, out=csum[1:])
+    starts = np.minimum(np.arange(n), n - T)
+    return (csum[starts + T] - csum[starts]) / T
+
+
+class CausalBoxSmoother:
+    def __init__(self, T=5):
+        """Media móvil de las últimas T cajas, actualizable frame a frame (uso en vivo)"""
+        self.T = max(1, int(T))
+        self._window = deque()
+        self._sum = None
+
+    def update(self, box):
+        box = np.asarray(box, dtype=np.float64)
+        if self._sum is None:
+            self._sum = np.zeros_like(box)
+        self._window.append(box)
+        self._sum += box
+        if len(self._window) > self.T:
+            self._sum -= self._window.popleft()
+        return self._sum / len(self._window)
+
+    def reset(self):
+        self._window.clear()
+        self._sum = None
+
+
+class FaceBoxTracker:
+    def __init__(self, detect, detect_every=DEFAULT_DETECT_EVERY, min_confidence=DEFAULT_MIN_CONFIDENCE,
+                 alpha=DEFAULT_ALPHA, search_margin=0.25, template_size=TEMPLATE_SIZE):
+        """
+        `detect(frame)` devuelve una caja [x1, y1, x2, y2] o None si no hay cara.
+        `alpha` es el peso de la medida nueva en el filtro causal (1: sin suavizado).
+        """
+        self.detect = detect
+        self.detect_every = max(1, int(detect_every))
+        self.min_confidence = min_confidence
+        self.alpha = alpha
+        self.search_margin = search_margin
+        self.template_size = template_size
+        self.reset()
+
+    def reset(self):
+        self._box = None
+        self._smoothed = None
+        self._template = None
+        self._scale = 1.0
+        self._since_detection = 0
+        self.frames = 0
+        self.detections = 0
+        self.detect_seconds = 0.0
+        self.elapsed = 0.0
+
+    def _gray(self, frame):
+        return frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    def _redetect(self, frame, gray):
+        inicio = time.perf_counter()
+        box = self.detect(frame)
+        self.detect_seconds += time.perf_counter() - inicio
+        self.detections += 1
+        self._since_detection = 0
+        if box is None:
+            # Sin cara: mantener la última caja conocida (o el frame completo al principio)
+            if self._box is None:
+                self._box = np.array([0, 0, gray.shape[1], gray.shape[0]], dtype=np.float64)
+            self._template = None
+            return
+        self._box = np.asarray(box, dtype=np.float64)
+        self._set_template(gray)
+
+    def _set_template(self, gray):
+        x1, y1, x2, y2 = self._box.astype(int)
+        w, h = x2 - x1, y2 - y1
+        if w < 8 or h < 8:
+            self._template = None
+            return
+        self._scale = min(1.0, self.template_size / max(w, h))
+        crop = gray[y1:y2, x1:x2]
+        self._template = cv2.resize(crop, None, fx=self._scale, fy=self._scale, interpolation=cv2.INTER_AREA)
+
+    def _track(self, gray):
+        """Propagar la caja con template matching; devuelve la confianza (0 si no se pudo)"""
+        if self._template is None:
+            return 0.0
+        img_h, img_w = gray.shape[:2]
+        x1, y1, x2, y2 = self._box
+        w, h = x2 - x1, y2 - y1
+        sx0 = int(max(0, x1 - w * self.search_margin))
+        sy0 = int(max(0, y1 - h * self.search_margin))
+        sx1 = int(min(img_w, x2 + w * self.search_margin))
+        sy1 = int(min(img_h, y2 + h * self.search_margin))
+        search = cv2.resize(gray[sy0:sy1, sx0:sx1], None, fx=self._scale, fy=self._scale,
+                            interpolation=cv2.INTER_AREA)
+        th, tw = self._template.shape[:2]
+        if search.shape[0] < th or search.shape[1] < tw:
+            return 0.0
+        scores = cv2.matchTemplate(search, self._template, cv2.TM_CCOEFF_NORMED)
+        _, confidence, _, (mx, my) = cv2.minMaxLoc(scores)
+        nx1 = sx0 + mx / self._scale
+        ny1 = sy0 + my / self._scale
+        self._box = np.array([nx1, ny1, nx1 + w, ny1 + h])
+        return confidence
+
+    def update(self, frame):
+        """Caja suavizada [x1, y1, x2, y2] (enteros) para el siguiente frame del video"""
+        inicio = time.perf_counter()
+        gray = self._gray(frame)
+        keyframe = self._box is None or self._since_detection >= self.detect_every - 1
+        if keyframe:
+            self._redetect(frame, gray)
+        else:
+            self._since_detection += 1
+            if self._track(gray) < self.min_confidence:
+                self._redetect(frame, gray)
+
+        # Filtro causal: solo depende de frames pasados, sirve en streaming
+        if self._smoothed is None:
+            self._smoothed = self._box.copy()
+        else:
+            self._smoothed = self.alpha * self._box + (1 - self.alpha) * self._smoothed
+        self.frames += 1
+        self.elapsed += time.perf_counter() - inicio
+
+        img_h, img_w = gray.shape[:2]
+        box = np.rint(self._smoothed).astype(int)
+        box[[0, 2]] = np.clip(box[[0, 2]], 0, img_w)
+        box[[1, 3]] = np.clip(box[[1, 3]], 0, img_h)
+        return box
+
+    def track(self, frames):
+        """Cajas (N, 4) para una secuencia completa de frames"""
+        return np.array([self.update(frame) for frame in frames])
+
+    def stats(self, fps=25):
+        """Detecciones realizadas y su frecuencia (por segundo de video y por segundo real)"""
+        video_s = self.frames / fps if fps else 0.0
+        return {
+            'frames': self.frames,
+            'detecciones': self.detections,
+            'detecciones_por_segundo_video': self.detections / video_s if video_s else 0.0,
+            'detecciones_por_segundo': self.detections / self.elapsed if self.elapsed else 0.0,
+            'frames_por_segundo': self.frames / self.elapsed if self.elapsed else 0.0,
+            'tiempo_deteccion_s': self.detect_seconds,
+        }
@@ -0,0 +1,134 @@
+"""
+FEATURE CACHE - Caché en disco de características de audio direccionada por contenido
+La clave es un hash de los bytes del audio más los parámetros del extractor, así el mismo
+clip TTS reutilizado en muchos avatares solo se procesa una vez.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.environ.get("WAV2LIP_CACHE_DIR", os.path.join(BASE_DIR, "cache"))
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class FeatureCache:
+    EXTENSION = '.npy'
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        """Caché de arrays float16 (.npy) con expulsión LRU por tamaño total"""
+        self.cache_dir = cache_dir or os.path.join(DEFAULT_CACHE_DIR, "audio_features")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(audio_bytes, params):
+        """Hash de los bytes del audio + parámetros del extractor (en JSON ordenado)"""
+        h = hashlib.blake2b(digest_size=20)
+        h.update(audio_bytes)
+        h.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}{self.EXTENSION}")
+
+    def get(self, key):
+        """Devolver el array memory-mapped si existe, o None"""
+        path = self._path(key)
+        try:
+            features = np.load(path, mmap_mode='r')
+        except (FileNotFoundError, ValueError, OSError):
+            with self._lock:
+                self.misses += 1
+            return None
+        # Actualizar mtime para que la expulsión sea LRU y no FIFO
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return features
+
+    def put(self, key, features):
+        """Guardar como float16 con escritura atómica y aplicar el límite de tamaño"""
+        compact = np.ascontiguousarray(features, dtype=np.float16)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, compact)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+        return compact
+
+    def get_or_compute(self, audio_bytes, params, compute):
+        """Buscar en caché; si no está, ejecutar `compute()` y guardar el resultado"""
+        key = self.make_key(audio_bytes, params)
+        features = self.get(key)
+        if features is not None:
+            return features
+        return self.put(key, compute())
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(self.EXTENSION):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        """Borrar las entradas usadas hace más tiempo hasta quedar por debajo de max_bytes"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                # En Windows un archivo mapeado en memoria no se puede borrar
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        """Contadores de aciertos/fallos y ocupación actual"""
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+        }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def default_feature_cache():
+    """Caché compartida por todos los motores del proceso"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = FeatureCache()
+        return _default_cache
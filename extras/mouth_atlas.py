@@ -0,0 +1,81 @@
+"""
+MOUTH ATLAS - Atlas de sprites de boca con aperturas cuantizadas
+Las transformaciones de boca son funciones puras de una intensidad escalar: se renderizan K
+estados una vez por avatar y cada frame se reduce a buscar un índice y copiar la ROI.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_LEVELS = 16
+MAX_CACHED_ATLASES = 32
+
+
+class MouthAtlas:
+    def __init__(self, render, levels=DEFAULT_LEVELS, vmin=0.0, vmax=1.0):
+        """Renderizar `levels` parches con render(intensidad) repartidos en [vmin, vmax]"""
+        if levels < 2:
+            raise ValueError("El atlas necesita al menos 2 niveles")
+        self.levels = int(levels)
+        self.vmin = float(vmin)
+        self.vmax = float(vmax)
+        self.values = np.linspace(self.vmin, self.vmax, self.levels)
+        self.patches = np.stack([np.asarray(render(v)) for v in self.values])
+
+    @classmethod
+    def from_patches(cls, patches, vmin=0.0, vmax=1.0):
+        """Reconstruir un atlas ya renderizado (por ejemplo, leído de la caché de perfiles)"""
+        atlas = cls.__new__(cls)
+        atlas.levels = len(patches)
+        atlas.vmin = float(vmin)
+        atlas.vmax = float(vmax)
+        atlas.values = np.linspace(atlas.vmin, atlas.vmax, atlas.levels)
+        atlas.patches = np.asarray(patches)
+        return atlas
+
+    def indices(self, intensities):
+        """Índice del estado más cercano para cada intensidad (vectorizado)"""
+        scaled = (np.asarray(intensities, dtype=np.float64) - self.vmin) / (self.vmax - self.vmin)
+        return np.clip(np.rint(scaled * (self.levels - 1)), 0, self.levels - 1).astype(np.intp)
+
+    def lookup(self, intensity):
+        """Parche pre-renderizado para una intensidad"""
+        return self.patches[self.indices(intensity)]
+
+    @property
+    def nbytes(self):
+        return self.patches.nbytes
+
+
+_atlas_cache = OrderedDict()
+_atlas_lock = threading.Lock()
+
+
+def atlas_key(roi, levels, vmin=0.0, vmax=1.0, **params):
+    """Clave por contenido de la ROI de la boca + parámetros del renderizador"""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(np.ascontiguousarray(roi).data)
+    h.update(repr(roi.shape).encode())
+    h.update(json.dumps({'levels': levels, 'vmin': vmin, 'vmax': vmax, **params}, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def get_or_build_atlas(roi, render, levels=DEFAULT_LEVELS, vmin=0.0, vmax=1.0, **params):
+    """Atlas cacheado en memoria por avatar (LRU de MAX_CACHED_ATLASES entradas)"""
+    key = atlas_key(roi, levels, vmin, vmax, **params)
+    with _atlas_lock:
+        atlas = _atlas_cache.get(key)
+        if atlas is not None:
+            _atlas_cache.move_to_end(key)
+            return atlas
+
+    atlas = MouthAtlas(render, levels, vmin, vmax)
+    with _atlas_lock:
+        _atlas_cache[key] = atlas
+        while len(_atlas_cache) > MAX_CACHED_ATLASES:
+            _atlas_cache.popitem(last=False)
+    return atlas
@@ -0,0 +1,133 @@
+"""
+PARALLEL RENDER - Render por segmentos en un pool de procesos con reensamblado ordenado
+El fondo y el atlas de boca se publican una sola vez en memoria compartida; cada proceso
+renderiza y codifica un tramo contiguo del timeline y los tramos se unen con el demuxer
+concat de ffmpeg sin recodificar el video.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from video_sink import AudioInput, FFmpegVideoSink, ffmpeg_disponible
+
+
+def _share_array(array):
+    """Copiar un array a un bloque de memoria compartida y devolver (bloque, descriptor)"""
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def _attach_array(descriptor):
+    name, shape, dtype = descriptor
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def split_timeline(n_frames, segments):
+    """Partir [0, n_frames) en `segments` tramos contiguos de tamaño casi igual"""
+    segments = max(1, min(segments, n_frames))
+    bounds = np.linspace(0, n_frames, segments + 1).round().astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def _render_segment(task):
+    """Proceso del pool: pegar los parches de su tramo sobre el fondo y codificarlo"""
+    (background_desc, patches_desc, roi, states, fps, segment_path, crf, preset, threads) = task
+    shm_bg, background = _attach_array(background_desc)
+    shm_patches, patches = _attach_array(patches_desc)
+    try:
+        y0, y1, x0, x1 = roi
+        height, width = background.shape[:2]
+        # Buffer propio del proceso: el fondo compartido nunca se modifica
+        canvas = background.copy()
+        with FFmpegVideoSink(segment_path, width, height, fps=fps, crf=crf,
+                             preset=preset, threads=threads) as sink:
+            for state in states:
+                canvas[y0:y1, x0:x1] = patches[state]
+                sink.write(canvas)
+        return segment_path, len(states)
+    finally:
+        del background, patches
+        shm_bg.close()
+        shm_patches.close()
+
+
+def concat_segments(segment_paths, output_path, audio_path=None):
+    """
+    Unir los tramos en orden con el demuxer concat (video copiado) y mezclar el audio
+    (`audio_path`: ruta o buffer (muestras, sr) en memoria)
+    """
+    ffmpeg = ffmpeg_disponible()
+    if ffmpeg is None:
+        raise FileNotFoundError("ffmpeg no encontrado en PATH")
+    list_dir = os.path.dirname(segment_paths[0])
+    list_path = os.path.join(list_dir, "segmentos.txt")
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    cmd = [ffmpeg, '-y', '-v', 'error', '-f', 'concat', '-safe', '0', '-i', list_path]
+    audio = AudioInput(audio_path) if audio_path is not None else None
+    if audio is not None:
+        cmd += audio.args + ['-map', '0:v:0', '-map', '1:a:0', '-c:a', 'aac', '-b:a', '192k', '-shortest']
+    else:
+        # Tramos con su propio audio: se recodifica una vez (copiar el AAC de cada tramo deja el
+        # hueco de priming del encoder en cada unión)
+        cmd += ['-c:a', 'aac', '-b:a', '192k']
+    cmd += ['-c:v', 'copy', '-movflags', '+faststart', str(output_path)]
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+                                pass_fds=audio.pass_fds if audio else ())
+        if audio is not None:
+            audio.started()
+        _, stderr = proc.communicate()
+    finally:
+        if audio is not None:
+            audio.close()
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg concat falló: {stderr.strip()}")
+    return output_path
+
+
+def render_parallel(background, roi, patches, states, output_path, audio_path=None,
+                    fps=25, workers=2, crf=23, preset="veryfast"):
+    """
+    Renderizar en paralelo un video de fondo fijo donde solo cambia la ROI (y0, y1, x0, x1).
+    `patches` es el atlas (K, h, w, 3) y `states` el índice de parche de cada frame.
+    """
+    states = np.asarray(states, dtype=np.intp)
+    segments = split_timeline(len(states), workers)
+    if not segments:
+        raise ValueError("No hay frames que renderizar")
+
+    # Repartir los hilos de libx264 entre los procesos para no sobresuscribir la CPU
+    threads = max(1, (os.cpu_count() or 1) // len(segments))
+
+    shm_bg, background_desc = _share_array(background)
+    shm_patches, patches_desc = _share_array(patches)
+    tmp_dir = tempfile.mkdtemp(prefix="wav2lip_segmentos_")
+    try:
+        tasks = [
+            (background_desc, patches_desc, tuple(int(v) for v in roi), states[a:b], fps,
+             os.path.join(tmp_dir, f"segmento_{i:04d}.mp4"), crf, preset, threads)
+            for i, (a, b) in enumerate(segments)
+        ]
+        with ProcessPoolExecutor(max_workers=len(tasks)) as pool:
+            # map conserva el orden de las tareas: el reensamblado sigue el timeline
+            segment_paths = [path for path, _ in pool.map(_render_segment, tasks)]
+        return concat_segments(segment_paths, output_path, audio_path)
+    finally:
+        shm_bg.close()
+        shm_bg.unlink()
+        shm_patches.close()
+        shm_patches.unlink()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -0,0 +1,102 @@
+"""
+TTS CACHE - Caché en disco de audios sintetizados, direccionada por (texto, voz, velocidad, volumen)
+Los lotes de marketing repiten el mismo guion cambiando solo el avatar: antes de sintetizar se
+busca el audio por contenido y un acierto es una copia de archivo de milisegundos.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+
+from feature_cache import DEFAULT_CACHE_DIR, FeatureCache
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class TTSCache(FeatureCache):
+    EXTENSION = '.wav'
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        """Audios TTS en disco con expulsión LRU por tamaño total"""
+        super().__init__(cache_dir or os.path.join(DEFAULT_CACHE_DIR, "tts"), max_bytes)
+
+    def key_for(self, text, rate=None, voice=None, volume=None, engine='pyttsx3'):
+        """Clave por texto + parámetros de voz (la voz puede ser índice, nombre o lista de pistas)"""
+        params = {'engine': engine, 'rate': rate, 'voice': voice, 'volume': volume, 'version': 1}
+        return self.make_key(text.encode('utf-8'), params)
+
+    def get(self, key):
+        """Ruta del audio cacheado si existe, o None"""
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def fetch(self, key, output_path):
+        """Copiar el audio cacheado a `output_path`; devuelve False si no está en caché"""
+        path = self.get(key)
+        if path is None:
+            return False
+        try:
+            shutil.copyfile(path, output_path)
+        except FileNotFoundError:
+            # Expulsado entre la búsqueda y la copia por otro proceso
+            return False
+        return True
+
+    def get_bytes(self, key):
+        """Contenido del WAV cacheado (para decodificarlo en memoria), o None"""
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, audio_path):
+        """Copiar `audio_path` a la caché con escritura atómica (segura entre procesos concurrentes)"""
+        if not os.path.exists(audio_path) or os.path.getsize(audio_path) == 0:
+            return None
+        with open(audio_path, 'rb') as src:
+            return self._write(key, lambda dst: shutil.copyfileobj(src, dst))
+
+    def put_bytes(self, key, data):
+        """Guardar un WAV ya en memoria con la misma escritura atómica"""
+        if not data:
+            return None
+        return self._write(key, lambda dst: dst.write(data))
+
+    def _write(self, key, write):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as dst:
+                write(dst)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+        return self._path(key)
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def default_tts_cache():
+    """Caché de audios TTS compartida por el proceso"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = TTSCache()
+        return _default_cache
@@ -0,0 +1,131 @@
+"""
+TTS PIPELINE - Síntesis por frases solapada con el render del video
+Con textos largos el render esperaba a que runAndWait() terminara el guion completo. Aquí el
+texto se divide en frases, todas se encolan en el pool TTS y cada frase sintetizada (PCM en
+memoria) se renderiza como un tramo con su audio mientras el proceso TTS sigue con las
+siguientes; al final los tramos de video se unen con el demuxer concat sin recodificar y el
+audio de todas las frases se codifica una sola vez como una pista continua (copiar el AAC de
+cada tramo dejaba el hueco de priming del encoder en cada cambio de frase).
+"""
+
+import os
+import re
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from parallel_render import concat_segments
+from tts_worker import DEFAULT_RATE, default_tts_pool
+from video_sink import FirstFrameClock
+
+# Fragmentos más cortos se unen a la frase siguiente (evita tramos de unos pocos frames)
+DEFAULT_MIN_CHARS = 20
+_SENTENCE_END = re.compile(r'(?<=[.!?…;:])\s+')
+
+
+def split_sentences(text, min_chars=DEFAULT_MIN_CHARS):
+    """Dividir `text` en frases conservando la puntuación; las muy cortas se unen a la siguiente"""
+    frases = []
+    pendiente = ''
+    for parte in _SENTENCE_END.split(text.strip()):
+        pendiente = f"{pendiente} {parte}".strip() if pendiente else parte.strip()
+        if len(pendiente) >= min_chars:
+            frases.append(pendiente)
+            pendiente = ''
+    if pendiente:
+        if frases:
+            frases[-1] = f"{frases[-1]} {pendiente}"
+        else:
+            frases.append(pendiente)
+    return frases
+
+
+def video_duration(video_path):
+    """Duración del video de un tramo según sus frames (None si no se puede leer)"""
+    cap = cv2.VideoCapture(str(video_path))
+    try:
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+    finally:
+        cap.release()
+    return frames / fps if frames > 0 and fps > 0 else None
+
+
+def fit_audio(samples, sr, duration):
+    """Recortar o completar con silencio `samples` hasta `duration` segundos"""
+    if duration is None:
+        return samples
+    n = int(round(duration * sr))
+    if len(samples) >= n:
+        return samples[:n]
+    return np.concatenate([samples, np.zeros(n - len(samples), dtype=samples.dtype)])
+
+
+def synthesize_and_render(text, render_segment, output_path, pool=None, prepare=None,
+                          rate=DEFAULT_RATE, voice=None, volume=None, min_chars=DEFAULT_MIN_CHARS, workdir=None):
+    """
+    Sintetizar `text` frase a frase y renderizar cada frase en cuanto su audio está listo.
+    `render_segment(audio, video_path)` crea el tramo (video + audio) a partir del buffer
+    (muestras, sr) de la frase y devuelve True/False;
+    `prepare()` (opcional) corre después de encolar la síntesis, p. ej. el análisis de la imagen.
+    Devuelve los tiempos: primer audio sintetizado, primer frame enviado al encoder (None si el
+    render ocurre en otro proceso), primer tramo renderizado y total.
+    """
+    pool = pool or default_tts_pool()
+    frases = split_sentences(text, min_chars)
+    if not frases:
+        raise ValueError("El texto no contiene frases que sintetizar")
+
+    tmp_dir = tempfile.mkdtemp(prefix='tts_pipeline_', dir=workdir)
+    inicio = time.perf_counter()
+    try:
+        with FirstFrameClock() as reloj:
+            futures = [pool.submit_pcm(frase, rate, voice, volume) for frase in frases]
+            if prepare is not None:
+                prepare()
+
+            segmentos, pistas = [], []
+            primer_audio_s = primer_tramo_s = None
+            for i, future in enumerate(futures):
+                audio = future.result()['valor']
+                if primer_audio_s is None:
+                    primer_audio_s = time.perf_counter() - inicio
+                video_path = os.path.join(tmp_dir, f"tramo_{i:04d}.mp4")
+                if not render_segment(audio, video_path):
+                    raise RuntimeError(f"Falló el render del tramo {i + 1}/{len(frases)}")
+                if primer_tramo_s is None:
+                    primer_tramo_s = time.perf_counter() - inicio
+                segmentos.append(video_path)
+                pistas.append(audio)
+
+            if len(segmentos) == 1:
+                shutil.move(segmentos[0], output_path)
+            else:
+                # Cada frase se ajusta a la duración de su tramo de video para no acumular desfase
+                sr = pistas[0][1]
+                if any(sr_pista != sr for _, sr_pista in pistas):
+                    raise RuntimeError("Las frases sintetizadas tienen frecuencias de muestreo distintas")
+                muestras = np.concatenate([fit_audio(np.asarray(samples, dtype=np.float32), sr, video_duration(path))
+                                           for (samples, _), path in zip(pistas, segmentos)])
+                concat_segments(segmentos, output_path, audio_path=(muestras, sr))
+            return {
+                'frases': len(frases),
+                'primer_audio_s': primer_audio_s,
+                'primer_frame_s': None if reloj.at is None else reloj.at - inicio,
+                'primer_tramo_s': primer_tramo_s,
+                'total_s': time.perf_counter() - inicio,
+            }
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def describe_timings(timings):
+    """Línea de resumen para los logs"""
+    primer_frame = timings.get('primer_frame_s')
+    primer_frame = 'n/d' if primer_frame is None else f"{primer_frame:.2f} s"
+    return (f"⏱️  TTS por frases: {timings['frases']} frase(s), primer audio a los "
+            f"{timings['primer_audio_s']:.2f} s, primer frame a los {primer_frame}, "
+            f"primer tramo a los {timings['primer_tramo_s']:.2f} s, total {timings['total_s']:.2f} s")
@@ -0,0 +1,343 @@
+"""
+TTS WORKER - Procesos de síntesis de voz de larga vida con el motor pyttsx3 ya inicializado
+pyttsx3.init() cuesta buena parte de la latencia de un trabajo corto: cada proceso del pool
+inicializa su motor una sola vez y atiende peticiones de una cola local. Con N procesos las
+síntesis corren en paralelo; se miden el tiempo en cola y el de síntesis de cada petición.
+Con una TTSCache los guiones repetidos se sirven desde disco sin llegar a los procesos.
+synthesize_pcm() devuelve las muestras en memoria (muestras float32, sr) para el extractor de
+características y el encoder, sin que el proceso padre escriba ni vuelva a leer un WAV.
+"""
+
+import atexit
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+
+from audio_io import decode_audio, write_wav
+from tts_cache import default_tts_cache
+
+DEFAULT_RATE = 150
+
+
+def _select_voice(voices, voice):
+    """Voz por índice, por id/nombre (subcadena) o la primera que contenga alguna de varias pistas"""
+    if voice is None or not voices:
+        return None
+    if isinstance(voice, int):
+        return voices[voice].id if 0 <= voice < len(voices) else None
+    hints = [voice] if isinstance(voice, str) else list(voice)
+    for v in voices:
+        if v.id in hints or getattr(v, 'name', None) in hints:
+            return v.id
+    for v in voices:
+        name = (getattr(v, 'name', '') or '').lower()
+        if any(h.lower() in name for h in hints):
+            return v.id
+    return None
+
+
+def _worker_main(requests, results, worker_id):
+    """Bucle del proceso: un motor pyttsx3 para todas las peticiones"""
+    inicio = time.perf_counter()
+    try:
+        import pyttsx3
+        engine = pyttsx3.init()
+        voices = list(engine.getProperty('voices') or [])
+        defaults = {
+            'rate': engine.getProperty('rate'),
+            'volume': engine.getProperty('volume'),
+            'voice': engine.getProperty('voice'),
+        }
+    except Exception as e:
+        results.put(('init', worker_id, False, f"{type(e).__name__}: {e}", time.perf_counter() - inicio))
+        return
+    results.put(('init', worker_id, True, None, time.perf_counter() - inicio))
+    # pyttsx3 solo sabe escribir archivos: el WAV de las peticiones 'pcm' vive lo justo en un
+    # directorio propio del proceso y vuelve al padre como bytes
+    pcm_dir = tempfile.mkdtemp(prefix=f'tts_worker_{worker_id}_')
+    pcm_path = os.path.join(pcm_dir, 'pcm.wav')
+
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        request_id, kind, payload, enqueued = request
+        started = time.time()
+        try:
+            if kind == 'voices':
+                value = [(v.id, getattr(v, 'name', v.id)) for v in voices]
+            else:
+                # Restaurar los valores por defecto: el motor conserva las propiedades entre peticiones
+                engine.setProperty('rate', payload.get('rate') or defaults['rate'])
+                volume = payload.get('volume')
+                engine.setProperty('volume', defaults['volume'] if volume is None else volume)
+                engine.setProperty('voice', _select_voice(voices, payload.get('voice')) or defaults['voice'])
+                if kind == 'save':
+                    engine.save_to_file(payload['text'], payload['output_path'])
+                elif kind == 'pcm':
+                    engine.save_to_file(payload['text'], pcm_path)
+                else:
+                    engine.say(payload['text'])
+                engine.runAndWait()
+                if kind == 'pcm':
+                    with open(pcm_path, 'rb') as f:
+                        value = f.read()
+                    os.remove(pcm_path)
+                else:
+                    value = payload.get('output_path')
+            ok, error = True, None
+        except Exception as e:
+            value, ok, error = None, False, f"{type(e).__name__}: {e}"
+        finished = time.time()
+        results.put(('done', request_id, kind, ok, error, value, worker_id,
+                     started - enqueued, finished - started))
+    try:
+        engine.stop()
+    except Exception:
+        pass
+    shutil.rmtree(pcm_dir, ignore_errors=True)
+
+
+class TTSPool:
+    def __init__(self, workers=1, cache=None):
+        """
+        Pool de `workers` procesos TTS; los procesos se lanzan en start() o con la primera
+        petición que no esté en `cache` (TTSCache opcional).
+        """
+        self.workers = max(1, int(workers))
+        self.cache = cache
+        self.cache_hits = 0
+        self._ctx = mp.get_context('spawn')
+        self._requests = None
+        self._results = None
+        self._procs = []
+        self._futures = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._collector = None
+        self.init_s = {}
+        self.init_errors = {}
+        self.queue_s = []
+        self.synth_s = []
+
+    def start(self):
+        with self._lock:
+            if self._procs:
+                return self
+            self._requests = self._ctx.Queue()
+            self._results = self._ctx.Queue()
+            self._procs = [
+                self._ctx.Process(target=_worker_main, args=(self._requests, self._results, i), daemon=True)
+                for i in range(self.workers)
+            ]
+            for proc in self._procs:
+                proc.start()
+            self._collector = threading.Thread(target=self._collect, daemon=True)
+            self._collector.start()
+        return self
+
+    def _collect(self):
+        """Hilo del proceso padre: repartir los resultados a sus Future"""
+        while True:
+            try:
+                message = self._results.get(timeout=0.5)
+            except queue.Empty:
+                if not any(p.is_alive() for p in self._procs):
+                    self._fail_pending("Los procesos TTS terminaron inesperadamente")
+                    return
+                continue
+            except (EOFError, OSError):
+                return
+            if message is None:
+                return
+            if message[0] == 'init':
+                _, worker_id, ok, error, seconds = message
+                self.init_s[worker_id] = seconds
+                if not ok:
+                    self.init_errors[worker_id] = error
+                    if len(self.init_errors) == self.workers:
+                        self._fail_pending(f"No se pudo inicializar pyttsx3: {error}")
+                continue
+            _, request_id, kind, ok, error, value, worker_id, queue_s, synth_s = message
+            with self._lock:
+                future, cache_key = self._futures.pop(request_id, (None, None))
+                if kind != 'voices':
+                    self.queue_s.append(queue_s)
+                    self.synth_s.append(synth_s)
+            datos = value
+            if ok and kind == 'pcm':
+                # pyttsx3 escribe WAV, salvo el driver nsss de macOS (AIFF): ese va por ffmpeg
+                try:
+                    value = decode_audio(datos)
+                except (ValueError, RuntimeError, FileNotFoundError) as e:
+                    ok, error = False, f"Audio inválido del motor TTS: {e}"
+            if ok and cache_key is not None:
+                # Solo audio ya validado, y antes de resolver el Future: la siguiente petición ya lo encuentra
+                self._store(cache_key, datos, in_memory=kind == 'pcm')
+            if future is None:
+                continue
+            if ok:
+                future.set_result({'valor': value, 'worker': worker_id,
+                                   'cola_s': queue_s, 'sintesis_s': synth_s})
+            else:
+                future.set_exception(RuntimeError(error))
+
+    def _fail_pending(self, reason):
+        with self._lock:
+            pending, self._futures = self._futures, {}
+        for future, _ in pending.values():
+            future.set_exception(RuntimeError(reason))
+
+    def _submit(self, kind, payload, cache_key=None):
+        self.start()
+        if len(self.init_errors) == self.workers:
+            raise RuntimeError(f"No se pudo inicializar pyttsx3: {next(iter(self.init_errors.values()))}")
+        future = Future()
+        with self._lock:
+            request_id = next(self._ids)
+            self._futures[request_id] = (future, cache_key)
+        self._requests.put((request_id, kind, payload, time.time()))
+        return future
+
+    def submit(self, text, output_path, rate=DEFAULT_RATE, voice=None, volume=None):
+        """Encolar la síntesis de `text` a `output_path` (o copiarla de la caché); devuelve un Future"""
+        output_path = os.path.abspath(output_path)
+        key = None
+        if self.cache is not None:
+            key = self.cache.key_for(text, rate, voice, volume)
+            inicio = time.perf_counter()
+            if self.cache.fetch(key, output_path):
+                with self._lock:
+                    self.cache_hits += 1
+                future = Future()
+                future.set_result({'valor': output_path, 'worker': None, 'cola_s': 0.0,
+                                   'sintesis_s': time.perf_counter() - inicio, 'cache': True})
+                return future
+
+        payload = {'text': text, 'output_path': output_path, 'rate': rate, 'voice': voice, 'volume': volume}
+        return self._submit('save', payload, cache_key=key)
+
+    def submit_pcm(self, text, rate=DEFAULT_RATE, voice=None, volume=None):
+        """
+        Encolar la síntesis de `text` en memoria; el Future entrega 'valor' = (muestras float32, sr).
+        Sin ruta de salida: el WAV no se escribe en el proceso padre (solo en la caché, si la hay).
+        """
+        key = None
+        if self.cache is not None:
+            key = self.cache.key_for(text, rate, voice, volume)
+            inicio = time.perf_counter()
+            data = self.cache.get_bytes(key)
+            valor = None
+            if data is not None:
+                try:
+                    valor = decode_audio(data)
+                except (ValueError, RuntimeError, FileNotFoundError) as e:
+                    # Entrada ilegible (p. ej. guardada por una versión anterior): se vuelve a sintetizar
+                    print(f"⚠️  Audio ilegible en la caché TTS, se sintetiza de nuevo: {e}")
+            if valor is not None:
+                with self._lock:
+                    self.cache_hits += 1
+                future = Future()
+                future.set_result({'valor': valor, 'worker': None, 'cola_s': 0.0,
+                                   'sintesis_s': time.perf_counter() - inicio, 'cache': True})
+                return future
+
+        payload = {'text': text, 'rate': rate, 'voice': voice, 'volume': volume}
+        return self._submit('pcm', payload, cache_key=key)
+
+    def synthesize_pcm(self, text, rate=DEFAULT_RATE, voice=None, volume=None, output_path=None, timeout=None):
+        """Sintetizar y esperar: devuelve (muestras float32 mono, sr); `output_path` guarda además un WAV"""
+        samples, sr = self.submit_pcm(text, rate, voice, volume).result(timeout)['valor']
+        if output_path:
+            write_wav(output_path, samples, sr)
+        return samples, sr
+
+    def _store(self, key, audio, in_memory=False):
+        """Guardar en caché el audio recién sintetizado (ruta, o bytes del WAV si `in_memory`)"""
+        try:
+            if in_memory:
+                self.cache.put_bytes(key, audio)
+            else:
+                self.cache.put(key, audio)
+        except OSError as e:
+            print(f"⚠️  No se pudo guardar el audio en la caché TTS: {e}")
+
+    def synthesize(self, text, output_path, rate=DEFAULT_RATE, voice=None, volume=None, timeout=None):
+        """Sintetizar y esperar: devuelve {'valor', 'worker', 'cola_s', 'sintesis_s'}"""
+        return self.submit(text, output_path, rate, voice, volume).result(timeout)
+
+    def speak(self, text, rate=DEFAULT_RATE, voice=None, volume=None, timeout=None):
+        """Reproducir `text` por los altavoces desde un proceso del pool"""
+        payload = {'text': text, 'rate': rate, 'voice': voice, 'volume': volume}
+        return self._submit('say', payload).result(timeout)
+
+    def voices(self, timeout=None):
+        """Lista de (id, nombre) de las voces del motor"""
+        return self._submit('voices', {}).result(timeout)['valor']
+
+    def stats(self):
+        """Latencias de cola y de síntesis (media y máxima) e inicialización de los motores"""
+        with self._lock:
+            queue_s = list(self.queue_s)
+            synth_s = list(self.synth_s)
+        n = len(synth_s)
+        return {
+            'workers': self.workers,
+            'peticiones': n,
+            'cache_hits': self.cache_hits,
+            'cola_media_s': sum(queue_s) / n if n else 0.0,
+            'cola_max_s': max(queue_s, default=0.0),
+            'sintesis_media_s': sum(synth_s) / n if n else 0.0,
+            'sintesis_max_s': max(synth_s, default=0.0),
+            'init_s': dict(self.init_s),
+        }
+
+    def close(self, timeout=5):
+        with self._lock:
+            procs, self._procs = self._procs, []
+        if not procs:
+            return
+        for _ in procs:
+            self._requests.put(None)
+        for proc in procs:
+            proc.join(timeout)
+            if proc.is_alive():
+                proc.terminate()
+        self._results.put(None)
+        self._collector.join(timeout)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+
+def default_tts_pool(workers=None):
+    """Pool compartido por el proceso (WAV2LIP_TTS_WORKERS procesos, 1 por defecto)"""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            workers = workers or int(os.environ.get("WAV2LIP_TTS_WORKERS", "1"))
+            _default_pool = TTSPool(workers, cache=default_tts_cache())
+            atexit.register(_default_pool.close)
+        return _default_pool
+
+
+def describe_stats(pool):
+    """Línea de resumen de latencias para los logs"""
+    stats = pool.stats()
+    return (f"🗣️  TTS: {stats['peticiones']} síntesis en {stats['workers']} proceso(s), "
+            f"{stats['cache_hits']} desde caché, cola {stats['cola_media_s'] * 1000:.0f} ms, "
+            f"síntesis {stats['sintesis_media_s'] * 1000:.0f} ms")
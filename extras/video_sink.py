@@ -0,0 +1,284 @@
+"""
+VIDEO SINK - Codificación + mux de audio en un único proceso ffmpeg
+Los frames BGR se escriben como rawvideo por stdin; ffmpeg codifica con libx264 y mezcla el
+audio en la misma pasada, sin archivo temporal intermedio ni doble codificación con pérdida.
+El audio puede ser una ruta o un buffer PCM en memoria, que se envía por un pipe adicional.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from audio_io import is_pcm, write_wav
+
+
+def ffmpeg_disponible():
+    """Ruta del ejecutable ffmpeg o None si no está en el PATH"""
+    return shutil.which("ffmpeg")
+
+
+# Relojes activos que esperan el primer frame enviado a un encoder de este proceso
+_first_frame_clocks = []
+_clocks_lock = threading.Lock()
+
+
+class FirstFrameClock:
+    """
+    `with FirstFrameClock() as clock:` -> clock.at es el perf_counter() del primer frame que llega
+    a un encoder (FFmpegVideoSink o write_still_video) de este proceso dentro del bloque, o None.
+    Los frames que se escriben en otros procesos (render paralelo, servidor de modelos) no cuentan.
+    """
+
+    def __init__(self):
+        self.at = None
+
+    def __enter__(self):
+        with _clocks_lock:
+            _first_frame_clocks.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        with _clocks_lock:
+            _first_frame_clocks.remove(self)
+        return False
+
+
+def _frame_sent():
+    ahora = time.perf_counter()
+    with _clocks_lock:
+        for clock in _first_frame_clocks:
+            if clock.at is None:
+                clock.at = ahora
+
+
+class AudioInput:
+    def __init__(self, audio):
+        """
+        Entrada de audio de ffmpeg: una ruta, o (muestras, sr) en memoria escrito como f32le por
+        un pipe heredado (en sistemas sin pass_fds, un WAV temporal)
+        """
+        self.audio = audio
+        self.pass_fds = ()
+        self._write_fd = None
+        self._thread = None
+        self._tmp_path = None
+        if not is_pcm(audio):
+            self.args = ['-i', str(audio)]
+            return
+        samples, sr = audio
+        if os.name == 'posix':
+            self._samples = np.ascontiguousarray(samples, dtype='<f4')
+            read_fd, self._write_fd = os.pipe()
+            self.pass_fds = (read_fd,)
+            self.args = ['-f', 'f32le', '-ar', str(int(sr)), '-ac', '1', '-i', f'pipe:{read_fd}']
+        else:
+            fd, self._tmp_path = tempfile.mkstemp(suffix='.wav')
+            os.close(fd)
+            write_wav(self._tmp_path, samples, sr)
+            self.args = ['-i', self._tmp_path]
+
+    def started(self):
+        """Llamar tras lanzar ffmpeg: cerrar nuestra copia del extremo de lectura y empezar a escribir"""
+        if self._write_fd is None:
+            return
+        for fd in self.pass_fds:
+            os.close(fd)
+        self.pass_fds = ()
+        # Hilo propio: ffmpeg intercala la lectura de video y audio, escribir ambos en serie bloquearía
+        self._thread = threading.Thread(target=self._feed, daemon=True)
+        self._thread.start()
+
+    def _feed(self):
+        try:
+            with os.fdopen(self._write_fd, 'wb') as f:
+                f.write(self._samples.data)
+        except (BrokenPipeError, OSError):
+            # Con -shortest ffmpeg puede cerrar el pipe antes de consumir todo el audio
+            pass
+
+    def close(self):
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        elif self._write_fd is not None:
+            # ffmpeg no llegó a lanzarse
+            for fd in (*self.pass_fds, self._write_fd):
+                os.close(fd)
+            self.pass_fds = ()
+        self._write_fd = None
+        if self._tmp_path is not None:
+            os.remove(self._tmp_path)
+            self._tmp_path = None
+
+
+class FFmpegVideoSink:
+    def __init__(self, output_path, width, height, fps=25, audio_path=None,
+                 crf=23, preset="veryfast", shortest=True, threads=None):
+        """
+        Preparar el encoder; el proceso se lanza con open() o al entrar en el `with`.
+        `audio_path` puede ser una ruta o un buffer (muestras, sr) en memoria.
+        """
+        self.output_path = output_path
+        self.width = int(width)
+        self.height = int(height)
+        self.fps = fps
+        self.audio_path = audio_path
+        self.crf = crf
+        self.preset = preset
+        self.shortest = shortest
+        self.threads = threads
+        self.frames_written = 0
+        self._proc = None
+        self._stderr = None
+        self._audio = None
+
+    def build_command(self):
+        ffmpeg = ffmpeg_disponible()
+        if ffmpeg is None:
+            raise FileNotFoundError("ffmpeg no encontrado en PATH")
+        cmd = [
+            ffmpeg, '-y', '-v', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24',
+            '-s', f'{self.width}x{self.height}', '-r', str(self.fps),
+            '-i', 'pipe:0',
+        ]
+        if self._audio is not None:
+            cmd += self._audio.args + ['-map', '0:v:0', '-map', '1:a:0', '-c:a', 'aac', '-b:a', '192k']
+            if self.shortest:
+                cmd.append('-shortest')
+        cmd += [
+            # yuv420p exige dimensiones pares
+            '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+            '-c:v', 'libx264', '-preset', self.preset, '-crf', str(self.crf),
+            '-pix_fmt', 'yuv420p', '-movflags', '+faststart',
+        ]
+        if self.threads:
+            cmd += ['-threads', str(self.threads)]
+        cmd.append(str(self.output_path))
+        return cmd
+
+    def open(self):
+        # stderr a un archivo temporal: con un PIPE ffmpeg podría bloquearse mientras escribimos stdin
+        self._stderr = tempfile.TemporaryFile()
+        if self.audio_path is not None:
+            self._audio = AudioInput(self.audio_path)
+        try:
+            self._proc = subprocess.Popen(self.build_command(), stdin=subprocess.PIPE,
+                                          stdout=subprocess.DEVNULL, stderr=self._stderr,
+                                          pass_fds=self._audio.pass_fds if self._audio else ())
+        except Exception:
+            self._close_audio()
+            raise
+        if self._audio is not None:
+            self._audio.started()
+        return self
+
+    def _close_audio(self):
+        if self._audio is not None:
+            self._audio.close()
+            self._audio = None
+
+    def _error_output(self):
+        if self._stderr is None:
+            return ""
+        self._stderr.seek(0)
+        return self._stderr.read().decode(errors='replace').strip()
+
+    def write(self, frame):
+        """Enviar un frame BGR uint8 de (height, width, 3) al encoder"""
+        if self._proc is None:
+            self.open()
+        if frame.shape != (self.height, self.width, 3):
+            raise ValueError(f"Frame de tamaño {frame.shape}, se esperaba {(self.height, self.width, 3)}")
+        try:
+            self._proc.stdin.write(np.ascontiguousarray(frame, dtype=np.uint8).data)
+        except BrokenPipeError:
+            self._proc.wait()
+            raise RuntimeError(f"ffmpeg terminó antes de tiempo: {self._error_output()}")
+        if self.frames_written == 0 and _first_frame_clocks:
+            _frame_sent()
+        self.frames_written += 1
+
+    def close(self):
+        """Cerrar stdin, esperar a ffmpeg y lanzar RuntimeError si falló"""
+        if self._proc is None:
+            return
+        try:
+            self._proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = self._proc.wait()
+        self._close_audio()
+        error = self._error_output()
+        self._stderr.close()
+        self._proc = None
+        self._stderr = None
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg falló (código {returncode}): {error}")
+
+    def abort(self):
+        """Matar el encoder sin esperar a que termine el archivo (ante un error del productor)"""
+        if self._proc is None:
+            return
+        self._proc.kill()
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass
+        self._proc.wait()
+        self._close_audio()
+        self._stderr.close()
+        self._proc = None
+        self._stderr = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def write_still_video(image, output_path, audio_path, fps=25, crf=None, preset=None):
+    """
+    Video de imagen fija + audio a partir de un frame BGR ya decodificado: el frame se envía
+    una sola vez como rawvideo y el filtro loop lo repite hasta que termina el audio.
+    `audio_path` puede ser una ruta o un buffer (muestras, sr) en memoria.
+    """
+    ffmpeg = ffmpeg_disponible()
+    if ffmpeg is None:
+        raise FileNotFoundError("ffmpeg no encontrado en PATH")
+    height, width = image.shape[:2]
+    audio = AudioInput(audio_path)
+    cmd = [
+        ffmpeg, '-y', '-v', 'error',
+        '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-framerate', str(fps),
+        '-i', 'pipe:0', *audio.args, '-map', '0:v:0', '-map', '1:a:0',
+        '-vf', 'loop=loop=-1:size=1,pad=ceil(iw/2)*2:ceil(ih/2)*2',
+        '-c:v', 'libx264', '-tune', 'stillimage',
+    ]
+    if preset:
+        cmd += ['-preset', preset]
+    if crf is not None:
+        cmd += ['-crf', str(crf)]
+    cmd += ['-c:a', 'aac', '-b:a', '192k', '-pix_fmt', 'yuv420p', '-shortest', str(output_path)]
+    try:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                pass_fds=audio.pass_fds)
+        audio.started()
+        frame = np.ascontiguousarray(image, dtype=np.uint8).tobytes()
+        _frame_sent()
+        _, stderr = proc.communicate(frame)
+    finally:
+        audio.close()
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg falló (código {proc.returncode}): {stderr.decode(errors='replace').strip()}")
+    return output_path
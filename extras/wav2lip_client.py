@@ -0,0 +1,144 @@
+"""
+WAV2LIP CLIENT - Cliente del servidor de modelos (wav2lip_server.py)
+Sin torch: la CLI y la suite intentan primero el servidor local y, si no está levantado,
+render_remoto() devuelve None y el llamador renderiza en su propio proceso como siempre.
+Protocolo: una petición JSON por conexión y una línea JSON de respuesta, por un socket UNIX
+accesible solo para el usuario (sin TCP: no hay autenticación y el trabajo elige dónde escribir).
+Donde no hay AF_UNIX el servidor no está disponible. WAV2LIP_SERVER cambia la ruta; "0" lo desactiva.
+"""
+
+import json
+import os
+import shutil
+import socket
+import tempfile
+
+import cv2
+import numpy as np
+
+from audio_io import is_pcm, write_wav
+
+CONNECT_TIMEOUT = 0.5
+DISABLED_VALUES = ('0', 'off', 'no', 'false')
+
+
+def default_address():
+    """Socket UNIX por usuario en el directorio temporal (None donde no hay AF_UNIX)"""
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    address = os.environ.get('WAV2LIP_SERVER')
+    if address:
+        return address
+    uid = os.getuid() if hasattr(os, 'getuid') else 0
+    return os.path.join(tempfile.gettempdir(), f"wav2lip_server_{uid}.sock")
+
+
+def server_enabled():
+    if not hasattr(socket, 'AF_UNIX'):
+        return False
+    return os.environ.get('WAV2LIP_SERVER', '').strip().lower() not in DISABLED_VALUES
+
+
+def connect(address=None, timeout=CONNECT_TIMEOUT):
+    """Socket conectado al servidor, o None si no hay ninguno escuchando"""
+    address = address or default_address()
+    if address is None:
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(address)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def _exchange(sock, message):
+    """Enviar una petición y leer la línea de respuesta; la conexión se cierra siempre"""
+    with sock, sock.makefile('rwb') as stream:
+        stream.write(json.dumps(message).encode('utf-8') + b'\n')
+        stream.flush()
+        line = stream.readline()
+    if not line:
+        raise ConnectionError("el servidor cerró la conexión sin responder")
+    return json.loads(line)
+
+
+def request(message, address=None, timeout=None):
+    """Petición al servidor (None si no está levantado); timeout=None espera lo que dure el trabajo"""
+    sock = connect(address)
+    if sock is None:
+        return None
+    sock.settimeout(timeout)
+    return _exchange(sock, message)
+
+
+def server_stats(address=None):
+    """Estadísticas del servidor en marcha, o None si no responde"""
+    try:
+        return request({'op': 'stats'}, address, timeout=5)
+    except (OSError, ValueError):
+        return None
+
+
+def render_remoto(motor, imagen, audio, salida, address=None, **params):
+    """
+    Renderizar en el servidor. `imagen` y `audio` pueden ser rutas o estar en memoria (ndarray,
+    buffer (muestras, sr)): en ese caso se escriben en un PNG/WAV temporal que el servidor lee.
+    Devuelve True/False con la respuesta del servidor, o None si no hay servidor disponible.
+    """
+    if not server_enabled():
+        return None
+    sock = connect(address)
+    if sock is None:
+        return None
+
+    tmp_dir = None
+    try:
+        if isinstance(imagen, np.ndarray) or is_pcm(audio):
+            tmp_dir = tempfile.mkdtemp(prefix='wav2lip_job_')
+        if isinstance(imagen, np.ndarray):
+            # PNG: sin pérdida, y los mismos píxeles dan los mismos bytes (perfil cacheado en el servidor)
+            ruta = os.path.join(tmp_dir, 'imagen.png')
+            if not cv2.imwrite(ruta, imagen, [cv2.IMWRITE_PNG_COMPRESSION, 1]):
+                raise OSError(f"no se pudo escribir {ruta}")
+            imagen = ruta
+        if is_pcm(audio):
+            ruta = os.path.join(tmp_dir, 'audio.wav')
+            write_wav(ruta, *audio)
+            audio = ruta
+
+        message = {'op': 'render', 'motor': motor, 'imagen': os.path.abspath(imagen),
+                   'audio': os.path.abspath(audio), 'salida': os.path.abspath(salida), 'params': params}
+        sock.settimeout(None)
+        try:
+            respuesta = _exchange(sock, message)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Servidor de modelos no disponible ({e}), renderizando en este proceso")
+            return None
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    if not respuesta.get('ok'):
+        print(f"❌ Error en el servidor de modelos: {respuesta.get('error')}")
+        return False
+    print(f"🛰️  Servidor de modelos: {describe_job(respuesta)}")
+    return True
+
+
+def describe_job(respuesta):
+    """Línea de resumen de un trabajo atendido por el servidor"""
+    return (f"{respuesta['latencia_s']:.2f} s (espera en cola {respuesta['espera_s']:.2f} s, "
+            f"proceso {respuesta['proceso_s']:.2f} s, {respuesta['cola']} trabajo(s) delante)")
+
+
+def describe_server_stats(stats):
+    """Resumen de las estadísticas del servidor para los logs"""
+    return (f"🛰️  Servidor (pid {stats['pid']}, {stats['activo_s']:.0f} s activo): "
+            f"{stats['trabajos']} trabajo(s), {stats['errores']} error(es), "
+            f"{stats['en_cola']} en cola, {stats['en_curso']} en curso\n"
+            f"   Latencia media {stats['latencia_media_s']:.2f} s, p95 {stats['latencia_p95_s']:.2f} s, "
+            f"espera media {stats['espera_media_s']:.2f} s; motores cargados: "
+            f"{', '.join(stats['motores']) or 'ninguno'}")
@@ -0,0 +1,275 @@
+"""
+WAV2LIP INFERENCE - Motor de inferencia Wav2Lip en proceso, con el modelo cargado una sola vez
+Sustituye al `python inference.py` por trabajo (con os.chdir a Wav2Lip/): el checkpoint se carga
+al crear el motor, las caras y los mel-chunks se procesan por lotes bajo torch.inference_mode y
+los frames van directos al encoder. Sin cambios de directorio, así que es seguro entre hilos.
+Con model=Wav2Lip() (pesos aleatorios) se prueba todo el camino sin descargar el checkpoint.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+
+import audio_features
+from audio_features import melspectrogram, mel_chunks
+from audio_io import audio_duration, audio_source
+from avatar_profile import default_avatar_store, image_source
+from detector_registry import HAAR_FRONTALFACE, get_haar_cascade
+from face_detection import DEFAULT_DETECT_SIZE, detect_faces, largest_face
+from face_tracking import DEFAULT_DETECT_EVERY, FaceBoxTracker
+from feature_cache import default_feature_cache
+from video_sink import FFmpegVideoSink
+from wav2lip_model import Wav2Lip, load_checkpoint
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CHECKPOINT = os.environ.get(
+    "WAV2LIP_CHECKPOINT", os.path.join(BASE_DIR, "Wav2Lip", "checkpoints", "wav2lip_gan.pth"))
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+IMG_SIZE = 96
+# Mismos valores por defecto que inference.py: lotes de 128 y 10 px extra bajo la barbilla
+DEFAULT_BATCH_SIZE = 128
+DEFAULT_PADS = (0, 10, 0, 0)
+# hparams del original: mels simétricos en [-4, 4]
+MEL_MAX_ABS = 4.0
+
+
+class Wav2LipInference:
+    def __init__(self, checkpoint_path=None, model=None, device='cpu', batch_size=DEFAULT_BATCH_SIZE,
+                 pads=DEFAULT_PADS, detect_size=DEFAULT_DETECT_SIZE, detect_every=DEFAULT_DETECT_EVERY,
+                 feature_cache=None, avatar_store=None, threads=None):
+        """
+        Cargar el checkpoint (o usar `model`, p. ej. un Wav2Lip() aleatorio para pruebas) una vez.
+        `pads` = (arriba, abajo, izquierda, derecha) alrededor de la cara detectada.
+        """
+        self.device = torch.device(device)
+        if threads:
+            torch.set_num_threads(int(threads))
+        inicio = time.perf_counter()
+        if model is None:
+            self.checkpoint_path = checkpoint_path or DEFAULT_CHECKPOINT
+            if not os.path.exists(self.checkpoint_path):
+                raise FileNotFoundError(f"Checkpoint no encontrado: {self.checkpoint_path}")
+            model = load_checkpoint(self.checkpoint_path, self.device)
+        else:
+            self.checkpoint_path = None
+        self.model = model.to(self.device).eval()
+        self.load_s = time.perf_counter() - inicio
+
+        self.batch_size = max(1, int(batch_size))
+        self.pads = tuple(int(p) for p in pads)
+        self.detect_size = detect_size
+        self.detect_every = detect_every
+        self.feature_cache = feature_cache if feature_cache is not None else default_feature_cache()
+        self.avatar_store = avatar_store if avatar_store is not None else default_avatar_store()
+
+        # Un forward a la vez: torch ya reparte cada lote entre los hilos de la CPU
+        self._lock = threading.Lock()
+        self.jobs = 0
+        self.frames = 0
+        self.batches = 0
+        self.inference_s = 0.0
+
+    def padded_box(self, face, shape):
+        """(x, y, w, h) de Haar -> [x1, y1, x2, y2] con los márgenes `pads`, dentro de la imagen"""
+        x, y, w, h = face
+        top, bottom, left, right = self.pads
+        img_h, img_w = shape[:2]
+        return [max(0, int(x) - left), max(0, int(y) - top),
+                min(img_w, int(x + w) + right), min(img_h, int(y + h) + bottom)]
+
+    def detect_face_box(self, image):
+        """Caja con márgenes de la cara más grande, o None si no hay cara"""
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        faces = detect_faces(gray, get_haar_cascade(HAAR_FRONTALFACE), 1.3, 5, detect_size=self.detect_size)
+        if len(faces) == 0:
+            return None
+        return self.padded_box(largest_face(faces), image.shape)
+
+    def load_still(self, image):
+        """Imagen (ruta o ndarray) + caja de la cara, cacheadas en el almacén de perfiles"""
+        data, decodificar = image_source(image)
+
+        def construir(img):
+            box = self.detect_face_box(img)
+            return {'caja': None if box is None else [int(v) for v in box]}
+
+        params = {'perfil': 'wav2lip_inference', 'detect_size': self.detect_size, 'pads': list(self.pads),
+                  'version': 2}
+        profile = self.avatar_store.get_or_build(data, params, construir, decode=decodificar)
+        if profile['caja'] is None:
+            raise ValueError("No se detectó ninguna cara en la imagen")
+        return profile['imagen'], profile['caja']
+
+    def load_video(self, video_path):
+        """Frames del video y una caja por frame (detección en fotogramas clave + seguimiento)"""
+        frames = []
+        cap = cv2.VideoCapture(str(video_path))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            frames.append(frame)
+        cap.release()
+        if not frames:
+            raise ValueError(f"No se pudieron leer frames de {video_path}")
+        tracker = FaceBoxTracker(self.detect_face_box, detect_every=self.detect_every)
+        return frames, tracker.track(frames), fps
+
+    def load_mel_chunks(self, audio, fps=25):
+        """
+        Mel-chunks (N, 80, 16) en la escala del modelo ([-4, 4]); la clave de caché es la misma
+        que la del motor mejorado, así ambos comparten los chunks de un mismo audio
+        """
+        data, decode = audio_source(audio)
+
+        def calcular():
+            samples, sr = decode()
+            total_frames = int(audio_duration(samples, sr) * fps)
+            return mel_chunks(melspectrogram(samples, sr), total_frames, fps=fps)
+
+        params = {
+            'extractor': 'mel_chunks', 'fps': fps, 'step': audio_features.MEL_STEP_SIZE,
+            'sr': audio_features.SAMPLE_RATE, 'n_fft': audio_features.N_FFT,
+            'hop': audio_features.HOP_SIZE, 'mels': audio_features.NUM_MELS, 'version': 1,
+        }
+        chunks = self.feature_cache.get_or_compute(data, params, calcular)
+        return np.asarray(chunks, dtype=np.float32) * (2 * MEL_MAX_ABS) - MEL_MAX_ABS
+
+    def face_input(self, frame, box):
+        """Cara recortada a 96x96 -> (6, 96, 96) float32: mitad inferior enmascarada + referencia"""
+        x1, y1, x2, y2 = [int(v) for v in box]
+        face = cv2.resize(frame[y1:y2, x1:x2], (IMG_SIZE, IMG_SIZE))
+        masked = face.copy()
+        masked[IMG_SIZE // 2:] = 0
+        return np.concatenate((masked, face), axis=2).transpose(2, 0, 1).astype(np.float32) / 255.0
+
+    def predict(self, faces, mels):
+        """
+        Un lote: caras (B, 6, 96, 96) y mels (B, 80, 16) -> caras generadas (B, 96, 96, 3) uint8.
+        `faces` con B=1 se reutiliza para todo el lote (imagen estática)
+        """
+        mels = torch.from_numpy(np.ascontiguousarray(mels, dtype=np.float32)).unsqueeze(1)
+        faces = torch.from_numpy(np.ascontiguousarray(faces, dtype=np.float32))
+        if faces.shape[0] == 1 and mels.shape[0] > 1:
+            faces = faces.expand(mels.shape[0], -1, -1, -1)
+        inicio = time.perf_counter()
+        with self._lock, torch.inference_mode():
+            pred = self.model(mels.to(self.device), faces.to(self.device))
+            pred = (pred.clamp(0, 1) * 255).to(torch.uint8).permute(0, 2, 3, 1).cpu().numpy()
+        with self._lock:
+            self.inference_s += time.perf_counter() - inicio
+            self.batches += 1
+            self.frames += len(pred)
+        return pred
+
+    def generate_frames(self, frames, boxes, mels, still=False):
+        """Frames con la boca generada, lote a lote (generador: memoria acotada a un lote)"""
+        n = len(mels)
+        static_input = self.face_input(frames[0], boxes[0])[None] if still else None
+        canvas = frames[0].copy() if still else None
+        for start in range(0, n, self.batch_size):
+            idx = range(start, min(n, start + self.batch_size))
+            if still:
+                faces = static_input
+            else:
+                faces = np.stack([self.face_input(frames[i % len(frames)], boxes[i % len(frames)]) for i in idx])
+            pred = self.predict(faces, mels[idx.start:idx.stop])
+            for k, i in enumerate(idx):
+                frame = frames[0] if still else frames[i % len(frames)]
+                x1, y1, x2, y2 = [int(v) for v in (boxes[0] if still else boxes[i % len(frames)])]
+                out = canvas if still else frame.copy()
+                out[y1:y2, x1:x2] = cv2.resize(pred[k], (x2 - x1, y2 - y1))
+                yield out
+
+    def render(self, face, audio, output_path, fps=25):
+        """
+        Generar el video completo: `face` es una ruta de imagen/video o un ndarray y `audio` una
+        ruta o un buffer (muestras, sr). Lanza excepción si falla; devuelve un resumen del trabajo.
+        """
+        inicio = time.perf_counter()
+        still = isinstance(face, np.ndarray) or Path(face).suffix.lower() not in VIDEO_EXTENSIONS
+        if still:
+            image, box = self.load_still(face)
+            frames, boxes = [image], [box]
+        else:
+            frames, boxes, fps = self.load_video(face)
+        mels = self.load_mel_chunks(audio, fps)
+        if len(mels) == 0:
+            raise ValueError("El audio no contiene frames que generar")
+
+        height, width = frames[0].shape[:2]
+        frames_antes, inferencia_antes = self.frames, self.inference_s
+        with FFmpegVideoSink(output_path, width, height, fps=fps, audio_path=audio) as sink:
+            for frame in self.generate_frames(frames, boxes, mels, still):
+                sink.write(frame)
+        with self._lock:
+            self.jobs += 1
+        return {
+            'salida': output_path,
+            'frames': self.frames - frames_antes,
+            'inferencia_s': self.inference_s - inferencia_antes,
+            'total_s': time.perf_counter() - inicio,
+        }
+
+    def create_video_from_image(self, image_path, audio_path, output_path="wav2lip_inference.mp4", workers=1):
+        """Misma interfaz que los motores simple/mejorado: devuelve True/False e informa por consola"""
+        try:
+            resumen = self.render(image_path, audio_path, output_path)
+        except Exception as e:
+            print(f"❌ Error en la inferencia Wav2Lip: {e}")
+            return False
+        print(f"✅ Video final creado: {output_path}")
+        print(describe_job(resumen))
+        return True
+
+    def stats(self):
+        """Carga del modelo, trabajos, frames y lotes procesados y velocidad de inferencia"""
+        with self._lock:
+            return {
+                'carga_s': self.load_s,
+                'trabajos': self.jobs,
+                'frames': self.frames,
+                'lotes': self.batches,
+                'inferencia_s': self.inference_s,
+                'frames_por_segundo': self.frames / self.inference_s if self.inference_s else 0.0,
+            }
+
+
+def describe_job(resumen):
+    """Línea de resumen de un trabajo para los logs"""
+    fps = resumen['frames'] / resumen['inferencia_s'] if resumen['inferencia_s'] else 0.0
+    return (f"🧠 Wav2Lip: {resumen['frames']} frames, inferencia {resumen['inferencia_s']:.2f} s "
+            f"({fps:.0f} frames/s), total {resumen['total_s']:.2f} s")
+
+
+_default_engines = {}
+_default_lock = threading.Lock()
+
+
+def default_inference_engine(checkpoint_path=None, **kwargs):
+    """
+    Motor compartido por el proceso para cada checkpoint y configuración: el modelo se carga una
+    sola vez. La clave incluye todos los argumentos, así que otro `detect_size` (u otros ajustes)
+    da otro motor en lugar de heredar los del primero.
+    """
+    path = os.path.abspath(checkpoint_path or DEFAULT_CHECKPOINT)
+    key = (path, repr(sorted(kwargs.items())))
+    with _default_lock:
+        engine = _default_engines.get(key)
+        if engine is None:
+            engine = Wav2LipInference(path, **kwargs)
+            _default_engines[key] = engine
+            print(f"🧠 Modelo Wav2Lip cargado en {engine.load_s:.2f} s: {path}")
+        return engine
+
+
+def random_inference_engine(seed=0, **kwargs):
+    """Motor con un Wav2Lip de pesos aleatorios (misma arquitectura) para pruebas sin checkpoint"""
+    torch.manual_seed(seed)
+    return Wav2LipInference(model=Wav2Lip(), **kwargs)
@@ -4,108 +4,157 @@ Basado en el proyecto original Wav2Lip pero adaptado para funcionar sin dependen
 """
 
 import cv2
+import itertools
 import numpy as np
 import os
-import subprocess
-import tempfile
 from pathlib import Path
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
+import audio_features
+from audio_features import melspectrogram, mel_chunks
+from audio_io import audio_source, audio_duration
+from avatar_profile import default_avatar_store, describe_stats, image_source
+from detector_registry import HAAR_FRONTALFACE, get_haar_cascade
+from face_detection import DEFAULT_DETECT_SIZE, detect_faces, largest_face
+from face_tracking import DEFAULT_DETECT_EVERY, FaceBoxTracker, smooth_boxes
+from feature_cache import default_feature_cache
+from mouth_atlas import DEFAULT_LEVELS, MouthAtlas, get_or_build_atlas
+from parallel_render import render_parallel
+from perf_stats import peak_rss_mb
+from video_sink import FFmpegVideoSink
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
 class Wav2LipMejorado:
-    def __init__(self):
+    def __init__(self, feature_cache=None, atlas_levels=None, detect_size=DEFAULT_DETECT_SIZE,
+                 detect_every=DEFAULT_DETECT_EVERY, avatar_store=None):
         """Inicializar el sistema mejorado de lip-sync"""
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         print(f"🔧 Usando dispositivo: {self.device}")
         
-        # Inicializar detector de caras
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        
         # Configuración del modelo
         self.img_size = 96
         self.mel_step_size = 16
         
+        # Caché de mel-chunks por contenido del audio
+        self.feature_cache = feature_cache if feature_cache is not None else default_feature_cache()
+        
+        # Perfiles de avatar (caja de la cara, atlas) cacheados por contenido
+        self.avatar_store = avatar_store if avatar_store is not None else default_avatar_store()
+        
+        # Modo atlas: N estados de boca pre-renderizados para imágenes estáticas (None, por defecto:
+        # renderizar cada frame; el render paralelo usa el atlas siempre)
+        self.atlas_levels = atlas_levels
+        
+        # Lado mayor de la imagen sobre la que se detecta (None: resolución completa)
+        self.detect_size = detect_size
+        
+        # Entrada de video: detección completa cada N frames y seguimiento entre medias (1: cada frame)
+        self.detect_every = detect_every
+    
+    @property
+    def face_cascade(self):
+        """Detector de caras del registro compartido (una instancia por hilo)"""
+        return get_haar_cascade(HAAR_FRONTALFACE)
+    
     def get_smoothened_boxes(self, boxes, T):
-        """Suavizar las cajas de detección para reducir jitter"""
-        for i in range(len(boxes)):
-            if i + T > len(boxes):
-                window = boxes[len(boxes) - T:]
-            else:
-                window = boxes[i : i + T]
-            boxes[i] = np.mean(window, axis=0)
-        return boxes
+        """Suavizar las cajas de detección para reducir jitter (media móvil vectorizada)"""
+        return smooth_boxes(boxes, T)
     
-    def face_detect(self, images):
-        """Detectar caras en secuencia de imágenes"""
-        detector_batch_size = 32
-        results = []
-        
-        for i in range(0, len(images), detector_batch_size):
-            batch = images[i:i+detector_batch_size]
-            batch_results = []
-            
-            for image in batch:
-                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-                faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
-                
-                if len(faces) > 0:
-                    # Tomar la cara más grande
-                    face = max(faces, key=lambda x: x[2] * x[3])
-                    x, y, w, h = face
-                    
-                    # Expandir un poco la región para mejor resultado
-                    margin = 0.2
-                    x = max(0, int(x - w * margin))
-                    y = max(0, int(y - h * margin))
-                    w = int(w * (1 + 2 * margin))
-                    h = int(h * (1 + 2 * margin))
-                    
-                    batch_results.append([x, y, x+w, y+h])
-                else:
-                    # Si no se detecta cara, usar imagen completa
-                    h, w = image.shape[:2]
-                    batch_results.append([0, 0, w, h])
-            
-            results.extend(batch_results)
+    def detect_face_box(self, image, full_frame_fallback=True):
+        """Detectar la cara más grande de una imagen y devolver [x1, y1, x2, y2] con margen"""
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        faces = detect_faces(gray, self.face_cascade, 1.3, 5, detect_size=self.detect_size)
+        img_h, img_w = image.shape[:2]
+        
+        if len(faces) == 0:
+            # Si no se detecta cara, usar imagen completa (o None para que el tracker mantenga la última)
+            return [0, 0, img_w, img_h] if full_frame_fallback else None
+        
+        # Tomar la cara más grande
+        x, y, w, h = largest_face(faces)
+        
+        # Expandir un poco la región para mejor resultado (sin salirse de la imagen)
+        margin = 0.2
+        x1 = max(0, int(x - w * margin))
+        y1 = max(0, int(y - h * margin))
+        x2 = min(img_w, x1 + int(w * (1 + 2 * margin)))
+        y2 = min(img_h, y1 + int(h * (1 + 2 * margin)))
+        return [x1, y1, x2, y2]
+    
+    def face_detect(self, images, fps=25):
+        """Detectar caras en secuencia de imágenes (entrada de video)"""
+        if self.detect_every and self.detect_every > 1:
+            # Detección en fotogramas clave + seguimiento y suavizado causal entre medias
+            tracker = FaceBoxTracker(lambda image: self.detect_face_box(image, full_frame_fallback=False),
+                                     detect_every=self.detect_every)
+            results = tracker.track(images)
+            stats = tracker.stats(fps)
+            print(f"🎯 Detecciones: {stats['detecciones']}/{stats['frames']} frames "
+                  f"({stats['detecciones_por_segundo_video']:.1f}/s de video, "
+                  f"{stats['detecciones_por_segundo']:.1f}/s reales, {stats['frames_por_segundo']:.0f} frames/s)")
+            return results
+        
+        results = [self.detect_face_box(image) for image in images]
         
         # Suavizar las detecciones
         results = self.get_smoothened_boxes(np.array(results), T=5)
         return results
     
+    def load_avatar_profile(self, image_path):
+        """Perfil de una imagen estática (ruta o ndarray): imagen, caja de la cara y atlas, cacheado en disco"""
+        data, decodificar = image_source(image_path)
+        
+        def construir(image):
+            box = self.detect_face_box(image)
+            profile = {'caja': [int(v) for v in box]}
+            if self.atlas_levels:
+                profile['atlas'] = self.build_mouth_atlas(image, box).patches
+            return profile
+        
+        params = {'perfil': 'wav2lip_mejorado', 'detect_size': self.detect_size,
+                  'atlas_levels': self.atlas_levels, 'renderer': 'wav2lip_mejorado.erode', 'version': 2}
+        return self.avatar_store.get_or_build(data, params, construir, decode=decodificar)
+    
+    def load_face_frames(self, face_path):
+        """Cargar la entrada como (frames, es_estatica): una imagen da un solo frame base"""
+        if Path(face_path).suffix.lower() not in VIDEO_EXTENSIONS:
+            image = cv2.imread(face_path)
+            return ([image] if image is not None else []), True
+        
+        frames = []
+        cap = cv2.VideoCapture(face_path)
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            frames.append(frame)
+        cap.release()
+        return frames, False
+    
     def load_audio_features(self, audio_path, fps=25):
-        """Cargar y procesar características de audio simuladas"""
-        try:
-            # Obtener duración del audio
-            result = subprocess.run([
-                'ffprobe', '-v', 'quiet', '-show_entries', 
-                'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', 
-                audio_path
-            ], capture_output=True, text=True)
-            duration = float(result.stdout.strip())
-        except:
-            duration = 3.0
-        
-        total_frames = int(duration * fps)
-        
-        # Simular mel-espectrogramas (en una implementación real usarías librosa)
-        mel_chunks = []
-        for i in range(total_frames):
-            # Crear mel-espectrograma simulado 80x16
-            time = i / fps
-            mel = np.zeros((80, 16))
-            
-            # Simular características de voz
-            for freq in range(80):
-                for t in range(16):
-                    # Agregar patrones de frecuencia simulados
-                    intensity = np.sin((time + t/16) * (freq/10 + 1) * 2 * np.pi) * 0.5 + 0.5
-                    noise = np.random.normal(0, 0.1)
-                    mel[freq, t] = np.clip(intensity + noise, 0, 1)
+        """
+        Cargar el audio y calcular los chunks de mel-espectrograma (N, 80, 16), uno por frame
+        `audio_path` puede ser una ruta o un buffer (muestras, sr) en memoria (p. ej. del TTS)
+        """
+        data, decode = audio_source(audio_path)
+        
+        def calcular():
+            samples, sr = decode()
+            total_frames = int(audio_duration(samples, sr) * fps)
             
-            mel_chunks.append(mel)
+            # Mel-espectrograma real (STFT + banco de filtros mel vectorizados)
+            mel = melspectrogram(samples, sr)
+            return mel_chunks(mel, total_frames, fps=fps, step=self.mel_step_size)
         
-        return np.array(mel_chunks)
+        params = {
+            'extractor': 'mel_chunks', 'fps': fps, 'step': self.mel_step_size,
+            'sr': audio_features.SAMPLE_RATE, 'n_fft': audio_features.N_FFT,
+            'hop': audio_features.HOP_SIZE, 'mels': audio_features.NUM_MELS, 'version': 1,
+        }
+        return self.feature_cache.get_or_compute(data, params, calcular)
     
     def preprocess_frames(self, frames, boxes):
         """Preprocesar frames para el modelo"""
@@ -131,56 +180,69 @@ class Wav2LipMejorado:
         
         return np.array(processed_frames)
     
-    def generate_lip_sync_frames(self, frames, mel_chunks, boxes):
-        """Generar frames con sincronización de labios"""
+    def generate_lip_sync_frames(self, frames, mel_chunks, boxes, atlas=None):
+        """
+        Generar frames con sincronización de labios uno a uno (generador, memoria acotada).
+        Solo se recalcula el parche de la boca: el frame de fondo es inmutable y la salida se
+        compone en un buffer reutilizado, así que cada frame entregado es válido hasta el siguiente.
+        Con `atlas` (imagen estática) el parche se busca en lugar de renderizarse.
+        """
         print("🎭 Generando sincronización de labios...")
         
-        synced_frames = []
+        if atlas is not None:
+            states = atlas.indices(self.voice_intensities(mel_chunks))
+        
+        canvas = None
+        background = None
+        dirty = None
         
         for i, (frame, mel_chunk, box) in enumerate(zip(frames, mel_chunks, boxes)):
             x1, y1, x2, y2 = [int(x) for x in box]
             
-            # Extraer región de la cara
-            face_region = frame[y1:y2, x1:x2]
+            if canvas is None or canvas.shape != frame.shape:
+                canvas = frame.copy()
+            elif frame is not background:
+                # Entrada de video: el fondo cambia en cada frame
+                np.copyto(canvas, frame)
+            elif dirty is not None:
+                # Imagen estática: basta con restaurar el rectángulo de la boca anterior
+                canvas[dirty] = frame[dirty]
+            background = frame
+            dirty = None
             
-            if face_region.size > 0:
-                # Aplicar transformación de lip-sync simulada
-                synced_face = self.apply_lip_sync_transformation(face_region, mel_chunk)
-                
-                # Crear frame de salida
-                output_frame = frame.copy()
-                
-                # Redimensionar cara sincronizada al tamaño original
-                synced_face_resized = cv2.resize(synced_face, (x2-x1, y2-y1))
-                
-                # Reemplazar región de la cara
-                output_frame[y1:y2, x1:x2] = synced_face_resized
-                
-                synced_frames.append(output_frame)
-            else:
-                synced_frames.append(frame)
+            # Región de la boca (tercio inferior de la cara)
+            mouth_y1 = y1 + int((y2 - y1) * 0.6)
+            mouth_region = frame[mouth_y1:y2, x1:x2]
+            
+            if mouth_region.size > 0:
+                # Aplicar transformación de lip-sync simulada solo sobre la boca
+                if atlas is not None:
+                    patch = atlas.patches[states[i]]
+                else:
+                    patch = self.render_mouth_patch(mouth_region, mel_chunk)
+                if patch is not mouth_region:
+                    dirty = (slice(mouth_y1, y2), slice(x1, x2))
+                    canvas[dirty] = patch
+            
+            yield canvas
             
             # Mostrar progreso
             if i % 25 == 0:
-                progress = (i / len(frames)) * 100
+                progress = (i / len(mel_chunks)) * 100
                 print(f"📊 Progreso lip-sync: {progress:.1f}%")
-        
-        return synced_frames
     
-    def apply_lip_sync_transformation(self, face_region, mel_chunk):
-        """Aplicar transformación de sincronización de labios"""
-        h, w = face_region.shape[:2]
-        
+    def voice_intensities(self, mel_chunks):
+        """Intensidad de voz por frame: media de las bandas de voz humana (20-60) de cada chunk"""
+        return np.asarray(mel_chunks)[:, 20:60, :].mean(axis=(1, 2), dtype=np.float32)
+    
+    def render_mouth_patch(self, mouth_region, mel_chunk):
+        """Calcular el parche de la boca; devuelve la misma región si la boca está cerrada"""
         # Calcular intensidad de la voz basada en mel-espectrograma
         voice_intensity = np.mean(mel_chunk[20:60, :])  # Frecuencias de voz humana
-        
-        # Región de la boca (tercio inferior de la cara)
-        mouth_y_start = int(h * 0.6)
-        mouth_y_end = h
-        
-        # Crear máscara para la boca
-        mouth_region = face_region[mouth_y_start:mouth_y_end, :].copy()
-        
+        return self.mouth_patch_for_intensity(mouth_region, voice_intensity)
+    
+    def mouth_patch_for_intensity(self, mouth_region, voice_intensity):
+        """Transformación de la boca como función pura de la intensidad de voz"""
         # Aplicar deformación basada en intensidad de voz
         if voice_intensity > 0.3:  # Umbral para apertura de boca
             # Simular apertura de boca
@@ -192,78 +254,135 @@ class Wav2LipMejorado:
                 kernel = np.ones((kernel_size, kernel_size), np.uint8)
                 
                 # Aplicar erosión para simular apertura
-                mouth_region = cv2.erode(mouth_region, kernel, iterations=1)
+                patch = cv2.erode(mouth_region, kernel, iterations=1)
                 
                 # Oscurecer ligeramente para simular interior de la boca
-                mouth_region = (mouth_region * 0.8).astype(np.uint8)
+                return (patch * 0.8).astype(np.uint8)
+        
+        return mouth_region
+    
+    def build_mouth_atlas(self, image, box):
+        """Pre-renderizar los estados cuantizados de la boca de este avatar (cacheado por contenido)"""
+        x1, y1, x2, y2 = [int(v) for v in box]
+        mouth_y1 = y1 + int((y2 - y1) * 0.6)
+        mouth_region = image[mouth_y1:y2, x1:x2]
+        return get_or_build_atlas(
+            mouth_region, lambda intensity: self.mouth_patch_for_intensity(mouth_region, intensity),
+            levels=self.atlas_levels or DEFAULT_LEVELS, renderer='wav2lip_mejorado.erode'
+        )
+    
+    def render_still_parallel(self, image, box, atlas, mel_chunks, audio_path, output_path, workers, fps=25):
+        """Imagen estática: repartir el timeline entre `workers` procesos y unir los segmentos"""
+        print(f"⚙️  Render paralelo: {workers} procesos")
+        x1, y1, x2, y2 = [int(v) for v in box]
+        mouth_y1 = y1 + int((y2 - y1) * 0.6)
+        roi = (mouth_y1, mouth_y1 + atlas.patches.shape[1], x1, x1 + atlas.patches.shape[2])
+        states = atlas.indices(self.voice_intensities(mel_chunks))
+        try:
+            render_parallel(image, roi, atlas.patches, states, output_path, audio_path,
+                            fps=fps, workers=workers)
+        except Exception as e:
+            print(f"❌ Error en render paralelo: {e}")
+            return False
+        print(f"✅ Video final creado: {output_path}")
+        return True
+    
+    def apply_lip_sync_transformation(self, face_region, mel_chunk):
+        """Aplicar transformación de sincronización de labios a una cara completa"""
+        h = face_region.shape[0]
+        
+        # Región de la boca (tercio inferior de la cara)
+        mouth_y_start = int(h * 0.6)
         
         # Reemplazar región de la boca en la cara
         result_face = face_region.copy()
-        result_face[mouth_y_start:mouth_y_end, :] = mouth_region
+        result_face[mouth_y_start:, :] = self.render_mouth_patch(face_region[mouth_y_start:, :], mel_chunk)
         
         return result_face
     
-    def create_video_from_image_advanced(self, image_path, audio_path, output_path="wav2lip_resultado.mp4"):
-        """Crear video avanzado con sincronización de labios"""
+    def create_video_from_image_advanced(self, image_path, audio_path, output_path="wav2lip_resultado.mp4", workers=1):
+        """Crear video avanzado con sincronización de labios (workers > 1: segmentos en paralelo)"""
         print("🎬 INICIANDO WAV2LIP MEJORADO")
         print("=" * 50)
         
-        # Cargar imagen
-        image = cv2.imread(image_path)
-        if image is None:
-            print(f"❌ Error: No se pudo cargar {image_path}")
-            return False
+        # Cargar imagen (perfil cacheado por contenido) o frames si la entrada es un video
+        en_memoria = isinstance(image_path, np.ndarray)
+        still = en_memoria or Path(image_path).suffix.lower() not in VIDEO_EXTENSIONS
+        profile = None
+        if still:
+            try:
+                profile = self.load_avatar_profile(image_path)
+            except (OSError, ValueError) as e:
+                print(f"❌ Error: No se pudo cargar la imagen: {e}")
+                return False
+            frames = [profile['imagen']]
+        else:
+            frames, _ = self.load_face_frames(image_path)
+            if not frames:
+                print(f"❌ Error: No se pudo cargar {image_path}")
+                return False
         
-        print(f"✅ Imagen cargada: {image_path}")
+        print(f"✅ {'Imagen cargada' if still else 'Video cargado'}: {'(en memoria)' if en_memoria else image_path}")
+        if still:
+            print(describe_stats(self.avatar_store))
         
         # Cargar características de audio
         try:
             mel_chunks = self.load_audio_features(audio_path)
             print(f"✅ Audio procesado: {len(mel_chunks)} chunks de mel-espectrograma")
+            stats = self.feature_cache.stats()
+            print(f"💾 Caché de audio: {stats['hits']} hits / {stats['misses']} misses")
         except Exception as e:
             print(f"❌ Error procesando audio: {e}")
             return False
         
-        # Crear secuencia de frames (repetir imagen)
-        frames = [image.copy() for _ in range(len(mel_chunks))]
-        
-        # Detectar caras en todos los frames
+        n_frames = len(mel_chunks)
         print("👁️  Detectando caras...")
-        boxes = self.face_detect(frames)
+        if still:
+            # Imagen estática: una sola detección, un solo frame base y la caja replicada
+            image = frames[0]
+            box = np.asarray(profile['caja'])
+            boxes = np.broadcast_to(box, (n_frames, 4))
+            frames = itertools.repeat(image, n_frames)
+            atlas = None
+            if 'atlas' in profile:
+                atlas = MouthAtlas.from_patches(profile['atlas'])
+            elif workers > 1:
+                atlas = self.build_mouth_atlas(image, box)
+            
+            if workers > 1:
+                return self.render_still_parallel(image, box, atlas, mel_chunks, audio_path, output_path, workers)
+        else:
+            # Video: detectar en cada frame y recorrerlo en bucle hasta cubrir el audio
+            image = frames[0]
+            video_boxes = self.face_detect(frames)
+            idx = np.arange(n_frames) % len(frames)
+            boxes = video_boxes[idx]
+            frames = (frames[i] for i in idx)
+            atlas = None
         
-        # Generar frames con lip-sync
-        synced_frames = self.generate_lip_sync_frames(frames, mel_chunks, boxes)
+        # Generar frames con lip-sync (perezoso: cada frame se escribe en cuanto se renderiza)
+        synced_frames = self.generate_lip_sync_frames(frames, mel_chunks, boxes, atlas=atlas)
         
-        # Crear video
+        # Crear video: un solo ffmpeg codifica los frames crudos y mezcla el audio
         print("🎥 Creando video final...")
         height, width = image.shape[:2]
         fps = 25
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        
-        temp_video = "temp_advanced_video.mp4"
-        out = cv2.VideoWriter(temp_video, fourcc, fps, (width, height))
-        
-        for frame in synced_frames:
-            out.write(frame)
-        
-        out.release()
         
-        # Combinar con audio
-        print("🔊 Combinando con audio...")
         try:
-            subprocess.run([
-                'ffmpeg', '-i', temp_video, '-i', audio_path,
-                '-c:v', 'libx264', '-c:a', 'aac', '-shortest',
-                '-y', output_path
-            ], check=True, capture_output=True)
-            
-            os.remove(temp_video)
-            print(f"✅ Video final creado: {output_path}")
-            return True
-            
+            with FFmpegVideoSink(output_path, width, height, fps=fps, audio_path=audio_path) as sink:
+                for frame in synced_frames:
+                    sink.write(frame)
         except Exception as e:
             print(f"❌ Error en ffmpeg: {e}")
             return False
+        
+        peak = peak_rss_mb()
+        if peak is not None:
+            print(f"📈 Memoria pico (RSS): {peak:.1f} MB")
+        
+        print(f"✅ Video final creado: {output_path}")
+        return True
 
 def main():
     """Demo del sistema mejorado"""
@@ -1,35 +1,26 @@
 """
 Script para usar Wav2Lip original con modificaciones para compatibilidad
+La inferencia corre en este proceso (wav2lip_inference.py): el checkpoint se carga una vez y
+se reutiliza entre llamadas, sin os.chdir ni un `python inference.py` por video.
 """
 
 import os
 import sys
-import subprocess
 from pathlib import Path
 
-def setup_wav2lip_original():
+from wav2lip_inference import DEFAULT_CHECKPOINT, default_inference_engine
+
+def setup_wav2lip_original(checkpoint_path=None):
     """Configurar Wav2Lip original para uso"""
     print("🔧 Configurando Wav2Lip original...")
     
-    wav2lip_dir = Path("Wav2Lip")
-    if not wav2lip_dir.exists():
-        print("❌ Directorio Wav2Lip no encontrado")
-        return False
-    
-    # Verificar archivos necesarios
-    inference_file = wav2lip_dir / "inference.py"
-    if not inference_file.exists():
-        print("❌ inference.py no encontrado")
-        return False
-    
-    # Crear directorio de checkpoints si no existe
-    checkpoints_dir = wav2lip_dir / "checkpoints"
-    checkpoints_dir.mkdir(exist_ok=True)
-    
-    # Verificar si existe el modelo preentrenado
-    model_path = checkpoints_dir / "wav2lip_gan.pth"
+    # Solo hace falta el checkpoint (WAV2LIP_CHECKPOINT o Wav2Lip/checkpoints/wav2lip_gan.pth):
+    # la arquitectura está en extras/wav2lip_model.py
+    model_path = Path(checkpoint_path or DEFAULT_CHECKPOINT)
     if not model_path.exists():
-        print("⚠️  Modelo wav2lip_gan.pth no encontrado")
+        # Dejar preparada la carpeta del checkpoint que se va a usar, y solo esa
+        model_path.parent.mkdir(parents=True, exist_ok=True)
+        print(f"⚠️  Modelo no encontrado: {model_path}")
         print("💡 Descargando modelo preentrenado...")
         
         # URL del modelo (esta es una URL de ejemplo, necesitarías la real)
@@ -44,48 +35,21 @@ def setup_wav2lip_original():
     print("✅ Wav2Lip original configurado")
     return True
 
-def run_wav2lip_original(face_image, audio_file, output_path="result_original.mp4"):
-    """Ejecutar Wav2Lip original"""
+def run_wav2lip_original(face_image, audio_file, output_path="result_original.mp4", checkpoint_path=None):
+    """Ejecutar Wav2Lip original (en proceso, con el modelo compartido)"""
     print("🎬 Ejecutando Wav2Lip original...")
     
-    if not setup_wav2lip_original():
+    if not setup_wav2lip_original(checkpoint_path):
         print("❌ Error en configuración")
         return False
     
-    # Cambiar al directorio de Wav2Lip
-    original_dir = os.getcwd()
-    wav2lip_dir = Path("Wav2Lip")
-    
     try:
-        os.chdir(wav2lip_dir)
-        
-        # Comando para ejecutar inference
-        cmd = [
-            "python", "inference.py",
-            "--checkpoint_path", "checkpoints/wav2lip_gan.pth",
-            "--face", f"../{face_image}",
-            "--audio", f"../{audio_file}",
-            "--outfile", f"../{output_path}"
-        ]
-        
-        print(f"🚀 Ejecutando: {' '.join(cmd)}")
-        
-        # Ejecutar comando
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            print(f"✅ Video generado: {output_path}")
-            return True
-        else:
-            print("❌ Error en ejecución:")
-            print(result.stderr)
-            return False
-            
+        engine = default_inference_engine(checkpoint_path)
     except Exception as e:
-        print(f"❌ Error: {e}")
+        print(f"❌ Error cargando el modelo: {e}")
         return False
-    finally:
-        os.chdir(original_dir)
+    
+    return engine.create_video_from_image(face_image, audio_file, output_path)
 
 def main():
     """Demo del Wav2Lip original"""
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+WAV2LIP SERVER - Servidor local que mantiene calientes los modelos de lip-sync
+Cada invocación de la CLI paga el import de torch, la carga de pesos y la de los detectores;
+este proceso de larga vida los carga una vez y atiende trabajos (imagen, audio, parámetros)
+por un socket UNIX con permisos 0600 (sin TCP: no hay autenticación). Los trabajos pasan
+por una cola y un único hilo de render; cada respuesta lleva la latencia, la espera en cola
+y cuántos trabajos había delante.
+Uso: python extras/wav2lip_server.py [--precargar original mejorado] [--estado] [--parar]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import queue
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+from detector_registry import HAAR_FRONTALFACE, get_haar_cascade
+from face_detection import DEFAULT_DETECT_SIZE
+from wav2lip_client import connect, default_address, describe_server_stats, request
+
+MOTORES = ('simple', 'mejorado', 'original')
+# Latencias recientes para la media y el p95 de las estadísticas
+LATENCY_WINDOW = 1000
+
+
+class Wav2LipServer:
+    def __init__(self, address=None, checkpoint_path=None, detect_size=DEFAULT_DETECT_SIZE):
+        self.address = address or default_address()
+        self.checkpoint_path = checkpoint_path
+        self.detect_size = detect_size
+        self._engines = {}
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._server = None
+        self._worker = None
+        self.started = time.time()
+        self.jobs = 0
+        self.errors = 0
+        self.in_progress = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.waits = deque(maxlen=LATENCY_WINDOW)
+
+    def engine(self, motor, detect_size=None, atlas_levels=None):
+        """Motor de lip-sync ya inicializado (se crea en el primer uso y se conserva)"""
+        detect_size = self.detect_size if detect_size is None else detect_size
+        if motor == 'original':
+            atlas_levels = None  # sin modo atlas: el modelo genera cada frame
+        key = (motor, detect_size, atlas_levels)
+        engine = self._engines.get(key)
+        if engine is None:
+            inicio = time.perf_counter()
+            if motor == 'simple':
+                from wav2lip_simple import Wav2LipSimple
+                engine = Wav2LipSimple(detect_size=detect_size, atlas_levels=atlas_levels)
+            elif motor == 'mejorado':
+                from wav2lip_mejorado import Wav2LipMejorado
+                engine = Wav2LipMejorado(detect_size=detect_size, atlas_levels=atlas_levels)
+            elif motor == 'original':
+                from wav2lip_inference import Wav2LipInference
+                engine = Wav2LipInference(self.checkpoint_path, detect_size=detect_size)
+            else:
+                raise ValueError(f"Motor desconocido: {motor} (disponibles: {', '.join(MOTORES)})")
+            self._engines[key] = engine
+            print(f"🔥 Motor '{motor}' listo en {time.perf_counter() - inicio:.2f} s")
+        return engine
+
+    def preload(self, motores):
+        """Cargar motores antes del primer trabajo (los detectores se calientan en el hilo de render)"""
+        for motor in motores:
+            try:
+                self.engine(motor)
+            except Exception as e:
+                print(f"⚠️  No se pudo precargar el motor '{motor}': {type(e).__name__}: {e}")
+
+    def submit(self, job):
+        """Encolar un trabajo; devuelve (Future, trabajos por delante)"""
+        future = Future()
+        with self._lock:
+            delante = self._jobs.qsize() + self.in_progress
+            self._jobs.put((next(self._ids), job, future, time.perf_counter(), delante))
+        return future, delante
+
+    def _run(self, job):
+        """Renderizar un trabajo con su motor; devuelve el resumen (lanza excepción si falla)"""
+        motor = job.get('motor', 'mejorado')
+        params = job.get('params') or {}
+        imagen, audio, salida = job['imagen'], job['audio'], job['salida']
+        for ruta in (imagen, audio):
+            if not os.path.exists(ruta):
+                raise FileNotFoundError(f"No existe: {ruta}")
+        os.makedirs(os.path.dirname(salida) or '.', exist_ok=True)
+        engine = self.engine(motor, params.get('detect_size'), params.get('atlas_levels'))
+        if motor == 'original':
+            return engine.render(imagen, audio, salida, fps=params.get('fps', 25))
+        workers = params.get('workers', 1)
+        if motor == 'simple':
+            ok = engine.create_video_from_image(imagen, audio, salida, workers=workers)
+        else:
+            ok = engine.create_video_from_image_advanced(imagen, audio, salida, workers=workers)
+        if not ok:
+            raise RuntimeError(f"el motor '{motor}' no pudo generar el video")
+        return {'salida': salida}
+
+    def _worker_loop(self):
+        # El registro de detectores es por hilo: calentar la cascada en el hilo que renderiza
+        get_haar_cascade(HAAR_FRONTALFACE)
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                return
+            job_id, job, future, encolado, delante = item
+            with self._lock:
+                self.in_progress += 1
+            inicio = time.perf_counter()
+            try:
+                resumen = self._run(job)
+                error = None
+            except Exception as e:
+                resumen, error = None, f"{type(e).__name__}: {e}"
+            fin = time.perf_counter()
+            respuesta = {
+                'ok': error is None, 'id': job_id, 'salida': job.get('salida'), 'error': error,
+                'latencia_s': fin - encolado, 'espera_s': inicio - encolado, 'proceso_s': fin - inicio,
+                'cola': delante, 'resumen': resumen,
+            }
+            with self._lock:
+                self.in_progress -= 1
+                self.jobs += 1
+                self.errors += error is not None
+                self.latencies.append(respuesta['latencia_s'])
+                self.waits.append(respuesta['espera_s'])
+                en_cola = self._jobs.qsize()
+            estado = "✅" if error is None else f"❌ {error} ·"
+            print(f"{estado} #{job_id} {job.get('motor')} {respuesta['latencia_s']:.2f} s "
+                  f"(espera {respuesta['espera_s']:.2f} s, {delante} delante, {en_cola} en cola)")
+            future.set_result(respuesta)
+
+    def stats(self):
+        """Trabajos atendidos, profundidad de la cola y latencias recientes (media y p95)"""
+        with self._lock:
+            latencias = np.array(self.latencies) if self.latencies else np.zeros(1)
+            esperas = np.array(self.waits) if self.waits else np.zeros(1)
+            stats = {
+                'ok': True, 'pid': os.getpid(), 'direccion': self.address,
+                'activo_s': time.time() - self.started,
+                'trabajos': self.jobs, 'errores': self.errors,
+                'en_cola': self._jobs.qsize(), 'en_curso': self.in_progress,
+                'latencia_media_s': float(latencias.mean()),
+                'latencia_p95_s': float(np.percentile(latencias, 95)),
+                'espera_media_s': float(esperas.mean()),
+                'motores': sorted({motor for motor, *_ in list(self._engines)}),
+            }
+        for (motor, *_), engine in list(self._engines.items()):
+            if motor == 'original':
+                stats['inferencia'] = engine.stats()
+        return stats
+
+    def handle(self, message):
+        """Atender una petición del protocolo (ping, stats, render, shutdown)"""
+        if not isinstance(message, dict):
+            return {'ok': False, 'error': f"petición inválida: se esperaba un objeto JSON, no {type(message).__name__}"}
+        op = message.get('op')
+        if op == 'ping':
+            return {'ok': True, 'pid': os.getpid()}
+        if op == 'stats':
+            return self.stats()
+        if op == 'render':
+            for campo in ('imagen', 'audio', 'salida'):
+                if not message.get(campo):
+                    return {'ok': False, 'error': f"falta el campo '{campo}'"}
+            future, _ = self.submit(message)
+            return future.result()
+        if op == 'shutdown':
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {'ok': True}
+        return {'ok': False, 'error': f"operación desconocida: {op}"}
+
+    def serve_forever(self):
+        """Escuchar en `address` hasta shutdown() o Ctrl+C"""
+        if self.address is None:
+            raise RuntimeError("Este sistema no tiene sockets UNIX; el servidor de modelos no está disponible")
+        sockaddr = self.address
+        sock = connect(sockaddr)
+        if sock is not None:
+            sock.close()
+            raise RuntimeError(f"Ya hay un servidor escuchando en {sockaddr}")
+        if os.path.exists(sockaddr):
+            os.unlink(sockaddr)  # socket huérfano de un servidor anterior
+        servidor = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                line = self.rfile.readline()
+                if not line:
+                    return
+                try:
+                    respuesta = servidor.handle(json.loads(line))
+                except ValueError as e:
+                    respuesta = {'ok': False, 'error': f"petición inválida: {e}"}
+                except Exception as e:
+                    # El cliente siempre recibe una respuesta, aunque la petición rompa algo inesperado
+                    respuesta = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+                self.wfile.write(json.dumps(respuesta).encode('utf-8') + b'\n')
+
+        class Server(socketserver.ThreadingUnixStreamServer):
+            daemon_threads = True
+
+        # Solo el usuario que lanza el servidor puede conectarse (y pedir que escriba archivos)
+        umask = os.umask(0o177)
+        try:
+            self._server = Server(sockaddr, Handler)
+        finally:
+            os.umask(umask)
+        self._worker = threading.Thread(target=self._worker_loop, name='wav2lip-render', daemon=True)
+        self._worker.start()
+        print(f"🛰️  Servidor de modelos escuchando en {self.address} (pid {os.getpid()})")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._jobs.put(None)
+            self._server.server_close()
+            if os.path.exists(sockaddr):
+                os.unlink(sockaddr)
+            print("👋 Servidor de modelos detenido")
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="🛰️ Servidor local de modelos de lip-sync")
+    parser.add_argument('--direccion', default=None,
+                        help=f'Ruta del socket UNIX (por defecto: {default_address()})')
+    parser.add_argument('--precargar', nargs='*', choices=MOTORES, default=['mejorado'],
+                        help='Motores a cargar al arrancar (por defecto: mejorado; el resto al primer uso)')
+    parser.add_argument('--checkpoint', default=None,
+                        help='Checkpoint del motor original (por defecto: WAV2LIP_CHECKPOINT o Wav2Lip/checkpoints/wav2lip_gan.pth)')
+    parser.add_argument('--detect-size', type=int, default=DEFAULT_DETECT_SIZE,
+                        help=f'Lado mayor para la detección de caras (por defecto: {DEFAULT_DETECT_SIZE})')
+    parser.add_argument('--estado', action='store_true', help='Mostrar las estadísticas del servidor en marcha')
+    parser.add_argument('--parar', action='store_true', help='Detener el servidor en marcha')
+    args = parser.parse_args()
+
+    if args.estado or args.parar:
+        respuesta = request({'op': 'stats' if args.estado else 'shutdown'}, args.direccion, timeout=5)
+        if respuesta is None:
+            print(f"❌ No hay ningún servidor en {args.direccion or default_address()}")
+            return False
+        print(describe_server_stats(respuesta) if args.estado else "✅ Servidor detenido")
+        return True
+
+    server = Wav2LipServer(args.direccion, args.checkpoint, args.detect_size)
+    server.preload(args.precargar)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
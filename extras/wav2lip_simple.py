@@ -7,28 +7,52 @@ Fecha: Noviembre 2024
 import cv2
 import numpy as np
 import os
-import subprocess
-import tempfile
 from pathlib import Path
 
+from audio_features import intensity_envelope
+from audio_io import audio_source
+from avatar_profile import default_avatar_store, describe_stats, image_source
+from detector_registry import HAAR_FRONTALFACE, HAAR_SMILE, get_haar_cascade
+from face_detection import DEFAULT_DETECT_SIZE, detect_faces, largest_face
+from feature_cache import default_feature_cache
+from mouth_atlas import DEFAULT_LEVELS, MouthAtlas, get_or_build_atlas
+from parallel_render import render_parallel
+from video_sink import FFmpegVideoSink
+
 class Wav2LipSimple:
-    def __init__(self):
+    def __init__(self, feature_cache=None, atlas_levels=None, detect_size=DEFAULT_DETECT_SIZE,
+                 avatar_store=None):
         """Inicializar el generador de video lip-sync"""
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        self.mouth_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_smile.xml')
+        self.feature_cache = feature_cache if feature_cache is not None else default_feature_cache()
+        # Perfiles de avatar (cara, boca, atlas) cacheados por contenido
+        self.avatar_store = avatar_store if avatar_store is not None else default_avatar_store()
+        # Modo atlas: N estados de boca pre-renderizados por avatar (None, por defecto: renderizar
+        # cada frame con su apertura exacta; el render paralelo usa el atlas siempre)
+        self.atlas_levels = atlas_levels
+        # Lado mayor de la imagen sobre la que se detecta (None: resolución completa)
+        self.detect_size = detect_size
+    
+    @property
+    def face_cascade(self):
+        """Clasificador de caras del registro compartido (una instancia por hilo)"""
+        return get_haar_cascade(HAAR_FRONTALFACE)
+    
+    @property
+    def mouth_cascade(self):
+        return get_haar_cascade(HAAR_SMILE)
         
     def detect_face_and_mouth(self, frame):
         """Detectar cara y región de la boca en el frame"""
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         
         # Detectar caras
-        faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
+        faces = detect_faces(gray, self.face_cascade, 1.3, 5, detect_size=self.detect_size)
         
         if len(faces) == 0:
             return None, None
             
         # Tomar la cara más grande
-        face = max(faces, key=lambda x: x[2] * x[3])
+        face = largest_face(faces)
         x, y, w, h = face
         
         # Región de la boca (tercio inferior de la cara)
@@ -38,50 +62,27 @@ class Wav2LipSimple:
         
         return face, mouth_region
     
-    def extract_audio_features(self, audio_path):
-        """Extraer características básicas del audio para animación"""
-        # Por simplicidad, vamos a simular la extracción de características
-        # En una implementación real, usarías librosa para extraer MFCC, etc.
+    def extract_audio_features(self, audio_path, fps=25):
+        """
+        Extraer la intensidad de boca por frame a partir de la energía real del audio
+        `audio_path` puede ser una ruta o un buffer (muestras, sr) en memoria (p. ej. del TTS)
+        """
+        data, decode = audio_source(audio_path)
         
-        # Obtener duración del audio usando ffprobe
-        try:
-            result = subprocess.run([
-                'ffprobe', '-v', 'quiet', '-show_entries', 
-                'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', 
-                audio_path
-            ], capture_output=True, text=True)
-            duration = float(result.stdout.strip())
-        except:
-            # Fallback: asumir 3 segundos si no se puede obtener duración
-            duration = 3.0
-            
-        # Simular características de audio (amplitud por frame)
-        fps = 25  # frames por segundo
-        total_frames = int(duration * fps)
-        
-        # Generar patrón de animación de boca basado en frecuencia simulada
-        audio_features = []
-        for i in range(total_frames):
-            # Simular intensidad de habla (sinusoidal con ruido)
-            time = i / fps
-            intensity = abs(np.sin(time * 10) + 0.3 * np.sin(time * 30) + 0.1 * np.random.randn())
-            audio_features.append(intensity)
-            
+        def calcular():
+            # Decodificar el audio una sola vez (WAV nativo o pipe de ffmpeg); un buffer se usa tal cual
+            samples, sr = decode()
+            # RMS por ventana de sr/fps muestras + suavizado: determinista y en silencio la boca no se mueve
+            return intensity_envelope(samples, sr, fps=fps)
+        
+        params = {'extractor': 'intensity_envelope', 'fps': fps, 'version': 1}
+        audio_features = self.feature_cache.get_or_compute(data, params, calcular)
         return audio_features, fps
     
-    def animate_mouth(self, frame, mouth_region, intensity):
-        """Animar la región de la boca basada en la intensidad del audio"""
-        x, y, w, h = mouth_region
-        
-        # Crear una copia del frame
-        animated_frame = frame.copy()
+    def render_mouth_patch(self, mouth_roi, intensity):
+        """Calcular solo el parche de la boca (mismo tamaño que la ROI) para una intensidad"""
+        h, w = mouth_roi.shape[:2]
         
-        # Extraer región de la boca
-        mouth_roi = frame[y:y+h, x:x+w]
-        
-        if mouth_roi.size == 0:
-            return animated_frame
-            
         # Simular apertura de boca basada en intensidad
         mouth_opening = int(intensity * 15)  # Máximo 15 píxeles de apertura
         
@@ -95,31 +96,84 @@ class Wav2LipSimple:
         cv2.ellipse(mask, (center_x, center_y), (axes_x, axes_y), 0, 0, 360, 255, -1)
         
         # Aplicar un efecto de oscurecimiento para simular boca abierta
-        mouth_roi_copy = mouth_roi.copy()
-        mouth_roi_copy[mask > 0] = mouth_roi_copy[mask > 0] * 0.3  # Oscurecer
+        patch = mouth_roi.copy()
+        patch[mask > 0] = patch[mask > 0] * 0.3  # Oscurecer
+        return patch
+    
+    def animate_mouth(self, frame, mouth_region, intensity, out=None):
+        """
+        Animar la región de la boca basada en la intensidad del audio.
+        Con `out` (buffer reutilizado con el mismo fondo) solo se reescribe la ROI de la boca.
+        """
+        x, y, w, h = mouth_region
+        
+        # Sin buffer de salida: crear una copia del frame
+        animated_frame = frame.copy() if out is None else out
+        
+        # Extraer región de la boca
+        mouth_roi = frame[y:y+h, x:x+w]
+        
+        if mouth_roi.size == 0:
+            return animated_frame
         
         # Aplicar la animación al frame
-        animated_frame[y:y+h, x:x+w] = mouth_roi_copy
+        animated_frame[y:y+h, x:x+w] = self.render_mouth_patch(mouth_roi, intensity)
         
         return animated_frame
     
-    def create_video_from_image(self, image_path, audio_path, output_path="resultado_wav2lip.mp4"):
-        """Crear video animado desde imagen estática y audio"""
+    def build_mouth_atlas(self, frame, mouth_region):
+        """Pre-renderizar los estados cuantizados de la boca de este avatar (cacheado por contenido)"""
+        x, y, w, h = mouth_region
+        mouth_roi = frame[y:y+h, x:x+w]
+        return get_or_build_atlas(
+            mouth_roi, lambda intensity: self.render_mouth_patch(mouth_roi, intensity),
+            levels=self.atlas_levels or DEFAULT_LEVELS, renderer='wav2lip_simple.ellipse'
+        )
+    
+    def load_avatar_profile(self, image_path):
+        """
+        Perfil del avatar: imagen decodificada, cara, región de boca y atlas de boca.
+        Todo depende solo de la imagen, así que se guarda en disco por contenido (salvo la
+        imagen, que se vuelve a decodificar) y un acierto evita detectar y renderizar el atlas.
+        `image_path` puede ser también un ndarray BGR ya decodificado.
+        """
+        data, decodificar = image_source(image_path)
+        
+        def construir(image):
+            face, mouth_region = self.detect_face_and_mouth(image)
+            profile = {'cara': None, 'boca': None}
+            if face is None:
+                return profile
+            profile['cara'] = [int(v) for v in face]
+            profile['boca'] = [int(v) for v in mouth_region]
+            if self.atlas_levels:
+                profile['atlas'] = self.build_mouth_atlas(image, mouth_region).patches
+            return profile
+        
+        params = {'perfil': 'wav2lip_simple', 'detect_size': self.detect_size,
+                  'atlas_levels': self.atlas_levels, 'renderer': 'wav2lip_simple.ellipse', 'version': 2}
+        return self.avatar_store.get_or_build(data, params, construir, decode=decodificar)
+    
+    def create_video_from_image(self, image_path, audio_path, output_path="resultado_wav2lip.mp4", workers=1):
+        """Crear video animado desde imagen estática y audio (workers > 1: render por segmentos en paralelo)"""
         print("🎬 Iniciando generación de video Wav2Lip...")
         
-        # Cargar imagen
-        image = cv2.imread(image_path)
-        if image is None:
-            print(f"❌ Error: No se pudo cargar la imagen {image_path}")
+        # Cargar imagen + análisis (perfil cacheado por contenido)
+        try:
+            profile = self.load_avatar_profile(image_path)
+        except (OSError, ValueError) as e:
+            print(f"❌ Error: No se pudo cargar la imagen: {e}")
             return False
+        image = profile['imagen']
             
-        print(f"✅ Imagen cargada: {image_path}")
+        print(f"✅ Imagen cargada: {'(en memoria)' if isinstance(image_path, np.ndarray) else image_path}")
+        print(describe_stats(self.avatar_store))
         
-        # Detectar cara y boca
-        face, mouth_region = self.detect_face_and_mouth(image)
-        if face is None or mouth_region is None:
+        # Cara y boca detectadas (o leídas del perfil)
+        if profile['cara'] is None or profile['boca'] is None:
             print("❌ Error: No se detectó cara en la imagen")
             return False
+        mouth_region = tuple(profile['boca'])
             
         print("✅ Cara y región de boca detectadas")
         
@@ -127,50 +181,64 @@ class Wav2LipSimple:
         try:
             audio_features, fps = self.extract_audio_features(audio_path)
             print(f"✅ Audio procesado: {len(audio_features)} frames a {fps} FPS")
+            stats = self.feature_cache.stats()
+            print(f"💾 Caché de audio: {stats['hits']} hits / {stats['misses']} misses")
         except Exception as e:
             print(f"❌ Error procesando audio: {e}")
             return False
         
-        # Configurar writer de video
+        # Un solo ffmpeg: frames crudos por stdin + audio, codificados y mezclados en una pasada
         height, width = image.shape[:2]
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        
-        # Crear video temporal sin audio
-        temp_video = "temp_video_no_audio.mp4"
-        out = cv2.VideoWriter(temp_video, fourcc, fps, (width, height))
         
         print("🎥 Generando frames animados...")
+        # Fondo inmutable + buffer de salida reutilizado: por frame solo se recalcula la boca
+        canvas = image.copy()
         
-        # Generar frames animados
-        for i, intensity in enumerate(audio_features):
-            # Animar boca
-            animated_frame = self.animate_mouth(image, mouth_region, intensity)
-            out.write(animated_frame)
-            
-            # Mostrar progreso
-            if i % 25 == 0:
-                progress = (i / len(audio_features)) * 100
-                print(f"📊 Progreso: {progress:.1f}%")
+        # Con atlas cada frame es una búsqueda de índice + copia de la ROI
+        atlas = None
+        if self.atlas_levels or workers > 1:
+            if 'atlas' in profile:
+                atlas = MouthAtlas.from_patches(profile['atlas'])
+            else:
+                atlas = self.build_mouth_atlas(image, mouth_region)
+            states = atlas.indices(audio_features)
+            x, y, w, h = mouth_region
+            print(f"🗂️  Atlas de boca: {atlas.levels} estados ({atlas.nbytes / 1024:.0f} KB)")
         
-        out.release()
-        print("✅ Video base generado")
+        if workers > 1:
+            print(f"⚙️  Render paralelo: {workers} procesos")
+            roi = (y, y + atlas.patches.shape[1], x, x + atlas.patches.shape[2])
+            try:
+                render_parallel(image, roi, atlas.patches, states, output_path, audio_path,
+                                fps=fps, workers=workers)
+                print(f"✅ Video final creado: {output_path}")
+                return True
+            except Exception as e:
+                print(f"❌ Error en render paralelo: {e}")
+                return False
         
-        # Combinar video con audio usando ffmpeg
-        print("🔊 Combinando video con audio...")
         try:
-            subprocess.run([
-                'ffmpeg', '-i', temp_video, '-i', audio_path, 
-                '-c:v', 'copy', '-c:a', 'aac', '-shortest', 
-                '-y', output_path
-            ], check=True, capture_output=True)
+            with FFmpegVideoSink(output_path, width, height, fps=fps, audio_path=audio_path) as sink:
+                # Generar frames animados
+                for i, intensity in enumerate(audio_features):
+                    # Animar boca
+                    if atlas is not None:
+                        canvas[y:y+h, x:x+w] = atlas.patches[states[i]]
+                        animated_frame = canvas
+                    else:
+                        animated_frame = self.animate_mouth(image, mouth_region, intensity, out=canvas)
+                    sink.write(animated_frame)
+                    
+                    # Mostrar progreso
+                    if i % 25 == 0:
+                        progress = (i / len(audio_features)) * 100
+                        print(f"📊 Progreso: {progress:.1f}%")
             
-            # Limpiar archivo temporal
-            os.remove(temp_video)
             print(f"✅ Video final creado: {output_path}")
             return True
             
-        except subprocess.CalledProcessError as e:
-            print(f"❌ Error combinando audio: {e}")
+        except RuntimeError as e:
+            print(f"❌ Error codificando video: {e}")
             print("💡 Asegúrate de tener ffmpeg instalado")
             return False
         except FileNotFoundError:
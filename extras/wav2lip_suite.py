@@ -3,6 +3,7 @@ WAV2LIP SUITE - Sistema completo de sincronización de labios
 Incluye múltiples implementaciones: Simple, Mejorado y Original
 """
 
+import argparse
 import os
 import sys
 from pathlib import Path
@@ -102,7 +103,20 @@ def crear_audio_personalizado():
     except ImportError:
         print("❌ pyttsx3 no disponible")
 
-def ejecutar_wav2lip_simple():
+def _render_en_servidor(motor, imagen, audio, salida, workers=1):
+    """True si el servidor de modelos atendió el trabajo (con éxito o no); False si no está levantado"""
+    from wav2lip_client import render_remoto
+    
+    resultado = render_remoto(motor, imagen, audio, salida, workers=workers)
+    if resultado is None:
+        return False
+    if resultado:
+        print(f"\n✅ Video generado: {salida}")
+    else:
+        print("\n❌ Error en generación")
+    return True
+
+def ejecutar_wav2lip_simple(workers=1):
     """Ejecutar versión simple"""
     print("\n🚀 EJECUTANDO WAV2LIP SIMPLE")
     print("-" * 35)
@@ -129,12 +143,14 @@ def ejecutar_wav2lip_simple():
         print(f"❌ Audio no encontrado: {audio}")
         return
     
-    # Ejecutar
+    # Ejecutar (en el servidor de modelos si está levantado)
+    if _render_en_servidor('simple', imagen, audio, salida, workers):
+        return
     try:
         from wav2lip_simple import Wav2LipSimple
         
         wav2lip = Wav2LipSimple()
-        resultado = wav2lip.create_video_from_image(imagen, audio, salida)
+        resultado = wav2lip.create_video_from_image(imagen, audio, salida, workers=workers)
         
         if resultado:
             print(f"\n✅ Video generado: {salida}")
@@ -144,7 +160,7 @@ def ejecutar_wav2lip_simple():
     except ImportError as e:
         print(f"❌ Error importando: {e}")
 
-def ejecutar_wav2lip_mejorado():
+def ejecutar_wav2lip_mejorado(workers=1):
     """Ejecutar versión mejorada"""
     print("\n🎨 EJECUTANDO WAV2LIP MEJORADO")
     print("-" * 37)
@@ -171,12 +187,14 @@ def ejecutar_wav2lip_mejorado():
         print(f"❌ Audio no encontrado: {audio}")
         return
     
-    # Ejecutar
+    # Ejecutar (en el servidor de modelos si está levantado)
+    if _render_en_servidor('mejorado', imagen, audio, salida, workers):
+        return
     try:
         from wav2lip_mejorado import Wav2LipMejorado
         
         wav2lip = Wav2LipMejorado()
-        resultado = wav2lip.create_video_from_image_advanced(imagen, audio, salida)
+        resultado = wav2lip.create_video_from_image_advanced(imagen, audio, salida, workers=workers)
         
         if resultado:
             print(f"\n✅ Video generado: {salida}")
@@ -213,7 +231,9 @@ def ejecutar_wav2lip_original():
         print(f"❌ Audio no encontrado: {audio}")
         return
     
-    # Ejecutar
+    # Ejecutar (en el servidor de modelos si está levantado)
+    if _render_en_servidor('original', imagen, audio, salida):
+        return
     try:
         from wav2lip_original_wrapper import run_wav2lip_original
         
@@ -230,16 +250,25 @@ def ejecutar_wav2lip_original():
 
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(description="WAV2LIP SUITE - Sincronización de labios")
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Procesos para renderizar por segmentos en paralelo (opciones 1 y 2)')
+    args = parser.parse_args()
+    workers = max(1, args.workers)
+    
     while True:
         mostrar_menu()
+        if workers > 1:
+            print(f"⚙️  Render paralelo: {workers} procesos")
+            print()
         
         try:
             opcion = input("Selecciona una opción (1-6): ").strip()
             
             if opcion == "1":
-                ejecutar_wav2lip_simple()
+                ejecutar_wav2lip_simple(workers)
             elif opcion == "2":
-                ejecutar_wav2lip_mejorado()
+                ejecutar_wav2lip_mejorado(workers)
             elif opcion == "3":
                 ejecutar_wav2lip_original()
             elif opcion == "4":
@@ -6,9 +6,12 @@ Solo convierte texto a voz - sin procesamiento de video ni imágenes
 import os
 import tkinter as tk
 from tkinter import messagebox, filedialog
-import pyttsx3
+import sys
 import threading
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'extras'))
+from tts_worker import default_tts_pool
+
 class AudioGenerator:
     def __init__(self, root):
         self.root = root
@@ -107,13 +110,11 @@ class AudioGenerator:
     def get_voices(self):
         """Obtener lista de voces disponibles"""
         try:
-            engine = pyttsx3.init()
-            voices = engine.getProperty('voices')
+            # El proceso TTS que luego sintetiza ya queda inicializado
+            voices = default_tts_pool().voices()
             voice_names = []
-            for i, voice in enumerate(voices[:5]):  # Máximo 5 voces
-                name = voice.name if hasattr(voice, 'name') else f"Voz {i+1}"
-                voice_names.append(name)
-            engine.stop()
+            for i, (voice_id, name) in enumerate(voices[:5]):  # Máximo 5 voces
+                voice_names.append(name or f"Voz {i+1}")
             return voice_names if voice_names else ["Voz por defecto"]
         except:
             return ["Voz por defecto"]
@@ -125,30 +126,14 @@ class AudioGenerator:
     def _probar_voz_thread(self):
         try:
             self.status_label.config(text="🔊 Probando voz...", fg="#e67e22")
-            engine = pyttsx3.init()
-            
             # Configurar velocidad
             try:
                 velocidad = int(self.velocidad_var.get())
-                engine.setProperty('rate', velocidad)
-            except:
-                pass
-            
-            # Configurar voz
-            try:
-                voices = engine.getProperty('voices')
-                voz_seleccionada = self.voz_var.get()
-                for i, voice in enumerate(voices):
-                    if voice.name == voz_seleccionada:
-                        engine.setProperty('voice', voice.id)
-                        break
             except:
-                pass
+                velocidad = None
             
-            # Decir texto de prueba
-            engine.say("Hola, esta es una prueba de voz")
-            engine.runAndWait()
-            engine.stop()
+            # Decir texto de prueba con la voz seleccionada
+            default_tts_pool().speak("Hola, esta es una prueba de voz", rate=velocidad, voice=self.voz_var.get())
             
             self.status_label.config(text="✅ Prueba de voz completada", fg="#27ae60")
         except Exception as e:
@@ -180,30 +165,13 @@ class AudioGenerator:
             # Ruta del archivo
             audio_path = os.path.join(output_dir, f"{nombre}.wav")
             
-            # Configurar engine
-            engine = pyttsx3.init()
-            
             try:
                 velocidad = int(self.velocidad_var.get())
-                engine.setProperty('rate', velocidad)
-            except:
-                engine.setProperty('rate', 150)
-            
-            # Configurar voz
-            try:
-                voices = engine.getProperty('voices')
-                voz_seleccionada = self.voz_var.get()
-                for voice in voices:
-                    if hasattr(voice, 'name') and voice.name == voz_seleccionada:
-                        engine.setProperty('voice', voice.id)
-                        break
             except:
-                pass
+                velocidad = 150
             
-            # Generar archivo
-            engine.save_to_file(texto, audio_path)
-            engine.runAndWait()
-            engine.stop()
+            # Generar archivo en el proceso TTS persistente con la voz seleccionada
+            default_tts_pool().synthesize(texto, audio_path, rate=velocidad, voice=self.voz_var.get())
             
             if os.path.exists(audio_path):
                 self.status_label.config(text=f"✅ Audio guardado: {audio_path}", fg="#27ae60")
@@ -10,72 +10,83 @@ import os
 import sys
 import cv2
 import numpy as np
-import pyttsx3
 import subprocess
 from pathlib import Path
 
 # Configuración de directorios
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EXTRAS_DIR = os.path.join(BASE_DIR, "extras")
 RESULTS_DIR = os.path.join(BASE_DIR, "resultados")
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
-def crear_audio_desde_texto(texto, output_path):
+# Los motores de lip-sync (simple / mejorado) y los módulos compartidos viven en extras/
+sys.path.append(EXTRAS_DIR)
+from audio_io import is_pcm
+from avatar_profile import default_avatar_store, describe_stats, image_source
+from cartoon import DEFAULT_PRESET, PRESETS, cache_params, cartoonify_image
+from detector_registry import get_haar_cascade
+from face_detection import DEFAULT_DETECT_SIZE, detect_faces
+from mouth_atlas import DEFAULT_LEVELS
+from tts_worker import default_tts_pool
+from tts_worker import describe_stats as describe_tts_stats
+from tts_pipeline import describe_timings, synthesize_and_render
+from video_sink import write_still_video
+from wav2lip_client import render_remoto
+
+def crear_audio_desde_texto(texto, output_path=None):
     """
-    Crear archivo de audio desde texto usando pyttsx3
+    Crear audio desde texto usando pyttsx3
+    La síntesis la hace un proceso TTS persistente con el motor ya inicializado; devuelve
+    (muestras, sr) en memoria o None. El WAV solo se escribe si se indica `output_path`
     """
     print(f"🎤 Generando audio desde texto: '{texto[:50]}...'")
     
     try:
-        engine = pyttsx3.init()
-        
-        # Configurar propiedades de voz
-        voices = engine.getProperty('voices')
-        if voices:
-            # Buscar voz femenina si está disponible
-            for voice in voices:
-                if 'female' in voice.name.lower() or 'helena' in voice.name.lower():
-                    engine.setProperty('voice', voice.id)
-                    break
-        
-        # Configurar velocidad y volumen
-        engine.setProperty('rate', 150)  # Velocidad
-        engine.setProperty('volume', 0.9)  # Volumen
+        # Voz femenina si está disponible, velocidad 150 y volumen 0.9
+        pool = default_tts_pool()
+        samples, sr = pool.synthesize_pcm(texto, rate=150, voice=('female', 'helena'), volume=0.9,
+                                          output_path=output_path)
+        print(describe_tts_stats(pool))
         
-        # Generar audio
-        engine.save_to_file(texto, output_path)
-        engine.runAndWait()
-        
-        if os.path.exists(output_path):
-            print(f"✅ Audio generado: {output_path}")
-            return True
-        else:
+        if len(samples) == 0:
             print(f"❌ Error: No se pudo crear el audio")
-            return False
+            return None
+        print(f"✅ Audio generado: {len(samples) / sr:.2f} s en memoria"
+              + (f" (guardado en {output_path})" if output_path else ""))
+        return samples, sr
             
     except Exception as e:
         print(f"❌ Error generando audio: {e}")
-        return False
+        return None
 
-def detectar_cara_opencv(imagen_path):
+def cargar_imagen(imagen):
+    """Ruta -> ndarray BGR decodificado (un ndarray se devuelve tal cual)"""
+    if isinstance(imagen, np.ndarray):
+        return imagen
+    return cv2.imread(imagen)
+
+def detectar_cara_opencv(imagen, detect_size=DEFAULT_DETECT_SIZE):
     """
     Detectar cara usando OpenCV (método básico sin MediaPipe)
+    `imagen` puede ser una ruta o un ndarray ya decodificado por una etapa anterior.
+    La detección corre sobre una copia cuyo lado mayor es detect_size (0: resolución completa)
     """
     print("👁️  Detectando cara con OpenCV...")
     
     try:
-        # Cargar clasificador de caras
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        # Clasificador de caras compartido (se carga una sola vez por hilo)
+        face_cascade = get_haar_cascade()
         
-        # Cargar imagen
-        img = cv2.imread(imagen_path)
+        # Cargar imagen (solo si no llega ya decodificada)
+        img = cargar_imagen(imagen)
         if img is None:
-            print(f"❌ Error: No se pudo cargar la imagen: {imagen_path}")
+            print(f"❌ Error: No se pudo cargar la imagen: {imagen}")
             return None
             
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         
-        # Detectar caras
-        faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+        # Detectar caras a resolución reducida y refinar cada caja a resolución completa
+        faces = detect_faces(gray, face_cascade, 1.1, 4, detect_size=detect_size, refine=True)
         
         if len(faces) == 0:
             print("❌ No se detectaron caras en la imagen")
@@ -88,45 +99,77 @@ def detectar_cara_opencv(imagen_path):
         print(f"❌ Error en detección de cara: {e}")
         return None
 
-def procesar_imagen_cartoon(imagen_path, output_path):
+def procesar_imagen_cartoon(imagen, output_path=None, preset=DEFAULT_PRESET):
     """
-    Aplicar efecto cartoon a la imagen
+    Aplicar efecto cartoon a la imagen (ruta o ndarray) y devolver el ndarray resultante.
+    Solo se escribe a disco si se pasa output_path.
     """
-    print("🎨 Aplicando efecto cartoon...")
+    print(f"🎨 Aplicando efecto cartoon (preset '{preset}')...")
     
     try:
-        img = cv2.imread(imagen_path)
+        img = cargar_imagen(imagen)
         if img is None:
-            return False
+            return None
             
-        # Aplicar filtros para efecto cartoon
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        gray = cv2.medianBlur(gray, 5)
-        
-        # Crear bordes
-        edges = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, 9, 9)
+        # Bordes a resolución completa + colores suavizados (módulo compartido extras/cartoon.py)
+        cartoon = cartoonify_image(img, preset)
         
-        # Suavizar colores
-        color = cv2.bilateralFilter(img, 9, 250, 250)
-        
-        # Combinar
-        edges = cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR)
-        cartoon = cv2.bitwise_and(color, edges)
-        
-        cv2.imwrite(output_path, cartoon)
-        print(f"✅ Imagen cartoon guardada: {output_path}")
-        return True
+        if output_path:
+            cv2.imwrite(output_path, cartoon)
+            print(f"✅ Imagen cartoon guardada: {output_path}")
+        return cartoon
         
     except Exception as e:
         print(f"❌ Error procesando imagen: {e}")
-        return False
+        return None
+
+def analizar_imagen(imagen_path, detect_size=DEFAULT_DETECT_SIZE, cartoon_preset=DEFAULT_PRESET):
+    """
+    Detección de cara + efecto cartoon con caché persistente por contenido de la imagen.
+    La imagen se decodifica una sola vez y las etapas se pasan el ndarray en memoria;
+    en un acierto no se decodifica ni se analiza nada. Devuelve (cara, cartoon).
+    """
+    store = default_avatar_store()
+    data, decodificar = image_source(imagen_path)
+    
+    def construir():
+        img = decodificar()
+        cara = detectar_cara_opencv(img, detect_size=detect_size)
+        cartoon = procesar_imagen_cartoon(img, preset=cartoon_preset)
+        return {'cara': None if cara is None else [int(v) for v in cara],
+                'cartoon': img if cartoon is None else cartoon}
+    
+    aciertos = store.hits
+    params = {'perfil': 'wav2lip_cli', 'detect_size': detect_size, 'version': 2}
+    if cartoon_preset != DEFAULT_PRESET:
+        # El preset clásico conserva la clave anterior: los perfiles ya cacheados siguen valiendo
+        params.update(cache_params(cartoon_preset))
+    perfil = store.get_or_build(data, params, construir)
+    if store.hits > aciertos:
+        print("✅ Perfil de avatar en caché: se omite el análisis de la imagen")
+    print(describe_stats(store))
+    return perfil['cara'], perfil['cartoon']
 
 def crear_video_basico(imagen_path, audio_path, output_path):
     """
     Crear video básico combinando imagen y audio usando ffmpeg
+    Con un ndarray el frame se pasa crudo por stdin (sin JPEG intermedio que ffmpeg re-decodifique)
+    y `audio_path` puede ser también el buffer (muestras, sr) del TTS
     """
     print("🎥 Creando video con ffmpeg...")
     
+    if isinstance(imagen_path, np.ndarray) or is_pcm(audio_path):
+        try:
+            write_still_video(cargar_imagen(imagen_path), output_path, audio_path)
+            print(f"✅ Video creado exitosamente: {output_path}")
+            return True
+        except FileNotFoundError:
+            print("❌ Error: ffmpeg no encontrado. Instala ffmpeg y agrégalo al PATH del sistema.")
+            return False
+        except Exception as e:
+            print(f"❌ Error en ffmpeg: {e}")
+            return False
+    
     try:
         # Comando ffmpeg para combinar imagen y audio
         cmd = [
@@ -160,7 +203,82 @@ def crear_video_basico(imagen_path, audio_path, output_path):
         print(f"❌ Error creando video: {e}")
         return False
 
-def procesar_wav2lip_cli(imagen_path, texto_audio, salida_path):
+def crear_video_lipsync(motor, imagen_path, audio_path, output_path, workers=1, detect_size=DEFAULT_DETECT_SIZE,
+                        atlas_levels=None):
+    """
+    Crear video con uno de los motores de extras/ (simple, mejorado u original)
+    `imagen_path` puede ser una ruta o el ndarray de la etapa anterior y `audio_path` una ruta
+    o el buffer (muestras, sr) del TTS; `atlas_levels` activa el modo atlas de simple/mejorado
+    """
+    print(f"🎭 Creando video con motor '{motor}' ({workers} proceso(s))...")
+    
+    # Con el servidor de modelos levantado (extras/wav2lip_server.py) el trabajo va a sus
+    # motores ya cargados, para cualquier motor (con 'original' se usa el checkpoint del
+    # servidor); si no hay servidor se renderiza en este proceso
+    remoto = render_remoto(motor, imagen_path, audio_path, output_path, workers=workers, detect_size=detect_size,
+                           atlas_levels=atlas_levels)
+    if remoto is not None:
+        return remoto
+    
+    try:
+        if motor == 'simple':
+            from wav2lip_simple import Wav2LipSimple
+            return Wav2LipSimple(detect_size=detect_size, atlas_levels=atlas_levels).create_video_from_image(imagen_path, audio_path, output_path, workers=workers)
+        elif motor == 'original':
+            # Modelo Wav2Lip en este proceso, cargado una vez e inferencia por lotes
+            from wav2lip_inference import default_inference_engine
+            return default_inference_engine(detect_size=detect_size).create_video_from_image(imagen_path, audio_path, output_path)
+        else:
+            from wav2lip_mejorado import Wav2LipMejorado
+            return Wav2LipMejorado(detect_size=detect_size, atlas_levels=atlas_levels).create_video_from_image_advanced(imagen_path, audio_path, output_path, workers=workers)
+    except ImportError as e:
+        print(f"❌ Error importando el motor '{motor}': {e}")
+        return False
+    except FileNotFoundError as e:
+        # Motor original sin checkpoint descargado
+        print(f"❌ {e}")
+        print("💡 Descarga wav2lip_gan.pth (https://github.com/Rudrabha/Wav2Lip#getting-the-weights) "
+              "o indica su ruta con WAV2LIP_CHECKPOINT; sin checkpoint usa --motor simple o mejorado")
+        return False
+
+def procesar_por_frases(imagen_path, texto_audio, salida_path, motor='basico', workers=1,
+                        detect_size=DEFAULT_DETECT_SIZE, imagen_cartoon=None, cartoon_preset=DEFAULT_PRESET,
+                        atlas_levels=None):
+    """
+    Variante solapada: la síntesis se encola frase a frase, la imagen se analiza mientras tanto
+    y cada frase se renderiza como un tramo en cuanto su audio está listo
+    """
+    print("\n📁 PASOS 1-4: Audio por frases solapado con el análisis y el render...")
+    etapas = {}
+
+    def preparar():
+        etapas['cara'], etapas['cartoon'] = analizar_imagen(imagen_path, detect_size=detect_size,
+                                                            cartoon_preset=cartoon_preset)
+        if etapas['cara'] is None:
+            print("⚠️  Continuando sin detección específica de cara...")
+        if imagen_cartoon:
+            cv2.imwrite(imagen_cartoon, etapas['cartoon'])
+            print(f"✅ Imagen cartoon guardada: {imagen_cartoon}")
+
+    def renderizar_tramo(audio, video_path):
+        if motor == 'basico':
+            return crear_video_basico(etapas['cartoon'], audio, video_path)
+        return crear_video_lipsync(motor, etapas['cartoon'], audio, video_path, workers=workers,
+                                   detect_size=detect_size, atlas_levels=atlas_levels)
+
+    try:
+        tiempos = synthesize_and_render(texto_audio, renderizar_tramo, salida_path, prepare=preparar,
+                                        rate=150, voice=('female', 'helena'), volume=0.9)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"❌ Error en el procesado por frases: {e}")
+        return False
+    print(describe_tts_stats(default_tts_pool()))
+    print(describe_timings(tiempos))
+    return True
+
+def procesar_wav2lip_cli(imagen_path, texto_audio, salida_path, motor='basico', workers=1,
+                         detect_size=DEFAULT_DETECT_SIZE, guardar_intermedios=False, por_frases=False,
+                         cartoon_preset=DEFAULT_PRESET, atlas_levels=None):
     """
     Función principal que procesa imagen y texto para crear video con lip-sync
     """
@@ -180,26 +298,46 @@ def procesar_wav2lip_cli(imagen_path, texto_audio, salida_path):
     audio_temp = os.path.join(RESULTS_DIR, f"{base_name}_audio.wav")
     imagen_cartoon = os.path.join(RESULTS_DIR, f"{base_name}_cartoon.jpg")
     
-    # PASO 1: Crear audio desde texto
+    if por_frases:
+        video_ok = procesar_por_frases(imagen_path, texto_audio, salida_path, motor=motor, workers=workers,
+                                       detect_size=detect_size,
+                                       imagen_cartoon=imagen_cartoon if guardar_intermedios else None,
+                                       cartoon_preset=cartoon_preset, atlas_levels=atlas_levels)
+        return _informar_resultado(video_ok, salida_path)
+    
+    # PASO 1: Crear audio desde texto (PCM en memoria hasta el encoder)
     print("\n📁 PASO 1: Generando audio...")
-    if not crear_audio_desde_texto(texto_audio, audio_temp):
+    audio = crear_audio_desde_texto(texto_audio, audio_temp if guardar_intermedios else None)
+    if audio is None:
         return False
     
-    # PASO 2: Detectar cara en imagen
-    print("\n📁 PASO 2: Analizando imagen...")
-    cara = detectar_cara_opencv(imagen_path)
+    # PASO 2 y 3: Detectar cara y aplicar efecto cartoon (cacheado por contenido de la imagen)
+    print("\n📁 PASO 2-3: Analizando y procesando imagen...")
+    try:
+        cara, cartoon = analizar_imagen(imagen_path, detect_size=detect_size, cartoon_preset=cartoon_preset)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error leyendo la imagen: {e}")
+        return False
     if cara is None:
         print("⚠️  Continuando sin detección específica de cara...")
+    if guardar_intermedios:
+        cv2.imwrite(imagen_cartoon, cartoon)
+        print(f"✅ Imagen cartoon guardada: {imagen_cartoon}")
     
-    # PASO 3: Procesar imagen (efecto cartoon opcional)
-    print("\n📁 PASO 3: Procesando imagen...")
-    procesar_imagen_cartoon(imagen_path, imagen_cartoon)
-    
-    # PASO 4: Crear video básico
+    # PASO 4: Crear video básico (el cartoon pasa en memoria, sin JPEG intermedio)
     print("\n📁 PASO 4: Creando video final...")
-    imagen_final = imagen_cartoon if os.path.exists(imagen_cartoon) else imagen_path
+    imagen_final = cartoon
     
-    if crear_video_basico(imagen_final, audio_temp, salida_path):
+    if motor == 'basico':
+        video_ok = crear_video_basico(imagen_final, audio, salida_path)
+    else:
+        video_ok = crear_video_lipsync(motor, imagen_final, audio, salida_path, workers=workers,
+                                       detect_size=detect_size, atlas_levels=atlas_levels)
+    return _informar_resultado(video_ok, salida_path)
+
+def _informar_resultado(video_ok, salida_path):
+    """Mensaje final común a los dos modos de procesado"""
+    if video_ok:
         print(f"\n🎉 ¡PROCESO COMPLETADO!")
         print(f"📹 Video final: {salida_path}")
         print(f"📂 Revisa la carpeta 'resultados' para ver todos los archivos generados.")
@@ -220,6 +358,7 @@ Ejemplos de uso:
   python wav2lip_cli.py --imagen woman.jpg --texto "Hola mundo"
   python wav2lip_cli.py --imagen foto.png --texto "Este es un ejemplo" --salida mi_video.mp4
   python wav2lip_cli.py --imagen rostro.jpg --texto "Texto largo para generar video" --salida resultados/output.mp4
+  python wav2lip_cli.py --imagen woman.jpg --texto "Hola mundo" --motor simple --workers 8
         """
     )
     
@@ -244,6 +383,56 @@ Ejemplos de uso:
         help='Ruta para el video de salida (por defecto: resultados/[nombre_imagen]_final.mp4)'
     )
     
+    parser.add_argument(
+        '--motor',
+        choices=['basico', 'simple', 'mejorado', 'original'],
+        default='basico',
+        help='Motor de video: basico (imagen fija + audio), simple, mejorado u original (modelo Wav2Lip, requiere checkpoint)'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Procesos para renderizar el video por segmentos en paralelo (motores simple/mejorado)'
+    )
+    
+    parser.add_argument(
+        '--detect-size',
+        type=int,
+        default=DEFAULT_DETECT_SIZE,
+        help=f'Lado mayor (px) de la imagen sobre la que se detecta la cara; 0 = resolución completa (por defecto: {DEFAULT_DETECT_SIZE})'
+    )
+    
+    parser.add_argument(
+        '--atlas',
+        type=int,
+        nargs='?',
+        const=DEFAULT_LEVELS,
+        default=None,
+        metavar='NIVELES',
+        help=f'Modo atlas (motores simple/mejorado): aperturas de boca cuantizadas a NIVELES estados pre-renderizados (por defecto: {DEFAULT_LEVELS}); sin la opción cada frame se renderiza con su apertura exacta'
+    )
+    
+    parser.add_argument(
+        '--guardar-intermedios',
+        action='store_true',
+        help='Guardar también los artefactos intermedios (resultados/[nombre]_cartoon.jpg y [nombre]_audio.wav)'
+    )
+    
+    parser.add_argument(
+        '--cartoon',
+        choices=list(PRESETS),
+        default=DEFAULT_PRESET,
+        help=f'Preset del efecto cartoon: clasico (filtro original), equilibrado o rapido (bilateral sobre una copia reducida) (por defecto: {DEFAULT_PRESET})'
+    )
+    
+    parser.add_argument(
+        '--tts-por-frases',
+        action='store_true',
+        help='Sintetizar el texto frase a frase y renderizar cada frase mientras se sintetizan las siguientes (textos largos)'
+    )
+    
     parser.add_argument(
         '--test', 
         action='store_true',
@@ -253,6 +442,13 @@ Ejemplos de uso:
     # Parsear argumentos
     args = parser.parse_args()
     
+    if args.workers < 1:
+        parser.error("--workers debe ser 1 o mayor")
+    if args.detect_size < 0:
+        parser.error("--detect-size debe ser 0 o mayor")
+    if args.atlas is not None and args.atlas < 2:
+        parser.error("--atlas necesita al menos 2 niveles")
+    
     # Modo test con archivos por defecto
     if args.test:
         print("🧪 MODO TEST - Usando archivos de ejemplo")
@@ -261,7 +457,11 @@ Ejemplos de uso:
         salida_test = os.path.join(RESULTS_DIR, "test_cli_output.mp4")
         
         if os.path.exists(imagen_test):
-            return procesar_wav2lip_cli(imagen_test, texto_test, salida_test)
+            return procesar_wav2lip_cli(imagen_test, texto_test, salida_test, motor=args.motor, workers=args.workers,
+                                        detect_size=args.detect_size,
+                                        guardar_intermedios=args.guardar_intermedios,
+                                        por_frases=args.tts_por_frases, cartoon_preset=args.cartoon,
+                                        atlas_levels=args.atlas)
         else:
             print(f"❌ Archivo de test no encontrado: {imagen_test}")
             return False
@@ -277,7 +477,10 @@ Ejemplos de uso:
         args.salida = os.path.join(RESULTS_DIR, f"{base_name}_final.mp4")
     
     # Procesar con argumentos del usuario
-    return procesar_wav2lip_cli(args.imagen, args.texto, args.salida)
+    return procesar_wav2lip_cli(args.imagen, args.texto, args.salida, motor=args.motor, workers=args.workers,
+                                detect_size=args.detect_size, guardar_intermedios=args.guardar_intermedios,
+                                por_frases=args.tts_por_frases, cartoon_preset=args.cartoon,
+                                atlas_levels=args.atlas)
 
 if __name__ == '__main__':
     try: